@@ -0,0 +1 @@
+# Servidor LLM local y arnés de latencia para medir el pipeline sin red
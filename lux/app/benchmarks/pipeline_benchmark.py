@@ -0,0 +1,183 @@
+"""
+Arnés de latencia del pipeline de voz/chat contra el servidor LLM local.
+
+Uso (desde la raíz del repositorio):
+    python -m lux.app.benchmarks.pipeline_benchmark --iterations 30 --latency 0.05 --jitter 0.02
+    python -m lux.app.benchmarks.pipeline_benchmark --output bench.json
+    python -m lux.app.benchmarks.pipeline_benchmark --baseline bench.json --tolerance 0.25
+
+Termina con código 1 si algún p95 supera la línea base (más la tolerancia)
+o el máximo indicado con --max-p95 etapa=segundos.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable
+
+from .. import config
+from ..core.metrics import MetricsRegistry
+from .stub_llm_server import StubLLMServer, LatencyModel
+
+logger = logging.getLogger('lux.benchmarks')
+
+FUNCTION_REQUESTS = ["qué hora es", "dime la hora por favor", "abre el bloc de notas"]
+CHAT_MESSAGES = ["hola, ¿cómo estás?", "cuéntame un dato curioso", "¿qué puedes hacer?"]
+NEW_FUNCTIONS = [("calcular_suma_simple", "función para calcular la suma de dos números fijos")]
+
+def configure_environment(server: StubLLMServer):
+    """Apunta todos los clientes LLM al servidor local y desactiva cachés, reintentos y límites de tasa"""
+    config.GEMINI_TRANSPORT = 'rest'
+    config.GEMINI_API_URL = server.gemini_url
+    config.GEMINI_API_KEY = 'stub-key'
+    config.OPENROUTER_API_URL = server.openrouter_url
+    config.OPENROUTER_API_KEY = 'stub-key'
+    config.RESPONSE_CACHE_ENABLED = False
+    config.HTTP_RETRIES = 0
+    config.RATE_LIMITS = {provider: (1000.0, 1000.0) for provider in config.RATE_LIMITS}
+
+class PipelineBenchmark:
+    """Mide cada etapa del pipeline y resume p50/p95/p99 por etapa"""
+
+    STAGES = ('execute_function', 'chat', 'chat_first_chunk', 'create_new_function')
+
+    def __init__(self, iterations: int = 20, warmup: int = 2):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.metrics = MetricsRegistry(max_samples=max(1000, iterations * 10))
+        self.errors: Dict[str, int] = {stage: 0 for stage in self.STAGES}
+
+    def _build_pipeline(self):
+        # Importación diferida: config ya apunta al servidor local
+        from ..core.function_manager import FunctionManager
+        from ..core.ai_manager import AIManager
+
+        function_manager = FunctionManager()
+        ai_manager = AIManager()
+        ai_manager.set_function_manager(function_manager)
+        return function_manager, ai_manager
+
+    def _measure(self, stage: str, action: Callable[[], Any], record: bool = True):
+        start = time.perf_counter()
+        try:
+            ok = bool(action())
+        except Exception as e:
+            logger.error(f"Error en etapa {stage}: {e}")
+            ok = False
+        if not record:
+            return
+        if ok:
+            self.metrics.observe(stage, time.perf_counter() - start)
+        else:
+            self.errors[stage] += 1
+
+    def _first_chunk(self, ai_manager, message: str) -> bool:
+        start = time.perf_counter()
+        for _ in ai_manager.chat_stream(message):
+            self.metrics.observe('chat_first_chunk', time.perf_counter() - start)
+            return True
+        return False
+
+    def run(self) -> Dict[str, Any]:
+        function_manager, ai_manager = self._build_pipeline()
+
+        for i in range(self.warmup + self.iterations):
+            record = i >= self.warmup
+            request = FUNCTION_REQUESTS[i % len(FUNCTION_REQUESTS)]
+            message = CHAT_MESSAGES[i % len(CHAT_MESSAGES)]
+
+            self._measure('execute_function',
+                          lambda: function_manager.execute_function(request, conversational=True), record)
+            self._measure('chat', lambda: ai_manager.chat(message), record)
+            if record:
+                # La muestra la registra _first_chunk: solo cuenta errores aquí
+                if not self._first_chunk(ai_manager, message):
+                    self.errors['chat_first_chunk'] += 1
+            name, description = NEW_FUNCTIONS[i % len(NEW_FUNCTIONS)]
+            self._measure('create_new_function',
+                          lambda: ai_manager.create_new_function(name, description).get('success'), record)
+
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            stage: {**self.metrics.summary(stage), 'errors': self.errors[stage]}
+            for stage in self.STAGES
+        }
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'etapa':<22}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}"]
+    for stage, summary in report.items():
+        lines.append(
+            f"{stage:<22}{summary['count']:>5}"
+            f"{summary['p50'] * 1000:>10.1f}{summary['p95'] * 1000:>10.1f}{summary['p99'] * 1000:>10.1f}"
+            f"{summary['errors']:>9}"
+        )
+    return "\n".join(lines)
+
+def check_regressions(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None,
+                      tolerance: float = 0.25, max_p95: Optional[Dict[str, float]] = None) -> List[str]:
+    """Lista de regresiones: p95 sobre la línea base (+tolerancia), sobre el máximo o etapas con errores"""
+    problems = []
+    for stage, summary in report.items():
+        if summary['errors']:
+            problems.append(f"{stage}: {summary['errors']} errores")
+        limit = (max_p95 or {}).get(stage)
+        if limit is not None and summary['p95'] > limit:
+            problems.append(f"{stage}: p95 {summary['p95']:.3f}s > máximo {limit:.3f}s")
+        base = (baseline or {}).get(stage)
+        if base and base.get('p95') and summary['p95'] > base['p95'] * (1 + tolerance):
+            problems.append(f"{stage}: p95 {summary['p95']:.3f}s > línea base "
+                            f"{base['p95']:.3f}s (+{tolerance:.0%})")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de latencia del pipeline de Lux sin red")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--distribution', default='lognormal',
+                        choices=['fixed', 'uniform', 'normal', 'lognormal'])
+    parser.add_argument('--latency', type=float, default=0.05, help="Latencia media del LLM simulado (s)")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Dispersión de la latencia (s)")
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help="Pausa entre fragmentos en streaming (s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--script', type=Path, help="JSON con reglas de respuesta del servidor")
+    parser.add_argument('--output', type=Path, help="Guardar el informe en JSON")
+    parser.add_argument('--baseline', type=Path, help="Informe JSON previo para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--max-p95', action='append', default=[], metavar='ETAPA=SEGUNDOS')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    max_p95 = {stage: float(limit) for stage, limit in (item.split('=', 1) for item in args.max_p95)}
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline else None
+    script = args.script.resolve() if args.script else None
+    output = args.output.resolve() if args.output else None
+
+    latency = LatencyModel(args.distribution, args.latency, args.jitter, seed=args.seed)
+    cwd = os.getcwd()
+    with StubLLMServer(script=script, latency=latency, chunk_delay=args.chunk_delay) as server, \
+            tempfile.TemporaryDirectory(prefix='lux-bench-') as workdir:
+        configure_environment(server)
+        # Las rutas resources/ son relativas: se aíslan en un directorio temporal
+        os.chdir(workdir)
+        try:
+            report = PipelineBenchmark(args.iterations, args.warmup).run()
+        finally:
+            os.chdir(cwd)
+
+    print(format_report(report))
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    problems = check_regressions(report, baseline, args.tolerance, max_p95)
+    for problem in problems:
+        print(f"REGRESIÓN: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
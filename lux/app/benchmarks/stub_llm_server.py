@@ -0,0 +1,294 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Union
+from urllib.parse import urlparse
+
+logger = logging.getLogger('lux.benchmarks')
+
+# Respuestas por defecto: cubren generación de código, análisis, traducción y chat
+DEFAULT_SCRIPT: List[Dict[str, Any]] = [
+    {
+        "pattern": r"NOMBRE:\s*(\w+)",
+        "response": "```python\ndef \\1() -> str:\n"
+                    "    '''Función generada por el servidor de pruebas'''\n"
+                    "    return \"Operación completada exitosamente\"\n```"
+    },
+    {"pattern": r"ANALIZA ESTA PETICIÓN", "response": "NO"},
+    {"pattern": r"hora", "function_call": {"name": "obtener_hora", "args": {}}},
+    {"pattern": r"CONVIERTE ESTE RESULTADO", "response": "¡Listo! Aquí tienes el resultado."},
+    {
+        "pattern": r"",
+        "response": "Hola, soy Luxion. Esta es una respuesta simulada. "
+                    "Sirve para medir la latencia del asistente sin conexión."
+    }
+]
+
+class LatencyModel:
+    """
+    Latencia simulada por respuesta, determinista con semilla
+    Distribuciones: 'fixed', 'uniform', 'normal', 'lognormal'
+    """
+
+    def __init__(self, distribution: str = 'fixed', mean: float = 0.0, jitter: float = 0.0,
+                 seed: Optional[int] = 0):
+        if distribution not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Distribución no soportada: {distribution}")
+        self.distribution = distribution
+        self.mean = mean      # segundos
+        self.jitter = jitter  # semiancho (uniform) o desviación típica (normal/lognormal)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == 'fixed' or self.mean <= 0:
+                value = self.mean
+            elif self.distribution == 'uniform':
+                value = self._random.uniform(self.mean - self.jitter, self.mean + self.jitter)
+            elif self.distribution == 'normal':
+                value = self._random.gauss(self.mean, self.jitter)
+            else:
+                # lognormal con la media indicada: cola larga como las APIs reales
+                sigma = self.jitter / self.mean if self.jitter else 0.0
+                value = self.mean * self._random.lognormvariate(-sigma ** 2 / 2, sigma)
+        return max(0.0, value)
+
+class StubLLMServer:
+    """
+    Servidor HTTP local que imita la API de chat de OpenRouter
+    (POST /api/v1/chat/completions) y la REST de Gemini
+    (POST /v1beta/models/<modelo>:generateContent | :streamGenerateContent),
+    con respuestas guionizadas y latencia configurable.
+
+    Cada regla del guion tiene 'pattern' (regex sobre el último mensaje del
+    usuario) y 'response' (texto, admite referencias \\1 a grupos) o
+    'function_call' ({'name', 'args'}; solo aplica si la petición declara esa
+    función). Gana la primera regla que coincide.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 script: Optional[Union[List[Dict[str, Any]], str, Path]] = None,
+                 latency: Optional[LatencyModel] = None, chunk_delay: float = 0.0,
+                 chunk_words: int = 3):
+        """
+        Args:
+            host: Interfaz de escucha
+            port: Puerto (0 = libre aleatorio)
+            script: Reglas del guion o ruta a un JSON con ellas
+            latency: Latencia hasta la primera respuesta (o primer fragmento en streaming)
+            chunk_delay: Pausa entre fragmentos en streaming
+            chunk_words: Palabras por fragmento en streaming
+        """
+        if isinstance(script, (str, Path)):
+            script = json.loads(Path(script).read_text(encoding='utf-8'))
+        self.script = [dict(rule, regex=re.compile(rule.get('pattern', ''), re.IGNORECASE))
+                       for rule in (script or DEFAULT_SCRIPT)]
+        self.latency = latency or LatencyModel()
+        self.chunk_delay = chunk_delay
+        self.chunk_words = chunk_words
+        self.requests: List[Dict[str, Any]] = []  # historial de peticiones recibidas
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openrouter_url(self) -> str:
+        return f"{self.base_url}/api/v1/chat/completions"
+
+    @property
+    def gemini_url(self) -> str:
+        return f"{self.base_url}/v1beta"
+
+    def start(self) -> 'StubLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Servidor LLM local escuchando en {self.base_url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'StubLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Guion
+
+    def respond(self, prompt: str, tools: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Respuesta guionizada para un prompt
+        Returns:
+            {'text': str} o {'function_call': {'name', 'args'}}
+        """
+        for rule in self.script:
+            match = rule['regex'].search(prompt)
+            if not match:
+                continue
+            call = rule.get('function_call')
+            if call:
+                if tools and call['name'] in tools:
+                    return {'function_call': call}
+                continue
+            return {'text': match.expand(rule.get('response', ''))}
+        return {'text': ''}
+
+    def _chunks(self, text: str) -> List[str]:
+        words = re.findall(r'\S+\s*', text)
+        return ["".join(words[i:i + self.chunk_words]) for i in range(0, len(words), self.chunk_words)] or [text]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug("stub: " + format % args)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "JSON inválido"}})
+                    return
+
+                path = urlparse(self.path).path
+                server.requests.append({'path': path, 'body': body})
+                time.sleep(server.latency.sample())
+
+                try:
+                    if path.endswith('/chat/completions'):
+                        self._openrouter(body)
+                    elif path.endswith(':generateContent'):
+                        self._gemini(body, stream=False)
+                    elif path.endswith(':streamGenerateContent'):
+                        self._gemini(body, stream=True)
+                    else:
+                        self._send_json(404, {"error": {"message": f"Ruta desconocida: {path}"}})
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente dejó de leer el stream (p. ej. al medir el primer fragmento)
+                    self.close_connection = True
+
+            # Formato OpenRouter (OpenAI chat completions)
+
+            def _openrouter(self, body: Dict[str, Any]):
+                messages = body.get('messages') or []
+                prompt = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+                text = server.respond(prompt).get('text', '')
+                model = body.get('model', 'stub')
+
+                if not body.get('stream'):
+                    self._send_json(200, {
+                        "id": "stub-completion",
+                        "object": "chat.completion",
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop"
+                        }]
+                    })
+                    return
+
+                self._start_sse()
+                for chunk in server._chunks(text):
+                    self._send_event({"model": model, "choices": [{"index": 0, "delta": {"content": chunk}}]})
+                    time.sleep(server.chunk_delay)
+                self._send_raw("data: [DONE]\n\n")
+                self._end_chunked()
+
+            # Formato Gemini (generateContent / streamGenerateContent)
+
+            def _gemini(self, body: Dict[str, Any], stream: bool):
+                contents = body.get('contents') or []
+                last = contents[-1] if contents else {}
+                tools = [
+                    declaration.get('name')
+                    for tool in body.get('tools') or []
+                    for declaration in tool.get('function_declarations') or tool.get('functionDeclarations') or []
+                ]
+                parts = last.get('parts') or []
+
+                if any('functionResponse' in part for part in parts):
+                    # Segunda vuelta: redactar la respuesta con el resultado de la función
+                    result = parts[0]['functionResponse'].get('response', {})
+                    reply = {'text': f"Listo. {result.get('content', '')}".strip()}
+                else:
+                    prompt = "".join(part.get('text', '') for part in parts)
+                    reply = server.respond(prompt, tools)
+
+                if 'function_call' in reply:
+                    content_parts = [{"functionCall": reply['function_call']}]
+                else:
+                    content_parts = [{"text": reply['text']}]
+
+                if not stream:
+                    self._send_json(200, self._gemini_payload(content_parts))
+                    return
+
+                self._start_sse()
+                if 'function_call' in reply:
+                    self._send_event(self._gemini_payload(content_parts))
+                else:
+                    for chunk in server._chunks(reply['text']):
+                        self._send_event(self._gemini_payload([{"text": chunk}]))
+                        time.sleep(server.chunk_delay)
+                self._end_chunked()
+
+            @staticmethod
+            def _gemini_payload(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+                return {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": parts},
+                        "finishReason": "STOP",
+                        "index": 0
+                    }]
+                }
+
+            # Envío
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_sse(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+            def _send_event(self, payload: Dict[str, Any]):
+                self._send_raw(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n")
+
+            def _send_raw(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def _end_chunked(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -16,6 +16,141 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///lux.db')
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'tu-api-key-aquí')
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
+GEMINI_API_URL = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta')
+# 'sdk': cliente google-generativeai | 'rest': API REST por el transporte HTTP compartido
+GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'sdk').lower()
+OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
+
+# Funciones
+# 'native': una sola conversación con declaraciones de funciones de Gemini
+# 'legacy': análisis YES/NO/NEW + ejecución + traducción por separado
+FUNCTION_CALLING_MODE = os.getenv('FUNCTION_CALLING_MODE', 'native').lower()
+# Confianza mínima (similitud coseno) para enrutar sin LLM y margen sobre la segunda opción
+FUNCTION_INDEX_THRESHOLD = float(os.getenv('FUNCTION_INDEX_THRESHOLD', '0.8'))
+FUNCTION_INDEX_MARGIN = float(os.getenv('FUNCTION_INDEX_MARGIN', '0.05'))
+# Funciones incluidas en el prompt de análisis: las k más relevantes + las fijas,
+# limitadas por un presupuesto aproximado de tokens
+PROMPT_TOP_K = int(os.getenv('PROMPT_TOP_K', '8'))
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '600'))
+PROMPT_PINNED_FUNCTIONS = [
+    name.strip() for name in os.getenv('PROMPT_PINNED_FUNCTIONS', 'obtener_hora,abrir_aplicacion').split(',')
+    if name.strip()
+]
+# Recarga en caliente de resources/functions (sondeo del directorio)
+FUNCTION_WATCH_ENABLED = os.getenv('FUNCTION_WATCH_ENABLED', 'True').lower() == 'true'
+FUNCTION_WATCH_INTERVAL = float(os.getenv('FUNCTION_WATCH_INTERVAL', '1.0'))  # segundos entre sondeos
+FUNCTION_WATCH_DEBOUNCE = float(os.getenv('FUNCTION_WATCH_DEBOUNCE', '0.5'))  # calma exigida tras una ráfaga
+# Segundos entre volcados a SQLite de las estadísticas de uso del registro (0 = solo al cerrar)
+FUNCTION_STATS_FLUSH_INTERVAL = float(os.getenv('FUNCTION_STATS_FLUSH_INTERVAL', '5'))
+
+# Ejecución de funciones
+# 'process': pool de procesos precalentados con límites propios | 'thread': hilo del proceso principal
+SAFE_EXECUTOR_MODE = os.getenv('SAFE_EXECUTOR_MODE', 'process').lower()
+SAFE_EXECUTOR_WORKERS = int(os.getenv('SAFE_EXECUTOR_WORKERS', '2'))
+SAFE_EXECUTOR_MAX_TASKS = int(os.getenv('SAFE_EXECUTOR_MAX_TASKS', '100'))  # ejecuciones antes de reciclar un trabajador
+SAFE_EXECUTOR_MAX_PROCESSES = int(os.getenv('SAFE_EXECUTOR_MAX_PROCESSES', '0'))  # RLIMIT_NPROC del trabajador (0 = sin límite)
+# Módulos preimportados en el forkserver
+SAFE_EXECUTOR_PRELOAD = [
+    m.strip() for m in os.getenv('SAFE_EXECUTOR_PRELOAD', 'json,datetime,math,random,re,pathlib').split(',')
+    if m.strip()
+]
+# Planificador de ejecuciones: simultáneas en total y por función (0 = sin límite por función)
+EXECUTION_MAX_CONCURRENT = int(os.getenv('EXECUTION_MAX_CONCURRENT', '4'))
+EXECUTION_MAX_PER_FUNCTION = int(os.getenv('EXECUTION_MAX_PER_FUNCTION', '2'))
+# Límites por función: "nombre:n,nombre:n"
+EXECUTION_FUNCTION_LIMITS = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split(':', 1) for item in os.getenv('EXECUTION_FUNCTION_LIMITS', '').split(',') if ':' in item
+    )
+}
+# Tiempo límite por función: p99 de sus latencias x multiplicador, entre mínimo y máximo (segundos)
+ADAPTIVE_TIMEOUT_ENABLED = os.getenv('ADAPTIVE_TIMEOUT_ENABLED', 'True').lower() == 'true'
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv('ADAPTIVE_TIMEOUT_MULTIPLIER', '4'))
+ADAPTIVE_TIMEOUT_FLOOR = float(os.getenv('ADAPTIVE_TIMEOUT_FLOOR', '0.5'))
+ADAPTIVE_TIMEOUT_CEILING = float(os.getenv('ADAPTIVE_TIMEOUT_CEILING', '120'))
+ADAPTIVE_TIMEOUT_DEFAULT = float(os.getenv('ADAPTIVE_TIMEOUT_DEFAULT', '30'))  # sin historial suficiente
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv('ADAPTIVE_TIMEOUT_MIN_SAMPLES', '5'))
+ADAPTIVE_TIMEOUT_WINDOW = int(os.getenv('ADAPTIVE_TIMEOUT_WINDOW', '100'))  # muestras recientes por función
+
+# Perfilado de ejecuciones (cProfile + muestreo de pilas); también por función en el registro
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('resources', 'logs', 'profiles'))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))  # segundos entre muestras
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '10'))  # marcos más costosos en el resumen
+
+# Funciones con interfaz PyQt: proceso anfitrión con un único QApplication
+GUI_HOST_ENABLED = os.getenv('GUI_HOST_ENABLED', 'True').lower() == 'true'
+GUI_HOST_OPEN_TIMEOUT = float(os.getenv('GUI_HOST_OPEN_TIMEOUT', '15'))  # segundos hasta que la ventana se abre
+
+# Dependencias de funciones generadas
+# Directorio de wheels locales: si contiene paquetes se instala desde él sin conexión
+DEPENDENCY_WHEELHOUSE = os.getenv('DEPENDENCY_WHEELHOUSE', os.path.join('resources', 'wheelhouse'))
+# True: nunca acudir a PyPI aunque falte un paquete en el wheelhouse
+DEPENDENCY_OFFLINE_ONLY = os.getenv('DEPENDENCY_OFFLINE_ONLY', 'False').lower() == 'true'
+DEPENDENCY_INSTALL_TIMEOUT = float(os.getenv('DEPENDENCY_INSTALL_TIMEOUT', '300'))  # segundos por lote
+# Segundos que se agrupan los cambios de dependencies.json y permissions.json antes de escribirlos
+JSON_STORE_WRITE_DELAY = float(os.getenv('JSON_STORE_WRITE_DELAY', '0.5'))
+# Entornos aislados por conjunto de dependencias, compartidos entre funciones
+DEPENDENCY_ENVS_ENABLED = os.getenv('DEPENDENCY_ENVS_ENABLED', 'True').lower() == 'true'
+DEPENDENCY_ENV_DIR = os.getenv('DEPENDENCY_ENV_DIR', os.path.join('resources', 'envs'))
+DEPENDENCY_ENV_KEEP_UNUSED = int(os.getenv('DEPENDENCY_ENV_KEEP_UNUSED', '3'))  # entornos sin funciones que se conservan
+
+# Reparación de funciones generadas
+# 'parallel': varios candidatos (de distintos modelos) a la vez | 'sequential': uno tras otro
+TEST_REPAIR_MODE = os.getenv('TEST_REPAIR_MODE', 'parallel').lower()
+TEST_REPAIR_CANDIDATES = int(os.getenv('TEST_REPAIR_CANDIDATES', '4'))
+
+# Transporte HTTP compartido
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_MAX_PER_HOST = int(os.getenv('HTTP_MAX_PER_HOST', '8'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.3'))  # segundos, base del backoff exponencial
+
+# Caché de respuestas de chat
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', str(24 * 3600)))  # segundos
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(10 * 1024 * 1024)))
+# Similitud mínima (0-1) para aceptar reformulaciones cercanas (opcional, p. ej. 0.85).
+# Desactivada por defecto: una pregunta parecida puede pedir una respuesta distinta
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0'))
+
+# Caché de código generado y veredictos de análisis (por hash de contenido)
+ARTIFACT_CACHE_ENABLED = os.getenv('ARTIFACT_CACHE_ENABLED', 'True').lower() == 'true'
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv('ARTIFACT_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Caché de resultados de funciones (memoización por función, código y argumentos)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(5 * 1024 * 1024)))
+# TTL (segundos) inferido del código: sin estado externo | con consultas de red
+RESULT_CACHE_PURE_TTL = float(os.getenv('RESULT_CACHE_PURE_TTL', str(24 * 3600)))
+RESULT_CACHE_NETWORK_TTL = float(os.getenv('RESULT_CACHE_NETWORK_TTL', '600'))
+
+# Enrutamiento de modelos
+# Modelos candidatos por clase de petición, en orden de preferencia
+MODEL_ROUTES = {
+    request_class: [m.strip() for m in os.getenv(f'MODEL_ROUTES_{request_class.upper()}', default).split(',') if m.strip()]
+    for request_class, default in (
+        ('chat', 'gemini,gpt4,claude,deepseek'),
+        ('routing', 'gemini,gpt4'),
+        ('codegen', 'gemini,claude,deepseek,gpt4'),
+    )
+}
+# Clases sensibles a la latencia: se envía una segunda petición si la primera supera su p95
+MODEL_HEDGE_CLASSES = [c.strip() for c in os.getenv('MODEL_HEDGE_CLASSES', 'chat,routing').split(',') if c.strip()]
+MODEL_HEDGE_DELAY = float(os.getenv('MODEL_HEDGE_DELAY', '2.0'))  # segundos, sin historial de latencia
+MODEL_BREAKER_THRESHOLD = int(os.getenv('MODEL_BREAKER_THRESHOLD', '3'))  # fallos consecutivos
+MODEL_BREAKER_COOLDOWN = float(os.getenv('MODEL_BREAKER_COOLDOWN', '60'))  # segundos
+# Espera máxima (segundos) a que el límite de tasa de un proveedor se reponga antes de cambiar de modelo
+MODEL_RATE_LIMIT_WAIT = float(os.getenv('MODEL_RATE_LIMIT_WAIT', '0.5'))
+# Límite de tasa por proveedor: "peticiones_por_segundo,ráfaga"
+RATE_LIMITS = {
+    provider: tuple(float(v) for v in os.getenv(f'RATE_LIMIT_{provider.upper()}', default).split(','))
+    for provider, default in (('google', '1,5'), ('openrouter', '2,10'))
+}
 
 # Logging
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,88 @@
+import logging
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional, Union
+
+from .. import config
+from .json_store import JsonStore
+
+logger = logging.getLogger('lux.executor')
+
+class AdaptiveTimeouts:
+    """
+    Tiempo límite por función a partir de su historial de latencias: p99 de
+    las últimas ejecuciones multiplicado por un margen y acotado entre un
+    mínimo y un máximo. Una función rápida que se cuelga falla en fracciones
+    de segundo; una lenta pero legítima no se mata a los 30 s.
+
+    Las funciones sin historial suficiente usan el límite por defecto. Una
+    ejecución que agota su límite cuenta como muestra de ese límite, así que
+    los tiempos límite de una función que se volvió más lenta crecen (hasta
+    el máximo) en lugar de fallar siempre. Las muestras se guardan en disco
+    para no reaprender en cada arranque.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, multiplier: Optional[float] = None,
+                 floor: Optional[float] = None, ceiling: Optional[float] = None,
+                 min_samples: Optional[int] = None, window: Optional[int] = None,
+                 default: Optional[float] = None):
+        """
+        Args:
+            path: Archivo de muestras (None = solo en memoria)
+            multiplier: Margen sobre el p99
+            floor, ceiling: Límites del tiempo calculado (segundos)
+            min_samples: Muestras necesarias antes de adaptar el límite
+            window: Muestras recientes que se conservan por función
+            default: Límite mientras no hay historial suficiente
+        """
+        self.multiplier = config.ADAPTIVE_TIMEOUT_MULTIPLIER if multiplier is None else multiplier
+        self.floor = config.ADAPTIVE_TIMEOUT_FLOOR if floor is None else floor
+        self.ceiling = config.ADAPTIVE_TIMEOUT_CEILING if ceiling is None else ceiling
+        self.min_samples = config.ADAPTIVE_TIMEOUT_MIN_SAMPLES if min_samples is None else min_samples
+        self.window = config.ADAPTIVE_TIMEOUT_WINDOW if window is None else window
+        self.default = config.ADAPTIVE_TIMEOUT_DEFAULT if default is None else default
+
+        self._lock = threading.Lock()
+        self._store = JsonStore(path) if path is not None else None
+        self._samples: Dict[str, Deque[float]] = {}
+        self._deadlines: Dict[str, float] = {}
+        if self._store:
+            for name, samples in self._store.snapshot().items():
+                self._samples[name] = deque(samples[-self.window:], maxlen=self.window)
+                self._update(name)
+
+    def _update(self, name: str):
+        """Recalcula el límite de una función (con el lock tomado o al construir)"""
+        samples = self._samples[name]
+        if len(samples) < self.min_samples:
+            self._deadlines.pop(name, None)
+            return
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, math.ceil(0.99 * len(ordered)) - 1)]
+        self._deadlines[name] = min(self.ceiling, max(self.floor, p99 * self.multiplier))
+
+    def record(self, name: str, seconds: float):
+        """Añade la latencia de una ejecución (o el límite que agotó)"""
+        with self._lock:
+            samples = self._samples.setdefault(name, deque(maxlen=self.window))
+            samples.append(round(seconds, 4))
+            self._update(name)
+            if self._store:
+                self._store.set(name, list(samples))
+
+    def deadline(self, name: str, override: Optional[float] = None) -> float:
+        """Tiempo límite de la próxima ejecución; override (metadatos del registro) manda"""
+        if override:
+            return float(override)
+        with self._lock:
+            return self._deadlines.get(name, self.default)
+
+    def forget(self, name: str):
+        """Descarta el historial (la función cambió o se eliminó)"""
+        with self._lock:
+            self._samples.pop(name, None)
+            self._deadlines.pop(name, None)
+            if self._store:
+                self._store.pop(name)
@@ -1,22 +1,23 @@
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 import google.generativeai as genai
 from .. import config
 from pathlib import Path
-import importlib.util
 
 logger = logging.getLogger('lux.functions')
 
 class AIManager:
+    SYSTEM_PROMPT = "Eres Luxion, un asistente virtual amigable y servicial."
+
     def __init__(self):
         """
         Inicializa el gestor de IA.
         """
+        self.function_manager = None  # Se establecerá después
+        self.ai_service = None  # Se establecerá después
         try:
             genai.configure(api_key=config.GEMINI_API_KEY)
             self.gemini = genai.GenerativeModel('gemini-pro')
-            self.function_manager = None  # Se establecerá después
-            self.ai_service = None  # Se establecerá después
             logger.info("AIManager inicializado")
         except Exception as e:
             logger.error(f"Error al inicializar Gemini: {e}")
@@ -40,6 +41,14 @@ class AIManager:
         try:
             logger.info(f"Procesando mensaje: {message}")
             
+            # Con AIService disponible se aprovecha la caché de respuestas
+            if self.ai_service:
+                text = self.ai_service.chat_with_model(message, system_prompt=self.SYSTEM_PROMPT)
+                if text:
+                    text = text.strip()
+                    logger.info(f"Respuesta generada: {text}")
+                    return text
+            
             if self.gemini:
                 # Agregar contexto al prompt
                 prompt = f"""Eres Luxion, un asistente virtual amigable y servicial.
@@ -65,6 +74,30 @@ class AIManager:
             logger.error(f"Error en chat: {e}")
             return "Disculpa, tuve un problema al procesar tu mensaje."
     
+    def chat_stream(self, message: str) -> Iterator[str]:
+        """Igual que chat pero retorna la respuesta en fragmentos mientras se genera"""
+        try:
+            logger.info(f"Procesando mensaje (streaming): {message}")
+            produced = False
+            
+            if self.ai_service:
+                for chunk in self.ai_service.stream_chat(message, system_prompt=self.SYSTEM_PROMPT):
+                    produced = True
+                    yield chunk
+            elif self.gemini:
+                prompt = f"{self.SYSTEM_PROMPT}\n\n{message}"
+                for chunk in self.gemini.generate_content(prompt, stream=True):
+                    if chunk.text:
+                        produced = True
+                        yield chunk.text
+            
+            if not produced:
+                yield "Lo siento, no pude procesar tu mensaje correctamente."
+                
+        except Exception as e:
+            logger.error(f"Error en chat_stream: {e}")
+            yield "Disculpa, tuve un problema al procesar tu mensaje."
+    
     def analyze_intent(self, message: str) -> Dict[str, any]:
         """
         Analiza la intención del mensaje del usuario.
@@ -219,6 +252,18 @@ class AIManager:
             logger.info("ANÁLISIS DE SOLICITUD DE FUNCIÓN")
             logger.info(f"Texto a analizar: '{text}'")
             
+            # Coincidencias de alta confianza se resuelven sin LLM
+            if self.function_manager:
+                local_function = self.function_manager.route_locally(text)
+                if local_function:
+                    logger.info(f"Resuelto por índice local: {local_function}")
+                    return {
+                        "type": "YES",
+                        "function_name": local_function,
+                        "extra_info": "",
+                        "description": ""
+                    }
+            
             prompt = f"""
             Analiza el siguiente texto y determina si pide ejecutar una función existente o crear una nueva.
             
@@ -373,12 +418,10 @@ class AIManager:
             if function_type != "game" and extension == '.py':
                 # Solo registrar en el function_manager si es Python y no es juego
                 try:
-                    spec = importlib.util.spec_from_file_location(name, file_path)
-                    if spec and spec.loader:
-                        module = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(module)
-                        func = getattr(module, name)
-                        self.function_manager.functions[name] = func
+                    # Solo se analiza: el módulo se importará en su primera ejecución
+                    self.function_manager.reload_files(changed=[file_path])
+                    if name not in self.function_manager.functions:
+                        raise AttributeError(f"El código no define la función {name}")
                 except Exception as e:
                     logger.error(f"Error registrando función: {e}")
                     return {"success": False, "error": str(e)}
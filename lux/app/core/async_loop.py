@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional, Coroutine, Any
+
+logger = logging.getLogger('lux.executor')
+
+class AsyncLoopThread:
+    """
+    Bucle asyncio en un hilo dedicado. Las funciones async de todas las
+    peticiones comparten este hilo: mientras una espera E/S, las demás avanzan.
+    """
+
+    def __init__(self, name: str = 'lux-async-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """Programa una corrutina en el bucle desde cualquier hilo"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self):
+        """Cancela las tareas pendientes y detiene el bucle"""
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.running:
+            try:
+                self.submit(cancel_all()).result(timeout=2)
+            except Exception as e:
+                logger.debug(f"Error cancelando tareas async: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+
+_loop: Optional[AsyncLoopThread] = None
+_loop_lock = threading.Lock()
+
+def get_async_loop() -> AsyncLoopThread:
+    """Retorna el bucle asyncio compartido, arrancándolo en el primer uso"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or not _loop.running:
+            _loop = AsyncLoopThread()
+        return _loop
@@ -0,0 +1,312 @@
+import ast
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple, FrozenSet, List
+
+logger = logging.getLogger('lux.analysis')
+
+# Módulos cuyo uso implica acceso a red
+NETWORK_MODULES = frozenset({'socket', 'urllib', 'urllib3', 'requests', 'http', 'httpx', 'aiohttp', 'ftplib'})
+# Módulos cuyo resultado depende del momento, del azar o del sistema, o que
+# tienen efectos visibles: sus funciones no se memoizan
+VOLATILE_MODULES = frozenset({
+    'datetime', 'time', 'calendar', 'random', 'secrets', 'uuid', 'os', 'sys', 'subprocess',
+    'shutil', 'glob', 'tempfile', 'pathlib', 'sqlite3', 'webbrowser', 'psutil', 'pyautogui',
+    'pygame', 'pyttsx3', 'speech_recognition', 'tkinter', 'PyQt6', 'PyQt5', 'PySide6', 'PySide2'
+})
+VOLATILE_CALLS = frozenset({'input', 'exec', 'eval'})
+# Llamadas (último segmento) que abren o modifican archivos
+FILE_CALLS = frozenset({'open', 'Path'})
+FILE_WRITE_CALLS = frozenset({
+    'write', 'writelines', 'write_text', 'write_bytes', 'mkdir', 'makedirs', 'touch',
+    'unlink', 'remove', 'rmdir', 'rmtree', 'rename', 'replace', 'copy', 'copyfile', 'move'
+})
+
+@dataclass(frozen=True)
+class ImportFact:
+    module: str  # módulo completo ('os.path', 'PyQt6.QtWidgets')
+    names: Tuple[str, ...]  # nombres importados con from ... import
+    line: int
+
+    @property
+    def top_level(self) -> str:
+        return self.module.split('.')[0]
+
+@dataclass(frozen=True)
+class CallFact:
+    name: str  # nombre con puntos ('open', 'os.system', 'f.write'); '' si es dinámico
+    line: int
+    first_arg: Optional[str]  # primer argumento si es un literal str (p. ej. la ruta de open)
+    mode: Optional[str]  # modo literal de open (segundo argumento o mode=)
+
+    @property
+    def attr(self) -> str:
+        """Último segmento del nombre ('write' para 'f.write')"""
+        return self.name.rsplit('.', 1)[-1]
+
+@dataclass(frozen=True)
+class LoopFact:
+    kind: str  # 'for' | 'while'
+    line: int
+    depth: int  # 1 = bucle no anidado
+    has_exit: bool  # contiene break o return
+
+@dataclass(frozen=True)
+class FunctionFact:
+    name: str
+    line: int
+    docstring: Optional[str]
+    has_try: bool
+    args: Tuple[str, ...]
+    signature: str = "()"  # firma tal como aparece en el código: '(texto: str) -> str'
+    top_level: bool = False  # definida a nivel de módulo (no anidada ni método)
+    is_async: bool = False  # async def
+    is_generator: bool = False  # contiene yield: entrega el resultado por fragmentos
+
+@dataclass(frozen=True)
+class CodeFacts:
+    """
+    Hechos de un código Python obtenidos con un único parseo y un único recorrido
+    del AST. Inmutable: lo comparten SecurityAnalyzer, PermissionManager,
+    DependencyManager, TestManager y AIService.validate_code.
+    """
+    syntax_error: Optional[str]
+    imports: Tuple[ImportFact, ...] = ()
+    calls: Tuple[CallFact, ...] = ()
+    loops: Tuple[LoopFact, ...] = ()
+    functions: Tuple[FunctionFact, ...] = ()
+    has_try: bool = False
+    has_validation: bool = False  # comparaciones o llamadas dentro de un if
+    name_count: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return self.syntax_error is None
+
+    @property
+    def modules(self) -> FrozenSet[str]:
+        """Módulos de primer nivel importados"""
+        return frozenset(fact.top_level for fact in self.imports if fact.module)
+
+    @property
+    def file_operations(self) -> Tuple[CallFact, ...]:
+        return tuple(call for call in self.calls if call.attr in FILE_CALLS)
+
+    @property
+    def file_writes(self) -> Tuple[CallFact, ...]:
+        return tuple(
+            call for call in self.calls
+            if call.attr in FILE_WRITE_CALLS
+            or (call.attr == 'open' and call.mode and set(call.mode) & set('wax+'))
+        )
+
+    @property
+    def network_operations(self) -> Tuple[CallFact, ...]:
+        return tuple(call for call in self.calls if call.name.split('.')[0] in NETWORK_MODULES)
+
+    @property
+    def cache_class(self) -> Optional[str]:
+        """
+        Clase de memoización del código: 'pure' si el resultado depende solo de
+        los argumentos, 'network' si consulta datos externos (cambian despacio)
+        y None si no debe memoizarse (hora, azar, archivos, efectos)
+        """
+        if not self.valid or self.modules & VOLATILE_MODULES or self.file_operations or \
+                any(call.name in VOLATILE_CALLS for call in self.calls):
+            return None
+        if self.modules & NETWORK_MODULES:
+            return 'network'
+        return 'pure'
+
+    def function(self, name: str) -> Optional[FunctionFact]:
+        return next((fact for fact in self.functions if fact.name == name), None)
+
+    @property
+    def first_function_name(self) -> str:
+        return self.functions[0].name if self.functions else ""
+
+class _FactsVisitor(ast.NodeVisitor):
+    """Recorre el AST una sola vez acumulando los hechos"""
+
+    def __init__(self):
+        self.imports: List[ImportFact] = []
+        self.calls: List[CallFact] = []
+        self.loops: List[LoopFact] = []
+        self.functions: List[FunctionFact] = []
+        self.has_try = False
+        self.has_validation = False
+        self.name_count = 0
+        self._loop_depth = 0
+        self._if_depth = 0
+        # Pila de indicadores "contiene break/return" de los bucles abiertos
+        self._loop_exits: List[bool] = []
+        # Pila de indicadores "contiene try" de las funciones abiertas
+        self._function_tries: List[bool] = []
+        # Pila de indicadores "contiene yield" (propio, sin contar funciones anidadas)
+        self._function_yields: List[bool] = []
+        # Funciones y clases abiertas
+        self._scope_depth = 0
+
+    @staticmethod
+    def _dotted_name(node: ast.AST) -> str:
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if isinstance(node, ast.Name):
+            parts.append(node.id)
+        elif parts:
+            # Receptor no nombrable (p. ej. open(...).write): se conserva el atributo
+            parts.append('')
+        else:
+            return ''
+        return '.'.join(reversed(parts)).lstrip('.')
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.append(ImportFact(alias.name, (), node.lineno))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module:
+            self.imports.append(ImportFact(node.module, tuple(a.name for a in node.names), node.lineno))
+
+    def visit_Call(self, node: ast.Call):
+        def literal(value: Optional[ast.AST]) -> Optional[str]:
+            if isinstance(value, ast.Constant) and isinstance(value.value, str):
+                return value.value
+            return None
+
+        mode_node = node.args[1] if len(node.args) > 1 else next(
+            (kw.value for kw in node.keywords if kw.arg == 'mode'), None
+        )
+        self.calls.append(CallFact(
+            self._dotted_name(node.func),
+            node.lineno,
+            literal(node.args[0]) if node.args else None,
+            literal(mode_node)
+        ))
+        if self._if_depth:
+            self.has_validation = True
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        if self._if_depth:
+            self.has_validation = True
+        self.generic_visit(node)
+
+    def visit_If(self, node: ast.If):
+        self._if_depth += 1
+        self.generic_visit(node)
+        self._if_depth -= 1
+
+    def _visit_loop(self, node: ast.AST, kind: str):
+        self._loop_depth += 1
+        self._loop_exits.append(False)
+        self.generic_visit(node)
+        has_exit = self._loop_exits.pop()
+        self.loops.append(LoopFact(kind, node.lineno, self._loop_depth, has_exit))
+        self._loop_depth -= 1
+        if has_exit and self._loop_exits:
+            self._loop_exits[-1] = True
+
+    def visit_For(self, node: ast.For):
+        self._visit_loop(node, 'for')
+
+    def visit_AsyncFor(self, node: ast.AsyncFor):
+        self._visit_loop(node, 'for')
+
+    def visit_While(self, node: ast.While):
+        self._visit_loop(node, 'while')
+
+    def _mark_exit(self):
+        if self._loop_exits:
+            self._loop_exits[-1] = True
+
+    def visit_Break(self, node: ast.Break):
+        self._mark_exit()
+
+    def visit_Return(self, node: ast.Return):
+        self._mark_exit()
+        self.generic_visit(node)
+
+    def visit_Try(self, node: ast.Try):
+        self.has_try = True
+        if self._function_tries:
+            self._function_tries[-1] = True
+        self.generic_visit(node)
+
+    visit_TryStar = visit_Try
+
+    def visit_Yield(self, node: ast.Yield):
+        if self._function_yields:
+            self._function_yields[-1] = True
+        self.generic_visit(node)
+
+    visit_YieldFrom = visit_Yield
+
+    def _visit_function(self, node):
+        top_level = self._scope_depth == 0
+        self._function_tries.append(False)
+        self._function_yields.append(False)
+        # Un return dentro de una función anidada no sale del bucle exterior
+        outer_exits, self._loop_exits = self._loop_exits, []
+        outer_depth, self._loop_depth = self._loop_depth, 0
+        self._scope_depth += 1
+        self.generic_visit(node)
+        self._scope_depth -= 1
+        self._loop_exits, self._loop_depth = outer_exits, outer_depth
+        has_try = self._function_tries.pop()
+        is_generator = self._function_yields.pop()
+        if has_try and self._function_tries:
+            self._function_tries[-1] = True
+
+        signature = f"({ast.unparse(node.args)})"
+        if node.returns is not None:
+            signature += f" -> {ast.unparse(node.returns)}"
+        self.functions.append(FunctionFact(
+            node.name, node.lineno, ast.get_docstring(node), has_try,
+            tuple(arg.arg for arg in node.args.args), signature, top_level,
+            isinstance(node, ast.AsyncFunctionDef), is_generator
+        ))
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self._scope_depth += 1
+        self.generic_visit(node)
+        self._scope_depth -= 1
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self._visit_function(node)
+
+    def visit_Name(self, node: ast.Name):
+        self.name_count += 1
+
+@lru_cache(maxsize=64)
+def analyze_code(code: str) -> CodeFacts:
+    """
+    Obtiene los hechos del código (un parseo y un recorrido). El resultado se
+    memoriza por texto, así que los distintos analizadores de una misma función
+    comparten el mismo objeto.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        return CodeFacts(syntax_error=str(e))
+
+    visitor = _FactsVisitor()
+    visitor.visit(tree)
+    # Orden de definición (las funciones anidadas se registran al cerrarse)
+    functions = sorted(visitor.functions, key=lambda fact: fact.line)
+    return CodeFacts(
+        syntax_error=None,
+        imports=tuple(visitor.imports),
+        calls=tuple(visitor.calls),
+        loops=tuple(sorted(visitor.loops, key=lambda fact: fact.line)),
+        functions=tuple(functions),
+        has_try=visitor.has_try,
+        has_validation=visitor.has_validation,
+        name_count=visitor.name_count
+    )
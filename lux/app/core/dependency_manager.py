@@ -1,18 +1,112 @@
-import pkg_resources
+import importlib
+import importlib.metadata
+import os
+import re
 import subprocess
 import sys
+import threading
+import time
 import logging
-from typing import Dict, List, Set, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Set, Optional, Callable, Iterable, Tuple
 from pathlib import Path
-import ast
-import json
+from .. import config
+from ..services.cache_service import get_artifact_cache
+from .code_facts import analyze_code
+from .environment_cache import EnvironmentCache
+from .json_store import JsonStore
+from .metrics import metrics
 
 logger = logging.getLogger('lux.dependencies')
 
+def normalize_name(name: str) -> str:
+    """Nombre canónico de un paquete (PEP 503): Pillow, pillow y PIL-low son el mismo"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def version_key(version: str) -> Tuple[int, ...]:
+    """Parte numérica de una versión, comparable como tupla ('2.0.0rc1' -> (2, 0, 0))"""
+    key = []
+    for part in version.split('.'):
+        match = re.match(r'\d+', part)
+        if not match:
+            break
+        key.append(int(match.group()))
+        if match.end() < len(part):
+            break
+    return tuple(key)
+
+class PackageIndex:
+    """
+    Paquetes instalados y sus versiones según importlib.metadata. Se construye
+    en el primer uso y se reconstruye solo cuando cambia la fecha de
+    modificación de algún directorio de sys.path (pip añade o borra allí los
+    .dist-info al instalar).
+    """
+
+    def __init__(self, paths: Optional[Iterable[str]] = None):
+        self._paths = list(paths) if paths is not None else None
+        self._packages: Optional[Dict[str, str]] = None
+        self._signature: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def _current_signature(self) -> tuple:
+        signature = []
+        for entry in (self._paths if self._paths is not None else sys.path):
+            try:
+                signature.append((entry, os.stat(entry or '.').st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def packages(self) -> Dict[str, str]:
+        """Nombre canónico -> versión de cada paquete instalado"""
+        signature = self._current_signature()
+        with self._lock:
+            if self._packages is None or signature != self._signature:
+                start = time.perf_counter()
+                packages = {}
+                paths = self._paths if self._paths is not None else sys.path
+                for dist in importlib.metadata.distributions(path=paths):
+                    name = dist.metadata['Name']
+                    if name:
+                        packages.setdefault(normalize_name(name), dist.version)
+                self._packages = packages
+                self._signature = signature
+                metrics.observe('dependencies.index_build', time.perf_counter() - start)
+            return self._packages
+
+    def version(self, name: str) -> Optional[str]:
+        return self.packages().get(normalize_name(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self.version(name) is not None
+
+    def invalidate(self):
+        """Fuerza la reconstrucción en la próxima consulta"""
+        with self._lock:
+            self._packages = None
+
 class DependencyManager:
-    def __init__(self):
+    def __init__(self, wheelhouse: Optional[str] = None, offline_only: Optional[bool] = None,
+                 package_index: Optional[PackageIndex] = None,
+                 environments: Optional[EnvironmentCache] = None):
+        """
+        Args:
+            wheelhouse: Directorio de wheels locales (por defecto DEPENDENCY_WHEELHOUSE)
+            offline_only: Si es True nunca se acude a PyPI
+            package_index: Índice de paquetes instalados (por defecto uno sobre sys.path)
+            environments: Caché de entornos aislados (por defecto según DEPENDENCY_ENVS_ENABLED)
+        """
         self.dependencies_file = Path("resources/dependencies.json")
-        self.installed_packages = self._get_installed_packages()
+        self._dependencies = JsonStore(self.dependencies_file)
+        self.wheelhouse = Path(config.DEPENDENCY_WHEELHOUSE if wheelhouse is None else wheelhouse)
+        self.offline_only = config.DEPENDENCY_OFFLINE_ONLY if offline_only is None else offline_only
+        self.package_index = package_index or PackageIndex()
+        if environments is None and config.DEPENDENCY_ENVS_ENABLED:
+            environments = EnvironmentCache()
+        self.environments = environments
+        # Un solo instalador en segundo plano: pip no admite instalaciones concurrentes
+        self._installer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lux-deps')
         self.allowed_packages = {
             'pygame': '2.5.0',
             'pillow': '10.0.0',
@@ -20,6 +114,7 @@ class DependencyManager:
             'pandas': '2.0.0',
             'matplotlib': '3.7.0'
         }
+        self.artifact_cache = get_artifact_cache()
         
     def analyze_dependencies(self, code: str) -> Dict[str, List[str]]:
         """
@@ -28,18 +123,8 @@ class DependencyManager:
             Dict con dependencias requeridas y conflictos
         """
         try:
-            tree = ast.parse(code)
-            imports = set()
+            imports = self._extract_imports(code)
             
-            # Extraer imports
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.add(name.name.split('.')[0])
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.add(node.module.split('.')[0])
-                        
             # Filtrar librerías estándar
             stdlib = set(sys.stdlib_module_names)
             external_deps = imports - stdlib
@@ -50,10 +135,8 @@ class DependencyManager:
             
             for dep in external_deps:
                 if dep in self.allowed_packages:
-                    if dep not in self.installed_packages:
-                        required.append(dep)
-                    elif pkg_resources.parse_version(self.installed_packages[dep]) < \
-                         pkg_resources.parse_version(self.allowed_packages[dep]):
+                    installed = self.package_index.version(dep)
+                    if installed is None or version_key(installed) < version_key(self.allowed_packages[dep]):
                         required.append(dep)
                 else:
                     conflicts.append(dep)
@@ -67,77 +150,155 @@ class DependencyManager:
             logger.error(f"Error analizando dependencias: {e}")
             return {'required': [], 'conflicts': []}
             
-    def install_dependencies(self, dependencies: List[str]) -> bool:
+    def _extract_imports(self, code: str) -> Set[str]:
         """
-        Instala las dependencias requeridas
+        Módulos de primer nivel importados por el código. Solo esto se guarda en
+        caché: los paquetes requeridos dependen además de lo instalado en cada momento
+        """
+        if self.artifact_cache:
+            cached = self.artifact_cache.get_verdict('imports', code)
+            if cached is not None:
+                return set(cached)
+        
+        facts = analyze_code(code)
+        if not facts.valid:
+            raise SyntaxError(facts.syntax_error)
+        imports = set(facts.modules)
+        
+        if self.artifact_cache:
+            self.artifact_cache.put_verdict('imports', code, sorted(imports))
+        return imports
+            
+    @property
+    def installed_packages(self) -> Dict[str, str]:
+        """Paquetes instalados con sus versiones (índice perezoso)"""
+        return self.package_index.packages()
+
+    def _pip_commands(self, specs: List[str]) -> List[List[str]]:
+        """Comandos a intentar en orden: primero solo el wheelhouse, después PyPI"""
+        base = [sys.executable, "-m", "pip", "install", "--disable-pip-version-check", "--quiet"]
+        commands = []
+        if self.wheelhouse.is_dir() and any(self.wheelhouse.glob("*.whl")):
+            commands.append(base + ["--no-index", "--find-links", str(self.wheelhouse)] + specs)
+            if not self.offline_only:
+                commands.append(base + ["--find-links", str(self.wheelhouse)] + specs)
+        elif not self.offline_only:
+            commands.append(base + specs)
+        return commands
+
+    def _specs(self, dependencies: List[str]) -> List[str]:
+        """Especificaciones fijadas de las dependencias permitidas"""
+        return sorted(
+            f"{package}=={self.allowed_packages[package]}"
+            for package in dependencies
+            if package in self.allowed_packages
+        )
+
+    def install_dependencies(self, dependencies: List[str], target: Optional[Path] = None) -> bool:
+        """
+        Instala las dependencias requeridas en un solo lote (pip resuelve todas
+        juntas), desde el wheelhouse local si existe
         Args:
             dependencies: Lista de paquetes a instalar
+            target: Directorio de un entorno aislado; None instala en el intérprete de Lux
         Returns:
             bool: True si la instalación fue exitosa
         """
-        try:
-            for package in dependencies:
-                if package in self.allowed_packages:
-                    version = self.allowed_packages[package]
-                    spec = f"{package}=={version}"
-                    
-                    logger.info(f"Instalando {spec}")
-                    subprocess.check_call([
-                        sys.executable, 
-                        "-m", 
-                        "pip", 
-                        "install", 
-                        spec
-                    ])
-                    
-            # Actualizar lista de paquetes instalados
-            self.installed_packages = self._get_installed_packages()
+        specs = self._specs(dependencies)
+        if not specs:
             return True
-            
+
+        commands = self._pip_commands(specs)
+        if target is not None:
+            commands = [command[:-len(specs)] + ["--target", str(target)] + specs for command in commands]
+        if not commands:
+            logger.error(f"Sin wheelhouse en {self.wheelhouse} y sin acceso a PyPI para instalar {', '.join(specs)}")
+            return False
+
+        start = time.perf_counter()
+        try:
+            for command in commands:
+                logger.info(f"Instalando {' '.join(specs)} {'(sin conexión)' if '--no-index' in command else ''}")
+                try:
+                    completed = subprocess.run(command, capture_output=True, text=True,
+                                               timeout=config.DEPENDENCY_INSTALL_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    logger.error(f"Tiempo agotado instalando {' '.join(specs)}")
+                    continue
+                if completed.returncode == 0:
+                    metrics.observe('dependencies.install_time', time.perf_counter() - start)
+                    return True
+                logger.warning(f"pip falló ({completed.returncode}): {completed.stderr.strip()[-500:]}")
+            metrics.increment('dependencies.install_failures')
+            return False
+
         except Exception as e:
             logger.error(f"Error instalando dependencias: {e}")
             return False
-            
-    def _get_installed_packages(self) -> Dict[str, str]:
-        """Obtiene lista de paquetes instalados con sus versiones"""
-        try:
-            installed = {}
-            for package in pkg_resources.working_set:
-                installed[package.key] = package.version
-            return installed
-        except:
-            return {}
-            
+
+        finally:
+            if target is None:
+                # Los paquetes nuevos deben verse en el índice y ser importables
+                self.package_index.invalidate()
+                importlib.invalidate_caches()
+
+    def prepare_environment(self, function_name: str, dependencies: List[str]) -> bool:
+        """
+        Asocia la función al entorno aislado de su conjunto de dependencias; solo
+        se instala si ninguna otra función había necesitado ya el mismo conjunto
+        """
+        path = self.environments.acquire(
+            function_name,
+            self._specs(dependencies),
+            lambda target: self.install_dependencies(dependencies, target=target)
+        )
+        return path is not None
+
+    def environment_for(self, function_name: str) -> Optional[str]:
+        """Directorio de paquetes de la función o None si usa el intérprete de Lux"""
+        return self.environments.environment_for(function_name) if self.environments else None
+
+    def release_environment(self, function_name: str):
+        if self.environments:
+            self.environments.release(function_name)
+
+    def install_in_background(self, dependencies: List[str],
+                              on_done: Optional[Callable[[bool], None]] = None,
+                              function_name: Optional[str] = None) -> Future:
+        """
+        Instala las dependencias fuera del hilo de la petición
+        Args:
+            on_done: Callable que recibe True/False al terminar la instalación
+            function_name: Si se indica (y hay entornos aislados) se instala en
+                el entorno compartido de su conjunto de dependencias
+        Returns:
+            Future con el bool de la instalación
+        """
+        def install() -> bool:
+            if function_name and self.environments:
+                ok = self.prepare_environment(function_name, dependencies)
+            else:
+                ok = self.install_dependencies(dependencies)
+            if on_done:
+                try:
+                    on_done(ok)
+                except Exception as e:
+                    logger.error(f"Error tras instalar dependencias: {e}")
+            return ok
+
+        return self._installer.submit(install)
+
     def save_function_dependencies(self, function_name: str, dependencies: List[str]):
         """Guarda las dependencias de una función"""
-        try:
-            data = {}
-            if self.dependencies_file.exists():
-                with open(self.dependencies_file, 'r') as f:
-                    data = json.load(f)
-                    
-            data[function_name] = {
-                'dependencies': dependencies,
-                'versions': {
-                    dep: self.allowed_packages[dep]
-                    for dep in dependencies
-                    if dep in self.allowed_packages
-                }
+        self._dependencies.set(function_name, {
+            'dependencies': dependencies,
+            'versions': {
+                dep: self.allowed_packages[dep]
+                for dep in dependencies
+                if dep in self.allowed_packages
             }
-            
-            with open(self.dependencies_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
-        except Exception as e:
-            logger.error(f"Error guardando dependencias: {e}")
+        })
             
     def get_function_dependencies(self, function_name: str) -> Dict[str, str]:
         """Obtiene las dependencias de una función"""
-        try:
-            if self.dependencies_file.exists():
-                with open(self.dependencies_file, 'r') as f:
-                    data = json.load(f)
-                    return data.get(function_name, {}).get('versions', {})
-            return {}
-        except:
-            return {} 
\ No newline at end of file
+        return self._dependencies.get(function_name, {}).get('versions', {})
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from .. import config
+from .metrics import metrics
+
+logger = logging.getLogger('lux.dependencies')
+
+class EnvironmentCache:
+    """
+    Entornos de paquetes aislados del intérprete de Lux, uno por conjunto de
+    dependencias resuelto (hash de las especificaciones fijadas). Un entorno se
+    construye una sola vez y lo comparten todas las funciones que necesitan el
+    mismo conjunto; los que ninguna función usa se conservan unos pocos (los
+    usados más recientemente) y el resto se borra.
+
+    Cada entorno es un directorio de paquetes (pip install --target) que los
+    trabajadores del SafeExecutor anteponen a sys.path: mismo intérprete y
+    mismo pool precalentado, sin tocar el site-packages del proceso principal.
+    """
+
+    def __init__(self, root: Optional[str] = None, keep_unused: Optional[int] = None):
+        """
+        Args:
+            root: Directorio de los entornos (por defecto DEPENDENCY_ENV_DIR)
+            keep_unused: Entornos sin funciones que se conservan para reutilizarlos
+        """
+        self.root = Path(config.DEPENDENCY_ENV_DIR if root is None else root)
+        self.keep_unused = config.DEPENDENCY_ENV_KEEP_UNUSED if keep_unused is None else keep_unused
+        self.index_file = self.root / "index.json"
+        self._lock = threading.RLock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    @staticmethod
+    def key(specs: Iterable[str]) -> str:
+        """Clave del conjunto de dependencias: no depende del orden ni de mayúsculas"""
+        canonical = "\n".join(sorted({spec.strip().lower() for spec in specs}))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    # Índice
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Índice de entornos ilegible, se reconstruirá: {e}")
+            return {}
+        # Entornos borrados a mano
+        return {key: entry for key, entry in index.items() if self.path(key).is_dir()}
+
+    def _save_index(self):
+        """Escritura atómica del índice (con el lock tomado)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        temporary = self.index_file.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(temporary, self.index_file)
+
+    # Entornos
+
+    def acquire(self, function_name: str, specs: List[str],
+                build: Callable[[Path], bool]) -> Optional[Path]:
+        """
+        Asocia una función al entorno de sus dependencias, construyéndolo si no existe
+        Args:
+            specs: Especificaciones fijadas ("paquete==versión")
+            build: Instala specs en el directorio recibido; retorna True si tuvo éxito
+        Returns:
+            Path del entorno o None si no se pudo construir
+        """
+        key = self.key(specs)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Dos funciones con el mismo conjunto esperan a una sola construcción
+        with build_lock:
+            with self._lock:
+                ready = key in self._index
+                if ready:
+                    self._bind(function_name, key)
+            if ready:
+                metrics.increment('environments.hits')
+                logger.info(f"Entorno {key} reutilizado para {function_name}")
+                return self.path(key)
+
+            start = time.perf_counter()
+            staging = self.root / f".{key}.building"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            try:
+                ok = build(staging)
+            except Exception as e:
+                logger.error(f"Error construyendo entorno {key}: {e}")
+                ok = False
+            if not ok:
+                shutil.rmtree(staging, ignore_errors=True)
+                return None
+
+            target = self.path(key)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+            with self._lock:
+                self._index[key] = {
+                    'specs': sorted(specs),
+                    'functions': [],
+                    'created_at': time.time(),
+                    'last_used': time.time(),
+                    'size': _directory_size(target)
+                }
+                self._bind(function_name, key)
+            metrics.increment('environments.builds')
+            metrics.observe('environments.build_time', time.perf_counter() - start)
+            logger.info(f"Entorno {key} construido para {function_name} ({', '.join(specs)})")
+            return target
+
+    def _bind(self, function_name: str, key: str):
+        """Con el lock tomado: una función pertenece a un solo entorno"""
+        for other, entry in self._index.items():
+            if other != key and function_name in entry['functions']:
+                entry['functions'].remove(function_name)
+        entry = self._index[key]
+        if function_name not in entry['functions']:
+            entry['functions'].append(function_name)
+        entry['last_used'] = time.time()
+        self._save_index()
+        self.collect()
+
+    def release(self, function_name: str):
+        """Desasocia una función (al eliminarla); su entorno puede quedar sin uso"""
+        with self._lock:
+            changed = False
+            for entry in self._index.values():
+                if function_name in entry['functions']:
+                    entry['functions'].remove(function_name)
+                    entry['last_used'] = time.time()
+                    changed = True
+            if changed:
+                self._save_index()
+                self.collect()
+
+    def environment_for(self, function_name: str) -> Optional[str]:
+        """Directorio del entorno de una función o None si usa el intérprete de Lux"""
+        with self._lock:
+            for key, entry in self._index.items():
+                if function_name in entry['functions']:
+                    return str(self.path(key))
+        return None
+
+    def collect(self) -> List[str]:
+        """
+        Borra los entornos sin funciones menos usados recientemente, conservando
+        keep_unused de ellos
+        Returns:
+            Claves de los entornos borrados
+        """
+        with self._lock:
+            unused = sorted(
+                (key for key, entry in self._index.items() if not entry['functions']),
+                key=lambda key: self._index[key]['last_used'],
+                reverse=True
+            )
+            removed = unused[max(0, self.keep_unused):]
+            for key in removed:
+                del self._index[key]
+                shutil.rmtree(self.path(key), ignore_errors=True)
+                logger.info(f"Entorno {key} eliminado (sin funciones que lo usen)")
+            if removed:
+                metrics.increment('environments.collected', len(removed))
+                self._save_index()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'environments': len(self._index),
+                'unused': sum(1 for entry in self._index.values() if not entry['functions']),
+                'size': sum(entry.get('size', 0) for entry in self._index.values())
+            }
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
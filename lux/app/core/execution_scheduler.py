@@ -0,0 +1,234 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Dict, Any, Callable, Optional, List
+
+from .. import config
+from .metrics import metrics
+
+logger = logging.getLogger('lux.executor')
+
+class Priority(IntEnum):
+    """Prioridad de una ejecución: menor valor, antes se atiende"""
+    VOICE = 0
+    CHAT = 1
+    BACKGROUND = 2  # pruebas y tareas sin usuario esperando
+
+class _Task:
+    __slots__ = ('priority', 'sequence', 'function_name', 'function', 'args', 'kwargs', 'future', 'submitted',
+                 'on_chunk', 'site_dir', 'timeout', 'profile', 'cancel', 'arguments')
+
+    def __init__(self, priority: int, sequence: int, function_name: str, function: Callable,
+                 args: tuple, kwargs: dict, on_chunk: Optional[Callable[[Any], None]] = None,
+                 site_dir: Optional[str] = None, timeout: Optional[float] = None,
+                 profile: bool = False, cancel: Optional[threading.Event] = None,
+                 arguments: Optional[Dict[str, Any]] = None):
+        self.priority = priority
+        self.sequence = sequence
+        self.function_name = function_name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.on_chunk = on_chunk
+        self.site_dir = site_dir
+        self.timeout = timeout
+        self.profile = profile or None
+        self.cancel = cancel
+        self.arguments = arguments
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+
+    def key(self):
+        return self.priority, self.sequence
+
+    def executor_kwargs(self) -> dict:
+        """Argumentos de la función más las opciones del ejecutor que se indicaron"""
+        options = {'on_chunk': self.on_chunk, 'site_dir': self.site_dir, 'timeout': self.timeout,
+                   'profile': self.profile, 'cancel': self.cancel, 'arguments': self.arguments}
+        return dict(self.kwargs, **{name: value for name, value in options.items() if value is not None})
+
+class ExecutionScheduler:
+    """
+    Planificador de ejecuciones sobre un SafeExecutor: acepta peticiones
+    concurrentes (voz, chat, pruebas), las atiende por prioridad y en orden de
+    llegada, y respeta un límite global de ejecuciones simultáneas y otro por
+    función. Cada petición recibe su propio Future con el dict de resultado.
+
+    Las funciones async se entregan al bucle asyncio del ejecutor y liberan el
+    hilo enseguida: no cuentan para el límite global (comparten un solo hilo)
+    pero sí para el de su función hasta que terminan.
+
+    Con timeouts, cada ejecución recibe el tiempo límite aprendido para su
+    función (salvo que la petición traiga el suyo) y su latencia alimenta el
+    historial.
+    """
+
+    def __init__(self, executor, max_concurrent: Optional[int] = None,
+                 max_per_function: Optional[int] = None,
+                 function_limits: Optional[Dict[str, int]] = None,
+                 timeouts=None):
+        """
+        Args:
+            executor: Objeto con execute(function, *args, **kwargs) -> Dict
+            max_concurrent: Ejecuciones simultáneas en total
+            max_per_function: Ejecuciones simultáneas de una misma función (0 = sin límite)
+            function_limits: Límites por nombre de función que sustituyen a max_per_function
+            timeouts: AdaptiveTimeouts con los tiempos límite por función (None = los del ejecutor)
+        """
+        self.executor = executor
+        self.timeouts = timeouts
+        self.max_concurrent = max(1, config.EXECUTION_MAX_CONCURRENT if max_concurrent is None else max_concurrent)
+        self.max_per_function = config.EXECUTION_MAX_PER_FUNCTION if max_per_function is None else max_per_function
+        self.function_limits = dict(config.EXECUTION_FUNCTION_LIMITS if function_limits is None else function_limits)
+
+        self._queue: List[_Task] = []
+        self._running: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f'lux-scheduler-{i}', daemon=True)
+            for i in range(self.max_concurrent)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _limit_for(self, function_name: str) -> int:
+        return self.function_limits.get(function_name, self.max_per_function)
+
+    def _runnable(self, task: _Task) -> bool:
+        limit = self._limit_for(task.function_name)
+        return not limit or self._running.get(task.function_name, 0) < limit
+
+    def _update_gauges(self):
+        metrics.set_gauge('scheduler.queue_depth', len(self._queue))
+        metrics.set_gauge('scheduler.running', sum(self._running.values()))
+
+    def submit(self, function_name: str, function: Callable, *args,
+               priority: int = Priority.CHAT, on_chunk: Optional[Callable[[Any], None]] = None,
+               site_dir: Optional[str] = None, timeout: Optional[float] = None,
+               profile: bool = False, cancel: Optional[threading.Event] = None,
+               arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Future:
+        """
+        Encola una ejecución
+        Args:
+            arguments: Argumentos con nombre de la función, separados de las opciones
+            on_chunk: Callable que recibe cada fragmento de las funciones generadoras
+            site_dir: Entorno de paquetes aislado de la función
+            timeout: Tiempo límite fijo (sustituye al aprendido)
+            profile: Perfilar la ejecución
+            cancel: Evento para abandonar la ejecución (ver SafeExecutor.execute)
+        Returns:
+            Future cuyo resultado es el dict de SafeExecutor.execute
+        """
+        if self.timeouts is not None:
+            timeout = self.timeouts.deadline(function_name, timeout)
+        task = _Task(priority, next(self._sequence), function_name, function, args, kwargs, on_chunk,
+                     site_dir, timeout, profile, cancel, arguments)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("El planificador de ejecuciones está cerrado")
+            self._queue.append(task)
+            metrics.observe('scheduler.queue_depth', len(self._queue))
+            self._update_gauges()
+            self._condition.notify_all()
+        return task.future
+
+    def execute(self, function_name: str, function: Callable, *args,
+                priority: int = Priority.CHAT, on_chunk: Optional[Callable[[Any], None]] = None,
+                site_dir: Optional[str] = None, timeout: Optional[float] = None,
+                profile: bool = False, cancel: Optional[threading.Event] = None,
+                arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Encola una ejecución y espera su resultado"""
+        return self.submit(function_name, function, *args, priority=priority, on_chunk=on_chunk,
+                           site_dir=site_dir, timeout=timeout, profile=profile, cancel=cancel,
+                           arguments=arguments, **kwargs).result()
+
+    def _next_task(self) -> Optional[_Task]:
+        """Siguiente tarea por prioridad cuya función no esté en su límite (con el lock tomado)"""
+        runnable = [task for task in self._queue if self._runnable(task)]
+        if not runnable:
+            return None
+        task = min(runnable, key=_Task.key)
+        self._queue.remove(task)
+        return task
+
+    def _run(self):
+        while True:
+            with self._condition:
+                task = None
+                while not self._closed:
+                    task = self._next_task()
+                    if task is not None:
+                        break
+                    self._condition.wait()
+                if task is None:
+                    return
+                if not task.future.set_running_or_notify_cancel():
+                    self._update_gauges()
+                    continue
+                self._running[task.function_name] = self._running.get(task.function_name, 0) + 1
+                self._update_gauges()
+
+            waited = time.perf_counter() - task.submitted
+            label = task.priority.name.lower() if isinstance(task.priority, Priority) else task.priority
+            metrics.observe('scheduler.wait_time', waited)
+            metrics.observe(f'scheduler.wait_time.{label}', waited)
+
+            kwargs = task.executor_kwargs()
+            is_async = getattr(self.executor, 'is_async', None)
+            if is_async and is_async(task.function):
+                try:
+                    pending = self.executor.execute_async(task.function, *task.args, **kwargs)
+                    pending.add_done_callback(lambda done, task=task: self._finish(task, done.result()))
+                except Exception as e:
+                    self._finish(task, error=e)
+                continue
+
+            try:
+                result = self.executor.execute(task.function, *task.args, **kwargs)
+            except Exception as e:
+                self._finish(task, error=e)
+            else:
+                self._finish(task, result)
+
+    def _finish(self, task: _Task, result: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None):
+        with self._condition:
+            self._running[task.function_name] -= 1
+            if not self._running[task.function_name]:
+                del self._running[task.function_name]
+            self._update_gauges()
+            self._condition.notify_all()
+        if error is not None:
+            logger.error(f"Error ejecutando {task.function_name}: {error}")
+            task.future.set_exception(error)
+        else:
+            self._record_latency(task, result)
+            task.future.set_result(result)
+
+    def _record_latency(self, task: _Task, result: Dict[str, Any]):
+        if self.timeouts is None or not isinstance(result, dict):
+            return
+        if result.get('success'):
+            self.timeouts.record(task.function_name, result.get('execution_time', 0.0))
+        elif result.get('type') == 'timeout' and task.timeout:
+            # Agotó el límite: la siguiente ejecución tendrá más margen
+            self.timeouts.record(task.function_name, task.timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def shutdown(self):
+        """Detiene los hilos; las ejecuciones pendientes se cancelan"""
+        with self._condition:
+            self._closed = True
+            for task in self._queue:
+                task.future.cancel()
+            self._queue.clear()
+            self._update_gauges()
+            self._condition.notify_all()
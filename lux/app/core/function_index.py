@@ -0,0 +1,267 @@
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+import numpy as np
+
+from .. import config
+from ..utils.helpers import normalize_text, char_ngrams
+
+logger = logging.getLogger('lux.functions')
+
+class FunctionIndex:
+    """
+    Índice local sobre el registro de funciones para enrutar peticiones sin LLM.
+
+    Cada función se representa con varias filas (nombre, descripción, tags y
+    frases de usuario que ya se resolvieron con éxito). Las filas son vectores
+    TF-IDF de n-gramas de caracteres proyectados con hashing a una matriz NumPy
+    de dimensión fija, así que agregar funciones nunca cambia la forma del vector.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, min_margin: Optional[float] = None,
+                 dimensions: int = 4096, max_utterances: int = 20):
+        self.threshold = config.FUNCTION_INDEX_THRESHOLD if threshold is None else threshold
+        self.min_margin = config.FUNCTION_INDEX_MARGIN if min_margin is None else min_margin
+        self.dimensions = dimensions
+        self.max_utterances = max_utterances
+        self.utterances_file = Path("resources/functions/utterances.json")
+
+        self._lock = threading.RLock()
+        self._owners: List[str] = []  # función dueña de cada fila
+        self._rows: Dict[str, List[int]] = {}  # filas de cada función
+        # Con capacidad de sobra: solo las primeras len(_owners) filas son válidas
+        self._tf = np.zeros((0, dimensions), dtype=np.float32)
+        self._df = np.zeros(dimensions, dtype=np.float32)
+        self._matrix: Optional[np.ndarray] = None  # TF-IDF normalizada (se recalcula bajo demanda)
+        self._idf: Optional[np.ndarray] = None
+
+        self.utterances: Dict[str, List[str]] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'total_query_time': 0.0}
+        self._recent_scores = deque(maxlen=500)  # (score, hit) para ajustar el umbral
+
+        self._load_utterances()
+
+    def _load_utterances(self):
+        """Carga las frases de usuario resueltas con éxito"""
+        try:
+            if self.utterances_file.exists():
+                with open(self.utterances_file, 'r', encoding='utf-8') as f:
+                    self.utterances = json.load(f)
+        except Exception as e:
+            logger.error(f"Error cargando frases del índice: {e}")
+            self.utterances = {}
+
+    def _save_utterances(self):
+        try:
+            self.utterances_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.utterances_file, 'w', encoding='utf-8') as f:
+                json.dump(self.utterances, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Error guardando frases del índice: {e}")
+
+    def _term_frequencies(self, text: str) -> np.ndarray:
+        """Vector de frecuencias sublineales (1 + log tf) de n-gramas con hashing"""
+        grams = char_ngrams(normalize_text(text))
+        if not grams:
+            return np.zeros(self.dimensions, dtype=np.float32)
+        indices = [zlib.crc32(g.encode('utf-8')) % self.dimensions for g in grams]
+        counts = np.bincount(indices, minlength=self.dimensions).astype(np.float32)
+        nonzero = counts > 0
+        counts[nonzero] = 1.0 + np.log(counts[nonzero])
+        return counts
+
+    def _documents(self, name: str, info: Dict[str, Any]) -> List[str]:
+        """Textos que representan a una función en el índice"""
+        docs = [name.replace('_', ' ')]
+        description = " ".join((info.get('description') or '').split())
+        if description:
+            docs.append(description)
+        tags = info.get('tags') or []
+        if tags:
+            docs.append(" ".join(tags))
+        docs.extend(self.utterances.get(name, []))
+        return docs
+
+    def _reserve(self, count: int):
+        """Crece la matriz geométricamente para que agregar filas no la copie cada vez"""
+        size = len(self._owners)
+        if size + count <= len(self._tf):
+            return
+        grown = np.zeros((max(size + count, 2 * len(self._tf), 16), self.dimensions), dtype=np.float32)
+        grown[:size] = self._tf[:size]
+        self._tf = grown
+
+    def _add_rows(self, name: str, texts: List[str]):
+        rows = [self._term_frequencies(t) for t in texts if t and t.strip()]
+        if not rows:
+            return
+        block = np.vstack(rows)
+        self._reserve(len(rows))
+        start = len(self._owners)
+        self._tf[start:start + len(rows)] = block
+        self._df += (block > 0).sum(axis=0)
+        self._rows.setdefault(name, []).extend(range(start, start + len(rows)))
+        self._owners.extend([name] * len(rows))
+        self._matrix = None
+
+    def _remove_rows(self, name: str):
+        rows = self._rows.pop(name, None)
+        if not rows:
+            return
+        self._df -= (self._tf[rows] > 0).sum(axis=0)
+        # Cada fila eliminada se ocupa con la última: sin copiar la matriz
+        for row in sorted(rows, reverse=True):
+            last = len(self._owners) - 1
+            if row != last:
+                moved = self._owners[last]
+                self._tf[row] = self._tf[last]
+                self._owners[row] = moved
+                owned = self._rows[moved]
+                owned[owned.index(last)] = row
+            self._owners.pop()
+        self._matrix = None
+
+    def _ensure_matrix(self):
+        if self._matrix is not None:
+            return
+        n_rows = len(self._owners)
+        self._idf = (np.log((1.0 + n_rows) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        weighted = self._tf[:n_rows] * self._idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._matrix = weighted / norms
+
+    def build(self, registry: Dict[str, Dict[str, Any]]):
+        """Reconstruye el índice completo a partir del registro"""
+        with self._lock:
+            self._owners = []
+            self._rows = {}
+            self._tf = np.zeros((0, self.dimensions), dtype=np.float32)
+            self._df = np.zeros(self.dimensions, dtype=np.float32)
+            self._matrix = None
+            for name, info in registry.items():
+                if info.get('enabled', True):
+                    self._add_rows(name, self._documents(name, info))
+            logger.info(f"Índice de funciones construido: {len(registry)} funciones, {len(self._owners)} filas")
+
+    def update_function(self, name: str, info: Dict[str, Any]):
+        """Agrega o reemplaza una función sin reconstruir el índice"""
+        with self._lock:
+            self._remove_rows(name)
+            if info.get('enabled', True):
+                self._add_rows(name, self._documents(name, info))
+
+    def remove_function(self, name: str):
+        """Elimina una función del índice"""
+        with self._lock:
+            self._remove_rows(name)
+
+    def on_registry_event(self, event: str, name: str, info: Optional[Dict[str, Any]]):
+        """Listener para FunctionRegistry: mantiene el índice sincronizado"""
+        if event == 'remove' or info is None:
+            self.remove_function(name)
+        else:
+            self.update_function(name, info)
+
+    def record_utterance(self, name: str, utterance: str):
+        """Guarda una frase resuelta con éxito para que la próxima vez se enrute localmente"""
+        text = normalize_text(utterance)
+        if not text:
+            return
+        with self._lock:
+            known = self.utterances.setdefault(name, [])
+            if text in known:
+                return
+            known.append(text)
+            del known[:-self.max_utterances]
+            if name in self._rows:
+                self._add_rows(name, [text])
+            self._save_utterances()
+
+    def query(self, text: str, k: int = 5,
+              accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Retorna las k funciones más parecidas al texto
+        Args:
+            text: Petición del usuario
+            k: Número máximo de funciones
+            accept: Filtro opcional sobre el nombre de la función
+        Returns:
+            Lista de (nombre, similitud coseno) ordenada de mayor a menor
+        """
+        with self._lock:
+            if not self._owners:
+                return []
+            self._ensure_matrix()
+            query = self._term_frequencies(text) * self._idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            scores = self._matrix @ (query / norm)
+
+            ranked = []
+            seen = set()
+            for row in np.argsort(-scores):
+                name = self._owners[row]
+                if name in seen or (accept and not accept(name)):
+                    continue
+                seen.add(name)
+                ranked.append((name, float(scores[row])))
+                if len(ranked) >= k:
+                    break
+            return ranked
+
+    def match(self, text: str, accept: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[str, float]]:
+        """
+        Enrutamiento sin LLM: retorna (función, confianza) solo si la mejor coincidencia
+        supera el umbral y se separa lo suficiente de la segunda
+        """
+        start = time.perf_counter()
+        ranked = self.query(text, k=2, accept=accept)
+        elapsed = time.perf_counter() - start
+
+        best_score = ranked[0][1] if ranked else 0.0
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        hit = bool(ranked) and best_score >= self.threshold and \
+            (best_score - second_score) >= self.min_margin
+
+        with self._lock:
+            self.stats['hits' if hit else 'misses'] += 1
+            self.stats['total_query_time'] += elapsed
+            self._recent_scores.append((best_score, hit))
+
+        if hit:
+            logger.info(f"Índice local: '{text}' -> {ranked[0][0]} ({best_score:.2f}, {elapsed * 1e6:.0f}µs)")
+            return ranked[0]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de aciertos y fallos para ajustar el umbral"""
+        with self._lock:
+            hits = self.stats['hits']
+            misses = self.stats['misses']
+            total = hits + misses
+            scores = sorted(score for score, _ in self._recent_scores)
+            near_misses = sum(
+                1 for score, hit in self._recent_scores
+                if not hit and self.threshold - 0.1 <= score < self.threshold
+            )
+            return {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / total if total else 0.0,
+                'average_query_us': (self.stats['total_query_time'] / total * 1e6) if total else 0.0,
+                'threshold': self.threshold,
+                'min_margin': self.min_margin,
+                'functions': len(self._rows),
+                'rows': len(self._owners),
+                'score_p50': scores[len(scores) // 2] if scores else 0.0,
+                'score_p90': scores[int(len(scores) * 0.9)] if scores else 0.0,
+                'near_misses': near_misses
+            }
@@ -1,18 +1,28 @@
 import logging
-import importlib
 import inspect
-from typing import Dict, Any, Callable, Optional
+import queue
+import threading
+from typing import Dict, Any, Callable, Optional, Iterable, Iterator, List
 from pathlib import Path
 from datetime import datetime, timedelta
-from ...core.function_registry import FunctionRegistry
+from .function_registry import FunctionRegistry
+from .. import config
 from ..services.ai_service import AIService
+from ..services.cache_service import get_result_cache
+from .adaptive_timeout import AdaptiveTimeouts
 from .safe_executor import SafeExecutor
+from .profiler import save_profile
+from .execution_scheduler import ExecutionScheduler, Priority
+from .gui_host import GuiHost, is_gui_function
 from .log_manager import LogManager
 from .security_analyzer import SecurityAnalyzer
 from .test_manager import TestManager
 from .dependency_manager import DependencyManager
 from .feedback_manager import FeedbackManager
 from .permission_manager import PermissionManager
+from .function_index import FunctionIndex
+from .function_manifest import FunctionManifest
+from .function_watcher import FunctionWatcher
 
 logger = logging.getLogger('lux.functions')
 
@@ -27,50 +37,403 @@ class FunctionManager:
         self.registry = FunctionRegistry()
         self.ai_service = AIService()
         self.safe_executor = SafeExecutor()
+        # Tiempo límite por función aprendido de sus latencias
+        self.timeouts = (AdaptiveTimeouts(Path("resources/functions/latency.json"))
+                         if config.ADAPTIVE_TIMEOUT_ENABLED else None)
+        # Ejecuciones concurrentes de voz, chat y pruebas con prioridad y límites
+        self.scheduler = ExecutionScheduler(self.safe_executor, timeouts=self.timeouts)
+        # Perfilar todas las ejecuciones (el registro puede activarlo por función)
+        self.profiling_enabled = config.PROFILING_ENABLED
+        # Funciones PyQt: un proceso con un único QApplication, arrancado en el primer uso
+        self.gui_host = GuiHost() if config.GUI_HOST_ENABLED else None
+        # Resultados memoizados de funciones deterministas o que cambian despacio
+        self.result_cache = get_result_cache()
         self.log_manager = LogManager()
         self.security_analyzer = SecurityAnalyzer()
-        self.test_manager = TestManager(self.ai_service)
+        self.test_manager = TestManager(self.ai_service, self.scheduler)
         self.dependency_manager = DependencyManager()
         self.feedback_manager = FeedbackManager(self.registry)
         self.permission_manager = PermissionManager()
         
-        # Cargar funciones existentes
+        # Servicios de la aplicación usados por las funciones base
+        self.task_service = task_service
+        self.media_player = media_player
+        self.reminder_service = reminder_service
+        self.file_service = file_service
+        
+        # Modo de llamada a funciones ('native' o 'legacy')
+        self.function_calling_mode = config.FUNCTION_CALLING_MODE
+        
+        # Cargar funciones existentes (solo el manifiesto; los módulos se importan al ejecutarse)
+        self.manifest = FunctionManifest(self.functions_dir)
         self._load_functions()
+        
+        # Índice local para enrutar sin LLM, sincronizado con el registro
+        self.function_index = FunctionIndex()
+        self.function_index.build(self.registry.list_functions())
+        self.registry.add_listener(self.function_index.on_registry_event)
+        
+        # Recarga en caliente de resources/functions
+        self._reload_lock = threading.RLock()
+        self.watcher: Optional[FunctionWatcher] = None
+        if config.FUNCTION_WATCH_ENABLED:
+            self.start_watching()
+        
         logger.info(f"FunctionManager inicializado con {len(self.functions)} funciones")
     
+    def set_services(self, task_service=None, media_player=None, reminder_service=None, file_service=None):
+        """Actualiza los servicios de la aplicación sin reconstruir el gestor"""
+        if task_service is not None:
+            self.task_service = task_service
+        if media_player is not None:
+            self.media_player = media_player
+        if reminder_service is not None:
+            self.reminder_service = reminder_service
+        if file_service is not None:
+            self.file_service = file_service
+    
+    def _accepts_local_routing(self, function_name: str) -> bool:
+        """Solo se enrutan localmente funciones cargadas, habilitadas y sin argumentos obligatorios"""
+        func = self.functions.get(function_name)
+        if func is None or not self.registry.is_function_enabled(function_name):
+            return False
+        try:
+            return all(
+                p.default is not p.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+                for p in inspect.signature(func).parameters.values()
+            )
+        except (TypeError, ValueError):
+            return False
+    
+    def route_locally(self, request: str) -> Optional[str]:
+        """
+        Busca la función en el índice local
+        Returns:
+            str: Nombre de la función si la confianza supera el umbral, None si hay que consultar al LLM
+        """
+        try:
+            match = self.function_index.match(request, accept=self._accepts_local_routing)
+            return match[0] if match else None
+        except Exception as e:
+            logger.error(f"Error en enrutamiento local: {e}")
+            return None
+    
+    def select_prompt_functions(self, request: str, registry: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Selecciona las funciones que se envían al LLM: las fijas primero y luego las
+        k más relevantes según el índice local. El tamaño del prompt no depende
+        del tamaño del registro.
+        """
+        pinned = [
+            name for name, info in registry.items()
+            if (name in config.PROMPT_PINNED_FUNCTIONS or info.get('pinned'))
+            and info.get('enabled', True)
+        ]
+
+        ranked = [name for name, _ in self.function_index.query(request, k=config.PROMPT_TOP_K + len(pinned))]
+        if not ranked:
+            # Sin señal del índice: usar las funciones más utilizadas
+            ranked = sorted(
+                (name for name, info in registry.items() if info.get('enabled', True)),
+                key=lambda name: registry[name].get('usage_count', 0),
+                reverse=True
+            )
+
+        relevant = [name for name in ranked if name not in pinned][:config.PROMPT_TOP_K]
+        return {name: registry[name] for name in pinned + relevant if name in registry}
+
+    def _remember_utterance(self, function_name: str, request: str):
+        """Aprende la frase de una ejecución exitosa para futuras coincidencias locales"""
+        if request and self._accepts_local_routing(function_name):
+            self.function_index.record_utterance(function_name, request)
+    
     def _load_functions(self):
-        """Carga todas las funciones desde el directorio"""
+        """Carga el manifiesto de funciones del directorio sin importar sus módulos"""
         try:
-            for file in self.functions_dir.glob("*.py"):
-                if file.name.startswith('_'):
-                    continue
-                    
-                try:
-                    module_name = file.stem
-                    spec = importlib.util.spec_from_file_location(module_name, file)
-                    if spec and spec.loader:
-                        module = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(module)
-                        
-                        for name, obj in inspect.getmembers(module):
-                            if inspect.isfunction(obj) and not name.startswith('_'):
-                                self.functions[name] = obj
-                                logger.info(f"Función cargada: {name}")
-                                
-                except Exception as e:
-                    logger.error(f"Error cargando función desde {file}: {e}")
-                    
+            self.functions.update(self.manifest.refresh())
         except Exception as e:
             logger.error(f"Error cargando funciones: {e}")
     
-    def execute_function(self, request: str) -> Optional[str]:
+    def start_watching(self):
+        """Inicia la vigilancia del directorio de funciones"""
+        if self.watcher is None:
+            self.watcher = FunctionWatcher(
+                self.manifest.functions_dir,
+                self.reload_files,
+                interval=config.FUNCTION_WATCH_INTERVAL,
+                debounce=config.FUNCTION_WATCH_DEBOUNCE
+            )
+        self.watcher.start()
+    
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.stop()
+    
+    def reload_files(self, changed: Iterable[Path] = (), removed: Iterable[Path] = ()) -> Dict[str, List[str]]:
+        """
+        Aplica cambios en archivos de funciones analizando solo esos archivos.
+        El diccionario de funciones se reemplaza de una vez y el registro (y con
+        él el índice local) se actualiza dentro del mismo bloqueo.
+        Args:
+            changed: Archivos nuevos o modificados
+            removed: Archivos eliminados
+        Returns:
+            Dict con las funciones 'added', 'updated' y 'removed'
+        """
+        summary = {'added': [], 'updated': [], 'removed': []}
+        previous_docs: Dict[str, Optional[str]] = {}
+        with self._reload_lock:
+            functions = dict(self.functions)
+            
+            for path in removed:
+                for name in self.manifest.remove_file(path):
+                    functions.pop(name, None)
+                    summary['removed'].append(name)
+            
+            for path in changed:
+                path = Path(path)
+                if not path.exists():
+                    continue
+                previous = set(self.manifest.functions_in(path.name))
+                previous_hash = self.manifest.file_hash(path.name)
+                current = self.manifest.refresh_file(path)
+                file_changed = self.manifest.file_hash(path.name) != previous_hash
+                
+                for name in previous - current.keys():
+                    functions.pop(name, None)
+                    summary['removed'].append(name)
+                for name, func in current.items():
+                    previous_docs[name] = getattr(functions.get(name), '__doc__', None)
+                    functions[name] = func
+                    if name not in previous:
+                        summary['added'].append(name)
+                    elif file_changed:
+                        summary['updated'].append(name)
+            
+            self.functions = functions
+            
+            for name in summary['removed'] + summary['updated']:
+                # El historial de latencias era del código anterior
+                if self.timeouts:
+                    self.timeouts.forget(name)
+            for name in summary['removed']:
+                self.registry.remove_function(name)
+            for name in summary['added'] + summary['updated']:
+                func = functions[name]
+                info = self.registry.get_function_info(name)
+                if not info:
+                    self.registry.register(
+                        name=name,
+                        function=func,
+                        description=func.__doc__,
+                        file_path=func.file_path
+                    )
+                else:
+                    # La descripción se actualiza si venía del docstring anterior
+                    description = info.get('description')
+                    if not description or description == previous_docs.get(name):
+                        description = func.__doc__ or description
+                    if description != info.get('description') or not info.get('file_path'):
+                        self.registry.update_function(name, description=description,
+                                                      file_path=info.get('file_path') or func.file_path)
+        
+        if any(summary.values()):
+            logger.info(f"Funciones recargadas: {summary}")
+        return summary
+    
+    def delete_function(self, function_name: str) -> bool:
+        """
+        Elimina una función: su archivo, el manifiesto, el diccionario de
+        funciones, el registro y el índice local
+        """
+        try:
+            with self._reload_lock:
+                entry = self.manifest.get_entry(function_name)
+                file_path = self.manifest.functions_dir / (entry['file'] if entry else f"{function_name}.py")
+                if file_path.exists():
+                    file_path.unlink()
+                self.reload_files(removed=[file_path])
+                
+                # Funciones registradas fuera del manifiesto
+                if function_name in self.functions:
+                    functions = dict(self.functions)
+                    del functions[function_name]
+                    self.functions = functions
+                self.registry.remove_function(function_name)
+                self.dependency_manager.release_environment(function_name)
+                if self.result_cache:
+                    self.result_cache.invalidate(function_name)
+            
+            logger.info(f"Función eliminada: {function_name}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error eliminando función {function_name}: {e}")
+            return False
+    
+    def execute_function(self, request: str, *, conversational: bool = False,
+                         priority: int = Priority.CHAT) -> Optional[str]:
         """
         Analiza y ejecuta una petición
         Args:
             request: Petición del usuario
+            conversational: Si es True y la petición no requiere ninguna función,
+                retorna la respuesta conversacional del modelo en lugar de None
+            priority: Prioridad de la ejecución en el planificador (voz antes que chat)
         Returns:
             str: Resultado en lenguaje natural
         """
+        # Coincidencias de alta confianza del índice local: sin ida y vuelta al LLM
+        local_function = self.route_locally(request)
+        if local_function:
+            logger.info(f"Resuelto por índice local: {local_function}")
+            return self._execute_existing(local_function, request, priority)
+
+        if self.function_calling_mode == 'native':
+            native = self._execute_with_tools(request, priority)
+            if native is not None:
+                if native['function'] is None and not conversational:
+                    return None
+                return native['text']
+            logger.warning("Llamada nativa a funciones no disponible, usando flujo clásico")
+
+        return self._execute_legacy(request, priority)
+
+    def _execute_with_tools(self, request: str, priority: int = Priority.CHAT) -> Optional[Dict[str, Any]]:
+        """
+        Resuelve la petición en un solo intercambio usando declaraciones de funciones
+        de Gemini (enrutamiento, argumentos y respuesta final)
+        Returns:
+            Dict de AIService.run_with_tools o None si hay que usar el flujo clásico
+        """
+        try:
+            logger.info("="*50)
+            logger.info("ANÁLISIS DE SOLICITUD DE FUNCIÓN (nativo)")
+            logger.info(f"Texto a analizar: '{request}'")
+
+            declarations, name_map = self.ai_service.build_function_declarations(
+                self.select_prompt_functions(request, self.registry.list_functions()),
+                self.functions
+            )
+
+            def dispatcher(tool_name: str, args: Dict[str, Any]) -> str:
+                if tool_name == self.ai_service.NEW_FUNCTION_TOOL:
+                    return self.create_new_function(
+                        f"NEW - {args.get('nombre', '')}\n{args.get('descripcion', '')}"
+                    )
+                function_name = name_map.get(tool_name, tool_name)
+                return self._run_tool_function(function_name, args, request, priority)
+
+            return self.ai_service.run_with_tools(request, declarations, dispatcher)
+
+        except Exception as e:
+            logger.error(f"Error en ejecución nativa: {e}")
+            return None
+
+    def _run_tool_function(self, function_name: str, args: Dict[str, Any], request: str,
+                           priority: int = Priority.CHAT) -> str:
+        """Ejecuta una función pedida por el modelo y retorna su salida técnica"""
+        if function_name not in self.functions:
+            logger.error(f"Función no encontrada: {function_name}")
+            return f"Error: la función {function_name} no existe"
+
+        if not self.registry.is_function_enabled(function_name):
+            return f"La función {function_name} está deshabilitada temporalmente"
+
+        # Las funciones del manifiesto se importan en el trabajador, no aquí
+        result = self._run(function_name, priority, args=args)
+        self.log_manager.log_execution(function_name, result)
+
+        if not result['success']:
+            logger.error(f"Error ejecutando {function_name}: {result['error']}")
+            self.registry.increment_error_count(function_name)
+            self.log_manager.log_error(function_name, result['error'], {
+                'request': request,
+                'type': result.get('type', 'unknown')
+            })
+            return f"Error: {result['error']}"
+
+        if not result.get('cached'):
+            self.registry.update_usage(function_name, result['execution_time'])
+        self._remember_utterance(function_name, request)
+        return str(result['result'])
+
+    def _is_gui_function(self, function_name: str) -> bool:
+        entry = self.manifest.get_entry(function_name)
+        return bool(entry) and is_gui_function(entry['imports'])
+
+    def cache_policy(self, function_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Política de memoización de una función del manifiesto: los metadatos del
+        registro (cacheable, cache_ttl) mandan; si no hay, se infiere del código
+        Returns:
+            {'ttl': segundos, 'hash': hash del código} o None si no se memoiza
+        """
+        entry = self.manifest.get_entry(function_name)
+        if self.result_cache is None or entry is None:
+            return None
+        info = self.registry.get_function_info(function_name)
+        if info.get('cacheable') is False:
+            return None
+
+        ttl = info.get('cache_ttl') or {
+            'pure': config.RESULT_CACHE_PURE_TTL,
+            'network': config.RESULT_CACHE_NETWORK_TTL
+        }.get(entry.get('cache_class'))
+        if not ttl and info.get('cacheable'):
+            ttl = config.RESULT_CACHE_NETWORK_TTL
+        return {'ttl': float(ttl), 'hash': entry['hash']} if ttl else None
+
+    def _run(self, function_name: str, priority: int = Priority.CHAT,
+             on_chunk: Optional[Callable[[Any], None]] = None,
+             args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta una función: si es memoizable y hay resultado vigente no se
+        ejecuta; las de interfaz abren su ventana en el anfitrión de interfaz
+        sin esperar a que se cierre; el resto pasa por el planificador
+        Args:
+            on_chunk: Recibe cada fragmento si la función es generadora
+            args: Argumentos de la función; solo se desempaquetan al llamarla
+        """
+        args = args or {}
+        policy = self.cache_policy(function_name)
+        if policy:
+            cached = self.result_cache.get_result(function_name, policy['hash'], args)
+            if cached is not None:
+                logger.info(f"Resultado de {function_name} obtenido de caché")
+                if on_chunk:
+                    on_chunk(cached)
+                return {'success': True, 'result': cached, 'cached': True,
+                        'execution_time': 0.0, 'cpu_time': 0.0, 'memory_used': 0}
+
+        func = self.functions[function_name]
+        if self.gui_host and self._is_gui_function(function_name):
+            return self.gui_host.execute(
+                func, on_closed=lambda: logger.info(f"Ventana de {function_name} cerrada"), arguments=args
+            )
+        info = self.registry.get_function_info(function_name)
+        result = self.scheduler.execute(function_name, func, priority=priority, on_chunk=on_chunk,
+                                        site_dir=self.dependency_manager.environment_for(function_name),
+                                        timeout=info.get('timeout'),
+                                        profile=self.profiling_enabled or bool(info.get('profile')),
+                                        arguments=args)
+        if 'profile' in result:
+            self._save_profile(function_name, result)
+        if policy and result['success']:
+            self.result_cache.put_result(function_name, policy['hash'], args, result['result'], policy['ttl'])
+        return result
+
+    def _save_profile(self, function_name: str, result: Dict[str, Any]):
+        """Guarda el perfil de una ejecución y lo enlaza desde las métricas de la función"""
+        try:
+            result['profile'] = save_profile(function_name, result['profile'])
+            self.log_manager.attach_profile(function_name, result['profile'])
+        except Exception as e:
+            logger.error(f"Error guardando perfil de {function_name}: {e}")
+            result.pop('profile', None)
+
+    def _execute_legacy(self, request: str, priority: int = Priority.CHAT) -> Optional[str]:
+        """Flujo clásico: análisis YES/NO/NEW, ejecución y traducción por separado"""
         try:
             start_time = datetime.now()
             
@@ -90,80 +453,166 @@ class FunctionManager:
                 )
                 return self.ai_service.translate_result(result, request)
             
-            # Ejecutar función existente de forma segura
-            function_name = analysis['function']
-            if function_name not in self.functions:
-                logger.error(f"Función no encontrada: {function_name}")
-                return None
-            
-            # Verificar si la función está habilitada
-            if not self.registry.is_function_enabled(function_name):
-                return f"La función {function_name} está deshabilitada temporalmente"
-            
-            try:
-                # Ejecutar con timeout
-                func = self.functions[function_name]
-                result = self.safe_executor.execute(func)
-                
-                # Registrar ejecución
-                self.log_manager.log_execution(function_name, result)
-                
-                if not result['success']:
-                    error_msg = self.feedback_manager.get_error_message(
-                        'execution_error',
-                        name=function_name,
-                        error=result['error']
-                    )
-                    logger.error(f"Error ejecutando {function_name}: {result['error']}")
-                    self.registry.increment_error_count(function_name)
-                    self.log_manager.log_error(function_name, result['error'], {
-                        'request': request,
-                        'type': result.get('type', 'unknown')
-                    })
-                    # Traducir error a lenguaje natural
-                    natural_error = self.ai_service.translate_result(
-                        f"{error_msg['message']}\n{error_msg['action']}", 
-                        request
-                    )
-                    return natural_error
-                
-                # Registrar uso exitoso
-                self.registry.update_usage(function_name, result['execution_time'])
-                
-                # Obtener resultado y contexto
-                output = str(result['result'])
-                function_info = self.registry.get_function_info(function_name)
-                context = {
-                    'request': request,
-                    'function_name': function_name,
-                    'description': function_info.get('description', ''),
-                    'execution_time': result['execution_time']
-                }
-                
-                # Traducir a lenguaje natural
-                natural_response = self.ai_service.translate_result(
-                    output,
-                    str(context)  # Convertir contexto a string para el prompt
-                )
-                
-                logger.info(f"Respuesta natural: {natural_response}")
-                return natural_response
-                
-            except Exception as e:
-                error_msg = self.feedback_manager.get_error_message(
-                    'execution_error',
-                    name=function_name,
-                    error=str(e)
-                )
-                logger.error(f"Error ejecutando {function_name}: {e}")
-                # Registrar error en archivo específico
-                self._log_function_error(function_name, str(e), request)
-                return f"{error_msg['message']}\n{error_msg['action']}"
+            return self._execute_existing(analysis['function'], request, priority)
 
         except Exception as e:
             logger.error(f"Error en execute_function: {e}")
             return None
 
+    def is_streaming(self, function_name: str) -> bool:
+        """True si la función entrega su resultado por fragmentos (generadora)"""
+        return getattr(self.functions.get(function_name), 'is_generator', False)
+
+    def _report_failure(self, function_name: str, result: Dict[str, Any], request: str) -> str:
+        """Registra una ejecución fallida y retorna el error en lenguaje natural"""
+        error_msg = self.feedback_manager.get_error_message(
+            'execution_error',
+            name=function_name,
+            error=result['error']
+        )
+        logger.error(f"Error ejecutando {function_name}: {result['error']}")
+        self.registry.increment_error_count(function_name)
+        self.log_manager.log_error(function_name, result['error'], {
+            'request': request,
+            'type': result.get('type', 'unknown')
+        })
+        # Traducir error a lenguaje natural
+        return self.ai_service.translate_result(
+            f"{error_msg['message']}\n{error_msg['action']}", 
+            request
+        )
+
+    def _record_success(self, function_name: str, result: Dict[str, Any], request: str):
+        # Un resultado de caché no es una ejecución
+        if not result.get('cached'):
+            self.registry.update_usage(function_name, result['execution_time'])
+        self._remember_utterance(function_name, request)
+
+    def stream_existing(self, function_name: str, request: str, priority: int = Priority.CHAT) -> Iterator[str]:
+        """
+        Ejecuta una función generadora y entrega la respuesta en lenguaje natural
+        por fragmentos: cada parte del resultado se traduce en cuanto llega,
+        mientras la función sigue ejecutándose
+        """
+        if function_name not in self.functions:
+            logger.error(f"Función no encontrada: {function_name}")
+            return
+        if not self.registry.is_function_enabled(function_name):
+            yield f"La función {function_name} está deshabilitada temporalmente"
+            return
+
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        finished = object()
+        outcome: Dict[str, Any] = {}
+
+        def run():
+            try:
+                outcome['result'] = self._run(function_name, priority, on_chunk=chunks.put)
+            except Exception as e:
+                outcome['result'] = {'success': False, 'error': str(e), 'type': 'runtime'}
+            finally:
+                chunks.put(finished)
+
+        def partial_results() -> Iterator[str]:
+            while True:
+                chunk = chunks.get()
+                if chunk is finished:
+                    return
+                yield str(chunk)
+
+        threading.Thread(target=run, name='lux-function-stream', daemon=True).start()
+        context = {
+            'request': request,
+            'function_name': function_name,
+            'description': self.registry.get_function_info(function_name).get('description', '')
+        }
+        produced = False
+        for piece in self.ai_service.translate_result_stream(partial_results(), str(context)):
+            produced = True
+            yield piece
+
+        result = outcome['result']
+        self.log_manager.log_execution(function_name, result)
+        if not result['success']:
+            natural_error = self._report_failure(function_name, result, request)
+            yield f" {natural_error}" if produced else natural_error
+            return
+        self._record_success(function_name, result, request)
+
+    def execute_existing(self, function_name: str, request: str, priority: int = Priority.CHAT) -> Optional[str]:
+        """
+        Ejecuta una función ya elegida (índice local o análisis previo)
+        Args:
+            request: Petición original del usuario, usada para traducir el resultado
+        """
+        return self._execute_existing(function_name, request, priority)
+
+    def _execute_existing(self, function_name: str, request: str, priority: int = Priority.CHAT) -> Optional[str]:
+        """Ejecuta una función registrada y traduce su resultado a lenguaje natural"""
+        if function_name not in self.functions:
+            logger.error(f"Función no encontrada: {function_name}")
+            return None
+        
+        # Verificar si la función está habilitada
+        if not self.registry.is_function_enabled(function_name):
+            return f"La función {function_name} está deshabilitada temporalmente"
+        
+        if self.is_streaming(function_name):
+            return "".join(self.stream_existing(function_name, request, priority))
+        
+        try:
+            # Ejecutar con timeout
+            result = self._run(function_name, priority)
+            
+            # Registrar ejecución
+            self.log_manager.log_execution(function_name, result)
+            
+            if not result['success']:
+                return self._report_failure(function_name, result, request)
+            
+            # Registrar uso exitoso
+            self._record_success(function_name, result, request)
+            
+            # Obtener resultado y contexto
+            output = str(result['result'])
+            policy = self.cache_policy(function_name)
+            if policy:
+                natural_response = self.result_cache.get_translation(function_name, policy['hash'], output, request)
+                if natural_response is not None:
+                    logger.info(f"Respuesta natural obtenida de caché: {natural_response}")
+                    return natural_response
+            
+            function_info = self.registry.get_function_info(function_name)
+            context = {
+                'request': request,
+                'function_name': function_name,
+                'description': function_info.get('description', ''),
+                'execution_time': result['execution_time']
+            }
+            
+            # Traducir a lenguaje natural
+            natural_response = self.ai_service.translate_result(
+                output,
+                str(context)  # Convertir contexto a string para el prompt
+            )
+            if policy and natural_response and natural_response != output:
+                self.result_cache.put_translation(function_name, policy['hash'], output, request,
+                                                  natural_response, policy['ttl'])
+            
+            logger.info(f"Respuesta natural: {natural_response}")
+            return natural_response
+            
+        except Exception as e:
+            error_msg = self.feedback_manager.get_error_message(
+                'execution_error',
+                name=function_name,
+                error=str(e)
+            )
+            logger.error(f"Error ejecutando {function_name}: {e}")
+            # Registrar error en archivo específico
+            self._log_function_error(function_name, str(e), request)
+            return f"{error_msg['message']}\n{error_msg['action']}"
+
     def _log_function_error(self, function_name: str, error: str, context: str):
         """Registra errores de función en archivo específico"""
         try:
@@ -218,6 +667,8 @@ class FunctionManager:
                 return f"Error: No se pudo crear la función después de varios intentos:\n{test_result['error']}"
                 
             code = test_result['code']  # Usar código reparado si hubo cambios
+            # Solo se reutiliza código que pasó la validación y las pruebas
+            self.ai_service.remember_code(function_name, description, code)
             
             # Analizar y gestionar dependencias
             deps = self.dependency_manager.analyze_dependencies(code)
@@ -226,10 +677,7 @@ class FunctionManager:
                 return f"Error: Librerías no permitidas: {', '.join(deps['conflicts'])}"
                 
             if deps['required']:
-                if not self.dependency_manager.install_dependencies(deps['required']):
-                    return "Error: No se pudieron instalar las dependencias requeridas"
-                    
-                # Guardar dependencias de la función
+                # Guardar dependencias de la función; se instalan tras registrarla
                 self.dependency_manager.save_function_dependencies(
                     function_name, 
                     deps['required']
@@ -264,33 +712,36 @@ class FunctionManager:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(code)
             
-            # Cargar y registrar función
+            # Cargar y registrar función (bajo el mismo bloqueo que la recarga en caliente)
             try:
-                spec = importlib.util.spec_from_file_location(function_name, file_path)
-                if spec and spec.loader:
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
+                with self._reload_lock:
+                    self.reload_files(changed=[file_path])
+                    if function_name not in self.functions:
+                        return f"Error al registrar la función: {function_name} no está definida en el código"
                     
-                    # Buscar la función en el módulo
-                    for name, obj in inspect.getmembers(module):
-                        if inspect.isfunction(obj) and name == function_name:
-                            # Registrar en el registry
-                            self.registry.register(
-                                name=name,
-                                function=obj,
-                                description=description,
-                                file_path=str(file_path)
-                            )
-                            self.functions[name] = obj
-                            
-                            # Ejecutar la función para probarla
-                            try:
-                                result = obj()
-                                logger.info(f"Prueba de función: {result}")
-                                return f"Función {name} creada y probada exitosamente"
-                            except Exception as e:
-                                logger.error(f"Error en prueba de función: {e}")
-                                return f"Función creada pero falló la prueba: {e}"
+                    # La descripción pedida reemplaza a la del docstring
+                    self.registry.update_function(function_name, description=description)
+                    if deps['required']:
+                        # Deshabilitada antes de que el índice o las herramientas la vean
+                        self.registry.disable_function(function_name)
+                    elif not self.registry.is_function_enabled(function_name):
+                        self.registry.enable_function(function_name)
+                
+                if deps['required']:
+                    self._install_then_enable(function_name, deps['required'])
+                    return (f"Función {function_name} creada; se habilitará al terminar de instalar "
+                            f"{', '.join(deps['required'])}")
+                
+                name = function_name
+                
+                # Probarla como cualquier ejecución: las de interfaz en el anfitrión
+                # de interfaz, el resto en un trabajador del planificador
+                result = self._run(name, Priority.BACKGROUND)
+                if result['success']:
+                    logger.info(f"Prueba de función: {result['result']}")
+                    return f"Función {name} creada y probada exitosamente"
+                logger.error(f"Error en prueba de función: {result['error']}")
+                return f"Función creada pero falló la prueba: {result['error']}"
                             
             except Exception as e:
                 logger.error(f"Error registrando función: {e}")
@@ -300,6 +751,21 @@ class FunctionManager:
             logger.error(f"Error creando función: {e}")
             return f"Error al crear la función: {e}"
 
+    def _install_then_enable(self, function_name: str, dependencies: List[str]):
+        """Instala en segundo plano las dependencias de una función ya deshabilitada"""
+
+        def on_done(ok: bool):
+            if ok:
+                self.registry.enable_function(function_name)
+                logger.info(f"Dependencias de {function_name} instaladas, función habilitada")
+            else:
+                self.log_manager.log_error(function_name, "No se pudieron instalar las dependencias", {
+                    'dependencies': dependencies
+                })
+                logger.error(f"{function_name} queda deshabilitada: faltan {', '.join(dependencies)}")
+
+        self.dependency_manager.install_in_background(dependencies, on_done, function_name=function_name)
+
     def _ensure_base_functions(self):
         """Asegura que las funciones base estén en el directorio"""
         try:
@@ -319,24 +785,10 @@ class FunctionManager:
                         f.write(code)
                     logger.info(f"Función base creada: {filename}")
                     
-                    # Cargar el módulo para registrarlo
+                    # Registrar sus funciones a partir del manifiesto
                     try:
-                        spec = importlib.util.spec_from_file_location(file_path.stem, file_path)
-                        if spec and spec.loader:
-                            module = importlib.util.module_from_spec(spec)
-                            spec.loader.exec_module(module)
-                            
-                            # Buscar la función en el módulo
-                            for name, obj in inspect.getmembers(module):
-                                if inspect.isfunction(obj) and not name.startswith('_'):
-                                    # Registrar en el registry
-                                    self.registry.register(
-                                        name=name,
-                                        function=obj,
-                                        description=obj.__doc__,
-                                        file_path=str(file_path)
-                                    )
-                                    logger.info(f"Función registrada: {name}")
+                        for name in self.reload_files(changed=[file_path])['added']:
+                            logger.info(f"Función registrada: {name}")
                     except Exception as e:
                         logger.error(f"Error registrando función {filename}: {e}")
                     
@@ -449,11 +901,12 @@ def obtener_hora() -> str:
             logger.error(f"Error buscando archivos: {e}")
             return "Hubo un error al buscar archivos" 
 
-    def analyze_request(self, request: str) -> Dict[str, str]:
+    def analyze_request(self, request: str, use_index: bool = True) -> Dict[str, str]:
         """
         Analiza una petición para determinar qué acción tomar
         Args:
             request: Petición del usuario
+            use_index: Consultar primero el índice local antes de llamar al LLM
         Returns:
             Dict con tipo de acción, nombre de función y descripción
         """
@@ -464,9 +917,22 @@ def obtener_hora() -> str:
 
             # Obtener funciones registradas
             registry = self.registry.list_functions()
+
+            if use_index:
+                local_function = self.route_locally(request)
+                if local_function:
+                    return {
+                        "type": "YES",
+                        "function": local_function,
+                        "extra_info": registry.get(local_function, {}).get("description", "")
+                    }
             
-            # Analizar con IA
-            response = self.ai_service.analyze_request(request, registry)
+            # Analizar con IA solo con las funciones más relevantes
+            response = self.ai_service.analyze_request(
+                request,
+                self.select_prompt_functions(request, registry),
+                token_budget=config.PROMPT_TOKEN_BUDGET
+            )
             logger.info(f"Respuesta del análisis: {response}")
             
             # Procesar respuesta
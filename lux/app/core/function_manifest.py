@@ -0,0 +1,303 @@
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Any, Callable, Optional, Tuple, List
+
+from .code_facts import analyze_code
+from .metrics import metrics
+
+logger = logging.getLogger('lux.functions')
+
+# Anotaciones que se resuelven sin importar el módulo (el resto queda como texto)
+_ANNOTATIONS = {'str': str, 'int': int, 'float': float, 'bool': bool, 'list': list, 'dict': dict}
+
+def _annotation(node: Optional[ast.AST]) -> Any:
+    if node is None:
+        return inspect.Parameter.empty
+    text = ast.unparse(node)
+    return _ANNOTATIONS.get(text, text)
+
+def _default(node: ast.AST) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return ast.unparse(node)
+
+def build_signature(text: str) -> inspect.Signature:
+    """Reconstruye un inspect.Signature a partir de la firma en texto del manifiesto"""
+    node = ast.parse(f"def _f{text}: pass").body[0]
+    args = node.args
+    P = inspect.Parameter
+    parameters = []
+
+    positional = [(arg, P.POSITIONAL_ONLY) for arg in args.posonlyargs] + \
+                 [(arg, P.POSITIONAL_OR_KEYWORD) for arg in args.args]
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for (arg, kind), default in zip(positional, defaults):
+        parameters.append(P(arg.arg, kind, annotation=_annotation(arg.annotation),
+                            default=P.empty if default is None else _default(default)))
+    if args.vararg:
+        parameters.append(P(args.vararg.arg, P.VAR_POSITIONAL, annotation=_annotation(args.vararg.annotation)))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        parameters.append(P(arg.arg, P.KEYWORD_ONLY, annotation=_annotation(arg.annotation),
+                            default=P.empty if default is None else _default(default)))
+    if args.kwarg:
+        parameters.append(P(args.kwarg.arg, P.VAR_KEYWORD, annotation=_annotation(args.kwarg.annotation)))
+
+    return inspect.Signature(parameters, return_annotation=_annotation(node.returns))
+
+class LazyFunction:
+    """
+    Función del manifiesto: expone nombre, firma y docstring sin importar su
+    módulo, que se carga en la primera llamada (o al pedir load())
+    """
+
+    def __init__(self, manifest: 'FunctionManifest', name: str, entry: Dict[str, Any]):
+        self._manifest = manifest
+        self.__name__ = name
+        self.__qualname__ = name
+        self.__doc__ = entry.get('docstring')
+        self.file_path = entry['file_path']
+        self.is_async = entry.get('is_async', False)  # async def: se ejecuta en el bucle asyncio
+        self.is_generator = entry.get('is_generator', False)  # entrega el resultado por fragmentos
+        self._signature_text = entry.get('signature', '()')
+        self._signature: Optional[inspect.Signature] = None
+
+    @property
+    def __signature__(self) -> inspect.Signature:
+        if self._signature is None:
+            self._signature = build_signature(self._signature_text)
+        return self._signature
+
+    def load(self) -> Callable:
+        """Importa el módulo si hace falta y retorna la función real"""
+        return self._manifest.load(self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyFunction {self.__name__}{self._signature_text}>"
+
+class FunctionManifest:
+    """
+    Manifiesto de las funciones de resources/functions obtenido por análisis
+    estático: nombre, firma, docstring, imports y hash de cada archivo. El
+    enrutamiento y los listados trabajan solo con el manifiesto; cada módulo
+    se importa en la primera ejecución de una de sus funciones y se reutiliza
+    mientras el hash del archivo no cambie.
+    """
+
+    VERSION = 4
+
+    def __init__(self, functions_dir: Path, manifest_file: Optional[Path] = None):
+        # Rutas absolutas: los trabajadores de SafeExecutor importan los archivos por ruta
+        self.functions_dir = Path(functions_dir).resolve()
+        self.manifest_file = Path(manifest_file or self.functions_dir / "manifest.json").resolve()
+        self.files: Dict[str, Dict[str, Any]] = {}  # archivo -> {hash, mtime, size, imports, functions}
+        self._owners: Dict[str, str] = {}  # función -> archivo
+        self._modules: Dict[str, Tuple[str, ModuleType]] = {}  # archivo -> (hash, módulo)
+        self._lock = threading.RLock()
+        self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            if self.manifest_file.exists():
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self.files = data.get('files', {})
+        except Exception as e:
+            logger.error(f"Error cargando manifiesto de funciones: {e}")
+            self.files = {}
+
+    def _save_manifest(self):
+        try:
+            self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.manifest_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'files': self.files}, f, indent=2, ensure_ascii=False)
+            tmp_file.replace(self.manifest_file)
+        except Exception as e:
+            logger.error(f"Error guardando manifiesto de funciones: {e}")
+
+    def _scan_file(self, path: Path) -> Tuple[Dict[str, Any], bool]:
+        """
+        Entrada del manifiesto para un archivo; solo se vuelve a leer si cambió
+        su mtime/tamaño y solo se vuelve a analizar si cambió su hash
+        Returns:
+            (entrada, si hubo que analizarlo)
+        """
+        stat = path.stat()
+        cached = self.files.get(path.name)
+        if cached and cached['mtime'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            return cached, False
+
+        source = path.read_bytes()
+        file_hash = hashlib.sha256(source).hexdigest()
+        if cached and cached['hash'] == file_hash:
+            return dict(cached, mtime=stat.st_mtime_ns, size=stat.st_size), False
+
+        facts = analyze_code(source.decode('utf-8'))
+        if not facts.valid:
+            logger.error(f"Error analizando {path.name}: {facts.syntax_error}")
+        return {
+            'hash': file_hash,
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'imports': sorted(facts.modules),
+            'cache_class': facts.cache_class,
+            'functions': [
+                {'name': fact.name, 'line': fact.line, 'signature': fact.signature, 'docstring': fact.docstring,
+                 'is_async': fact.is_async, 'is_generator': fact.is_generator}
+                for fact in facts.functions
+                if fact.top_level and not fact.name.startswith('_')
+            ]
+        }, True
+
+    def refresh(self) -> Dict[str, LazyFunction]:
+        """
+        Sincroniza el manifiesto con el directorio de funciones
+        Returns:
+            Dict {nombre: LazyFunction} con todas las funciones del manifiesto
+        """
+        start = time.perf_counter()
+        with self._lock:
+            files = {}
+            parsed = 0
+            for path in sorted(self.functions_dir.glob("*.py")):
+                if path.name.startswith('_'):
+                    continue
+                try:
+                    files[path.name], changed = self._scan_file(path)
+                    parsed += changed
+                except Exception as e:
+                    logger.error(f"Error leyendo función desde {path}: {e}")
+
+            dirty = parsed or files.keys() != self.files.keys() or any(
+                files[name] is not self.files.get(name) for name in files
+            )
+            self.files = files
+            self._modules = {name: module for name, module in self._modules.items() if name in files}
+            if dirty:
+                self._save_manifest()
+            functions = self._functions()
+
+        metrics.observe('functions.manifest_refresh', time.perf_counter() - start)
+        logger.info(f"Manifiesto de funciones: {len(functions)} funciones en "
+                    f"{len(self.files)} archivos ({parsed} analizados)")
+        return functions
+
+    def refresh_file(self, path: Path) -> Dict[str, LazyFunction]:
+        """Actualiza un único archivo (p. ej. recién creado o editado) y retorna sus funciones"""
+        path = Path(path).resolve()
+        with self._lock:
+            entry, _ = self._scan_file(path)
+            if entry is not self.files.get(path.name):
+                self.files[path.name] = entry
+                self._save_manifest()
+            cached = self._modules.get(path.name)
+            if cached and cached[0] != entry['hash']:
+                # El módulo se volverá a importar en la próxima ejecución
+                del self._modules[path.name]
+            return {
+                name: function for name, function in self._functions().items()
+                if self._owners[name] == path.name
+            }
+
+    def remove_file(self, path: Path) -> List[str]:
+        """Quita un archivo del manifiesto y retorna los nombres de sus funciones"""
+        file_name = Path(path).name
+        with self._lock:
+            entry = self.files.pop(file_name, None)
+            self._modules.pop(file_name, None)
+            if entry is None:
+                return []
+            self._functions()
+            self._save_manifest()
+            return [function['name'] for function in entry['functions']]
+
+    def functions_in(self, file_name: str) -> List[str]:
+        """Nombres de las funciones de un archivo según el manifiesto"""
+        entry = self.files.get(file_name)
+        return [function['name'] for function in entry['functions']] if entry else []
+
+    def file_hash(self, file_name: str) -> Optional[str]:
+        entry = self.files.get(file_name)
+        return entry['hash'] if entry else None
+
+    def _functions(self) -> Dict[str, LazyFunction]:
+        self._owners = {}
+        functions = {}
+        for file_name, entry in self.files.items():
+            for function in entry['functions']:
+                name = function['name']
+                self._owners[name] = file_name
+                functions[name] = LazyFunction(
+                    self, name, dict(function, file_path=str(self.functions_dir / file_name))
+                )
+        return functions
+
+    def get_entry(self, name: str) -> Optional[Dict[str, Any]]:
+        """Entrada del manifiesto de una función (firma, docstring, imports y clase de caché de su archivo)"""
+        file_name = self._owners.get(name)
+        if file_name is None:
+            return None
+        entry = self.files[file_name]
+        function = next((f for f in entry['functions'] if f['name'] == name), None)
+        return dict(function, file=file_name, imports=entry['imports'], hash=entry['hash'],
+                    cache_class=entry.get('cache_class')) if function else None
+
+    def load(self, name: str) -> Callable:
+        """
+        Importa (o reutiliza) el módulo de la función. Si el archivo cambió
+        desde la última importación, se vuelve a analizar e importar.
+        """
+        with self._lock:
+            file_name = self._owners.get(name)
+            if file_name is None:
+                raise KeyError(f"Función no encontrada en el manifiesto: {name}")
+
+            path = self.functions_dir / file_name
+            entry, changed = self._scan_file(path)
+            if entry is not self.files.get(file_name):
+                self.files[file_name] = entry
+                if changed:
+                    self._functions()
+                self._save_manifest()
+
+            cached = self._modules.get(file_name)
+            if cached and cached[0] == entry['hash']:
+                module = cached[1]
+            else:
+                module = self._import(path)
+                self._modules[file_name] = (entry['hash'], module)
+
+        function = getattr(module, name, None)
+        if not callable(function):
+            raise AttributeError(f"El módulo {file_name} no define la función {name}")
+        return function
+
+    def _import(self, path: Path) -> ModuleType:
+        start = time.perf_counter()
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        if not spec or not spec.loader:
+            raise ImportError(f"No se pudo cargar {path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        elapsed = time.perf_counter() - start
+        metrics.observe('functions.import_time', elapsed)
+        logger.info(f"Módulo de función importado: {path.name} ({elapsed * 1000:.0f} ms)")
+        return module
+
+    def is_loaded(self, name: str) -> bool:
+        file_name = self._owners.get(name)
+        return file_name in self._modules
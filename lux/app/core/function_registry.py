@@ -1,76 +1,602 @@
+import atexit
+import inspect
 import json
-from pathlib import Path
-from typing import Dict, Any, Optional
 import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Union
+
+from .. import config
+from .metrics import metrics
 
-logger = logging.getLogger('lux.functions')
+logger = logging.getLogger('lux.registry')
 
 class FunctionRegistry:
-    def __init__(self):
-        self.registry_file = Path("resources/functions/registry.json")
-        self.registry: Dict[str, Dict[str, Any]] = {}
+    """
+    Registro único de funciones sobre SQLite (resources/functions/registry.db).
+
+    Los metadatos se leen de una copia en memoria y cada cambio de metadatos
+    (registrar, habilitar, eliminar...) escribe solo la fila afectada. Las
+    estadísticas de uso (update_usage, increment_error_count) se acumulan en
+    memoria y se vuelcan por lotes cada FUNCTION_STATS_FLUSH_INTERVAL segundos
+    y al cerrar.
+    """
+
+    # Columnas de la tabla; el resto de campos se guarda en 'extra' (JSON)
+    COLUMNS = (
+        'name', 'description', 'file_path', 'function_type', 'enabled', 'version',
+        'created_at', 'updated_at', 'last_used', 'usage_count', 'error_count',
+        'success_rate', 'average_execution_time'
+    )
+    STATS = ('last_used', 'usage_count', 'error_count', 'success_rate', 'average_execution_time')
+
+    def __init__(self, db_path: Union[str, Path] = Path("resources/functions/registry.db"),
+                 json_path: Optional[Union[str, Path]] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Args:
+            db_path: Base de datos SQLite del registro
+            json_path: registry.json del formato anterior a importar una sola vez
+                (por defecto, junto a la base de datos)
+            flush_interval: Segundos entre volcados de estadísticas (0 = solo al cerrar)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.json_path = Path(json_path) if json_path else self.db_path.with_name("registry.json")
+        self.flush_interval = config.FUNCTION_STATS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+
+        self.functions: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable[[str, str, Optional[Dict[str, Any]]], None]] = []
+        self._dirty_stats: set = set()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+
+        self._init_db()
         self._load_registry()
-    
+        self._import_json()
+
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name='lux-registry-flush', daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    # Almacenamiento
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS functions (
+                    name TEXT PRIMARY KEY,
+                    description TEXT,
+                    file_path TEXT,
+                    function_type TEXT,
+                    enabled INTEGER NOT NULL DEFAULT 1,
+                    version TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    last_used TEXT,
+                    usage_count INTEGER NOT NULL DEFAULT 0,
+                    error_count INTEGER NOT NULL DEFAULT 0,
+                    success_rate REAL NOT NULL DEFAULT 100,
+                    average_execution_time REAL NOT NULL DEFAULT 0,
+                    extra TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS function_tags (
+                    name TEXT NOT NULL REFERENCES functions(name) ON DELETE CASCADE,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (name, tag)
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_functions_type ON functions(function_type)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_functions_enabled ON functions(enabled)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_function_tags_tag ON function_tags(tag)")
+            self._conn.commit()
+
     def _load_registry(self):
-        """Carga el registro desde el archivo JSON"""
+        """Carga todas las funciones en memoria"""
         try:
-            if self.registry_file.exists():
-                with open(self.registry_file, 'r', encoding='utf-8') as f:
-                    self.registry = json.load(f)
-            else:
-                self.registry_file.parent.mkdir(parents=True, exist_ok=True)
-                self._save_registry()
+            with self._lock:
+                tags: Dict[str, List[str]] = {}
+                for name, tag in self._conn.execute("SELECT name, tag FROM function_tags ORDER BY rowid"):
+                    tags.setdefault(name, []).append(tag)
+
+                cursor = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)}, extra FROM functions")
+                for row in cursor:
+                    data = dict(zip(self.COLUMNS, row[:-1]))
+                    data['enabled'] = bool(data['enabled'])
+                    data.update(json.loads(row[-1]) if row[-1] else {})
+                    data['tags'] = tags.get(data['name'], [])
+                    self.functions[data['name']] = data
         except Exception as e:
-            logger.error(f"Error cargando registro: {e}")
-            self.registry = {}
-    
-    def _save_registry(self):
-        """Guarda el registro en el archivo JSON"""
+            logger.error(f"Error cargando registry: {e}")
+            self.functions = {}
+
+    def _save_function(self, name: str):
+        """Escribe una sola función (metadatos, estadísticas y tags)"""
+        data = self.functions[name]
+        row = [data.get(column) for column in self.COLUMNS]
+        row[self.COLUMNS.index('enabled')] = int(bool(data.get('enabled', True)))
+        extra = {k: v for k, v in data.items() if k not in self.COLUMNS and k != 'tags'}
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO functions ({', '.join(self.COLUMNS)}, extra) "
+                f"VALUES ({', '.join('?' * (len(self.COLUMNS) + 1))})",
+                row + [json.dumps(extra, ensure_ascii=False) if extra else None]
+            )
+            self._conn.execute("DELETE FROM function_tags WHERE name = ?", (name,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO function_tags (name, tag) VALUES (?, ?)",
+                [(name, tag) for tag in data.get('tags') or []]
+            )
+            self._conn.commit()
+            # La fila incluye las estadísticas actuales
+            self._dirty_stats.discard(name)
+
+    def _delete_function(self, name: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM function_tags WHERE name = ?", (name,))
+            self._conn.execute("DELETE FROM functions WHERE name = ?", (name,))
+            self._conn.commit()
+            self._dirty_stats.discard(name)
+
+    def _import_json(self):
+        """Importa una sola vez el registry.json del formato anterior"""
         try:
-            with open(self.registry_file, 'w', encoding='utf-8') as f:
-                json.dump(self.registry, f, indent=4, ensure_ascii=False)
+            with self._lock:
+                done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+            if done or not self.json_path.exists():
+                return
+            imported = self.import_json(self.json_path)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)",
+                    (datetime.now().isoformat(),)
+                )
+                self._conn.commit()
+            self.json_path.replace(self.json_path.with_name(self.json_path.name + ".migrated"))
+            logger.info(f"Registro migrado desde {self.json_path.name}: {imported} funciones")
         except Exception as e:
-            logger.error(f"Error guardando registro: {e}")
-    
-    def register_function(self, 
-                         name: str, 
-                         file_path: str, 
-                         description: str,
-                         function_type: str,
-                         extension: str = '.py') -> bool:
-        """Registra una nueva función"""
+            logger.error(f"Error importando {self.json_path}: {e}")
+
+    def import_json(self, path: Union[str, Path]) -> int:
+        """
+        Importa funciones desde un registry.json (de cualquiera de los dos
+        formatos anteriores); no sobrescribe las que ya existen
+        Returns:
+            int: Funciones importadas
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        imported = 0
+        now = datetime.now().isoformat()
+        with self._lock:
+            for name, info in data.items():
+                if name in self.functions or not isinstance(info, dict):
+                    continue
+                entry = dict(info)
+                entry['name'] = info.get('name', name)
+                entry['file_path'] = info.get('file_path', info.get('path'))
+                entry['function_type'] = info.get('function_type', info.get('type', 'utility'))
+                entry.pop('path', None)
+                entry.pop('type', None)
+                entry.setdefault('description', 'Sin descripción')
+                entry.setdefault('enabled', True)
+                entry.setdefault('created_at', now)
+                entry.setdefault('updated_at', entry['created_at'])
+                entry.setdefault('usage_count', 0)
+                entry.setdefault('error_count', 0)
+                entry.setdefault('success_rate', 100)
+                entry.setdefault('average_execution_time', 0)
+                entry.setdefault('tags', [])
+                entry.setdefault('version', '1.0.0')
+                self.functions[name] = entry
+                self._save_function(name)
+                imported += 1
+        return imported
+
+    # Volcado diferido de estadísticas
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Escribe en lote las estadísticas acumuladas en memoria
+        Returns:
+            int: Funciones actualizadas
+        """
+        with self._lock:
+            if not self._dirty_stats:
+                return 0
+            start = time.perf_counter()
+            rows = [
+                tuple(self.functions[name].get(column) for column in self.STATS) + (name,)
+                for name in self._dirty_stats if name in self.functions
+            ]
+            try:
+                self._conn.executemany(
+                    f"UPDATE functions SET {', '.join(f'{column} = ?' for column in self.STATS)} WHERE name = ?",
+                    rows
+                )
+                self._conn.commit()
+                self._dirty_stats.clear()
+            except Exception as e:
+                logger.error(f"Error volcando estadísticas del registry: {e}")
+                return 0
+        metrics.observe('registry.flush_time', time.perf_counter() - start)
+        return len(rows)
+
+    def close(self):
+        """Vuelca las estadísticas pendientes y cierra la base de datos"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=self.flush_interval + 1)
+        self.flush()
+        with self._lock:
+            self._conn.close()
+        atexit.unregister(self.close)
+
+    # API
+
+    def register(self, name: str, function: Any, description: Optional[str] = None,
+                file_path: Optional[str] = None, tags: Optional[list] = None,
+                function_type: Optional[str] = None) -> bool:
+        """
+        Registra o actualiza una función. Si ya existe se actualizan sus
+        metadatos conservando estadísticas y ajustes (timeout, caché, perfilado).
+        Args:
+            name: Nombre de la función
+            function: Objeto de la función
+            description: Descripción de la función
+            file_path: Ruta al archivo
+            tags: Lista de etiquetas
+            function_type: Tipo de función (juego, utilidad, etc.)
+        """
         try:
-            self.registry[name] = {
-                'path': str(file_path),
-                'description': description,
-                'type': function_type,
-                'extension': extension,
-                'created_at': str(datetime.now())
-            }
-            self._save_registry()
-            logger.info(f"Función registrada: {name}")
+            now = datetime.now().isoformat()
+
+            description = description or getattr(function, '__doc__', None)
+
+            with self._lock:
+                entry = self.functions.get(name)
+                if entry is None:
+                    self.functions[name] = {
+                        'name': name,
+                        'description': description or 'Sin descripción',
+                        'file_path': str(file_path) if file_path else None,
+                        'enabled': True,
+                        'created_at': now,
+                        'updated_at': now,
+                        'tags': tags or [],
+                        'function_type': function_type or 'utility',
+                        'version': '1.0.0',
+                        'usage_count': 0,
+                        'error_count': 0,
+                        'success_rate': 100,
+                        'average_execution_time': 0
+                    }
+                else:
+                    entry.update(enabled=True, updated_at=now)
+                    if description:
+                        entry['description'] = description
+                    if file_path:
+                        entry['file_path'] = str(file_path)
+                    if tags is not None:
+                        entry['tags'] = tags
+                    if function_type:
+                        entry['function_type'] = function_type
+                self._save_function(name)
+            self._notify('register', name)
             return True
+
         except Exception as e:
             logger.error(f"Error registrando función: {e}")
             return False
-    
-    def get_function_info(self, name: str) -> Optional[Dict[str, Any]]:
-        """Obtiene información de una función"""
-        return self.registry.get(name)
-    
+
+    def register_function(self, name: str, file_path: str, description: str,
+                          function_type: str, extension: str = '.py') -> bool:
+        """Registra una función a partir de su archivo (API anterior de app.core)"""
+        if not self.register(name, None, description, file_path, function_type=function_type):
+            return False
+        return self.update_function(name, extension=extension)
+
+    def update_function(self, name: str, **fields) -> bool:
+        """Actualiza metadatos de una función conservando sus estadísticas"""
+        with self._lock:
+            if name not in self.functions:
+                return False
+            self.functions[name].update(fields, updated_at=datetime.now().isoformat())
+            self._save_function(name)
+        self._notify('register', name)
+        return True
+
+    def set_cache_policy(self, name: str, cacheable: Optional[bool], ttl: Optional[float] = None) -> bool:
+        """
+        Fija si el resultado de una función se memoiza y durante cuánto tiempo
+        Args:
+            cacheable: True/False fuerza la política; None vuelve a la inferida del código
+            ttl: Segundos de validez (None = el de su clase)
+        """
+        with self._lock:
+            if name not in self.functions:
+                return False
+            self.functions[name].pop('cacheable', None)
+            self.functions[name].pop('cache_ttl', None)
+        fields = {}
+        if cacheable is not None:
+            fields['cacheable'] = cacheable
+        if ttl:
+            fields['cache_ttl'] = ttl
+        return self.update_function(name, **fields)
+
+    def set_timeout(self, name: str, seconds: Optional[float]) -> bool:
+        """
+        Fija el tiempo límite de una función
+        Args:
+            seconds: Segundos; None vuelve al calculado a partir de sus latencias
+        """
+        with self._lock:
+            if name not in self.functions:
+                return False
+            self.functions[name].pop('timeout', None)
+        if seconds:
+            return self.update_function(name, timeout=seconds)
+        return self.update_function(name)
+
+    def set_profiling(self, name: str, enabled: bool) -> bool:
+        """Activa o desactiva el perfilado de las ejecuciones de una función"""
+        with self._lock:
+            if name not in self.functions:
+                return False
+            self.functions[name].pop('profile', None)
+        if enabled:
+            return self.update_function(name, profile=True)
+        return self.update_function(name)
+
     def remove_function(self, name: str) -> bool:
         """Elimina una función del registro"""
+        with self._lock:
+            if name not in self.functions:
+                return False
+            del self.functions[name]
+            self._delete_function(name)
+        self._notify('remove', name)
+        logger.info(f"Función eliminada del registro: {name}")
+        return True
+
+    def add_listener(self, callback: Callable[[str, str, Optional[Dict[str, Any]]], None]):
+        """
+        Suscribe un callback a los cambios del registro
+        Args:
+            callback: Callable(evento, nombre, info) donde evento es
+                'register', 'enable', 'disable' o 'remove'
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, name: str):
+        """Notifica un cambio a los listeners sin interrumpir la operación"""
+        info = self.functions.get(name)
+        for callback in self._listeners:
+            try:
+                callback(event, name, info)
+            except Exception as e:
+                logger.error(f"Error notificando cambio en registry ({event} {name}): {e}")
+
+    def _analyze_system_requirements(self, function) -> Dict[str, Any]:
+        """Analiza los requisitos del sistema para una función"""
         try:
-            if name in self.registry:
-                del self.registry[name]
-                self._save_registry()
-                logger.info(f"Función eliminada del registro: {name}")
-                return True
-            return False
+            source = inspect.getsource(function)
+            reqs = {
+                'libraries': [],
+                'min_python_version': '3.6',
+                'gui_required': False,
+                'estimated_memory': 'low',
+                'file_access': False
+            }
+
+            # Analizar imports
+            for line in source.split('\n'):
+                if line.strip().startswith('import ') or line.strip().startswith('from '):
+                    lib = line.split()[1].split('.')[0]
+                    reqs['libraries'].append(lib)
+
+            # Detectar uso de GUI
+            if 'pygame' in reqs['libraries'] or 'tkinter' in reqs['libraries']:
+                reqs['gui_required'] = True
+                reqs['estimated_memory'] = 'medium'
+
+            # Detectar acceso a archivos
+            if 'open(' in source or 'Path' in source:
+                reqs['file_access'] = True
+
+            return reqs
+
         except Exception as e:
-            logger.error(f"Error eliminando función: {e}")
-            return False
-    
+            logger.error(f"Error analizando requisitos: {e}")
+            return {}
+
+    def _generate_usage_examples(self, name: str, description: str) -> List[Dict[str, str]]:
+        """Genera ejemplos de uso para una función"""
+        try:
+            examples = []
+
+            # Ejemplo básico
+            examples.append({
+                'description': 'Uso básico',
+                'code': f'result = {name}()',
+                'expected_output': 'Mensaje de éxito'
+            })
+
+            # TODO: Usar IA para generar ejemplos más específicos
+            # basados en la descripción de la función
+
+            return examples
+
+        except Exception as e:
+            logger.error(f"Error generando ejemplos: {e}")
+            return []
+
+    def _backup_function(self, name: str):
+        """Crea un backup de una función antes de actualizarla"""
+        try:
+            if name not in self.functions:
+                return
+
+            backup_dir = self.db_path.parent / "backups"
+            backup_dir.mkdir(parents=True, exist_ok=True)
+
+            # Crear backup del archivo
+            func_info = self.functions[name]
+            if func_info.get('file_path'):
+                source_file = Path(func_info['file_path'])
+                if source_file.exists():
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    backup_file = backup_dir / f"{name}_{timestamp}.py"
+
+                    with open(source_file, 'r') as src, open(backup_file, 'w') as dst:
+                        dst.write(src.read())
+
+                    # Registrar backup
+                    with self._lock:
+                        self.functions[name].setdefault('backup_history', []).append({
+                            'timestamp': timestamp,
+                            'version': func_info.get('version', '1.0.0'),
+                            'file_path': str(backup_file)
+                        })
+                        self._save_function(name)
+
+        except Exception as e:
+            logger.error(f"Error creando backup: {e}")
+
+    def update_usage(self, name: str, execution_time: float):
+        """Actualiza estadísticas de uso de una función (se vuelcan en diferido)"""
+        with self._lock:
+            if name not in self.functions:
+                return
+            current = self.functions[name]
+
+            # Actualizar estadísticas
+            count = current.get('usage_count', 0) + 1
+            avg_time = current.get('average_execution_time', 0)
+            new_avg = ((avg_time * (count - 1)) + execution_time) / count
+
+            current.update({
+                'last_used': datetime.now().isoformat(),
+                'usage_count': count,
+                'average_execution_time': new_avg
+            })
+            self._dirty_stats.add(name)
+
+    def get_function_info(self, name: str) -> Dict[str, Any]:
+        """Obtiene información detallada de una función"""
+        return self.functions.get(name, {})
+
+    def get_description(self, name):
+        """Get the description of a registered function"""
+        return self.functions.get(name, {}).get('description')
+
+    def list_functions(self) -> Dict[str, Dict[str, Any]]:
+        """Lista todas las funciones registradas (copia: el observador modifica el registro)"""
+        return self.get_all_functions()
+
     def get_all_functions(self) -> Dict[str, Dict[str, Any]]:
-        """Retorna todas las funciones registradas"""
-        return self.registry.copy() 
\ No newline at end of file
+        """Retorna una copia de todas las funciones registradas"""
+        with self._lock:
+            return {name: dict(data) for name, data in self.functions.items()}
+
+    def search_functions(self, query: str) -> Dict[str, Dict[str, Any]]:
+        """Busca funciones por nombre o descripción"""
+        query = query.lower()
+        return {
+            name: data for name, data in self.functions.items()
+            if query in name.lower() or query in (data.get('description') or '').lower()
+        }
+
+    def find_functions(self, function_type: Optional[str] = None, tag: Optional[str] = None,
+                       enabled: Optional[bool] = None) -> List[str]:
+        """Nombres de las funciones que cumplen los filtros (consulta por índices)"""
+        query = "SELECT f.name FROM functions f"
+        conditions, params = [], []
+        if tag is not None:
+            query += " JOIN function_tags t ON t.name = f.name"
+            conditions.append("t.tag = ?")
+            params.append(tag)
+        if function_type is not None:
+            conditions.append("f.function_type = ?")
+            params.append(function_type)
+        if enabled is not None:
+            conditions.append("f.enabled = ?")
+            params.append(int(enabled))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query + " ORDER BY f.name", params)]
+
+    def disable_function(self, name):
+        """Disable a function"""
+        with self._lock:
+            if name not in self.functions:
+                return
+            self.functions[name]['enabled'] = False
+            self._save_function(name)
+        self._notify('disable', name)
+
+    def enable_function(self, name):
+        """Enable a function"""
+        with self._lock:
+            if name not in self.functions:
+                return
+            self.functions[name]['enabled'] = True
+            self._save_function(name)
+        self._notify('enable', name)
+
+    def is_function_enabled(self, name: str) -> bool:
+        """Verifica si una función está habilitada"""
+        return self.functions.get(name, {}).get('enabled', False)
+
+    def get_function_stats(self, name: str) -> Dict[str, Any]:
+        """Obtiene estadísticas de uso de una función"""
+        if name not in self.functions:
+            return {}
+
+        func = self.functions[name]
+        return {
+            'usage_count': func.get('usage_count', 0),
+            'average_execution_time': func.get('average_execution_time', 0),
+            'last_used': func.get('last_used'),
+            'error_count': func.get('error_count', 0),
+            'success_rate': func.get('success_rate', 100)
+        }
+
+    def increment_error_count(self, name: str):
+        """Incrementa el contador de errores de una función (se vuelca en diferido)"""
+        with self._lock:
+            if name not in self.functions:
+                return
+            current = self.functions[name]
+            error_count = current.get('error_count', 0) + 1
+            total_uses = current.get('usage_count', 0)
+
+            if total_uses > 0:
+                success_rate = ((total_uses - error_count) / total_uses) * 100
+            else:
+                success_rate = 0
+
+            current.update({
+                'error_count': error_count,
+                'success_rate': success_rate
+            })
+            self._dirty_stats.add(name)
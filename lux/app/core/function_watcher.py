@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Set, Tuple, Callable, Optional
+
+logger = logging.getLogger('lux.functions')
+
+class FunctionWatcher:
+    """
+    Vigila el directorio de funciones por sondeo (un stat por archivo .py, sin
+    dependencias externas) y notifica los cambios agrupados: una ráfaga de
+    escrituras produce una sola recarga cuando el directorio lleva `debounce`
+    segundos sin cambios.
+    """
+
+    def __init__(self, directory: Path, callback: Callable[[Set[Path], Set[Path]], None],
+                 interval: float = 1.0, debounce: float = 0.5):
+        """
+        Args:
+            directory: Directorio a vigilar
+            callback: Callable(modificados, eliminados) con las rutas afectadas;
+                los archivos nuevos cuentan como modificados
+            interval: Segundos entre sondeos sin cambios pendientes
+            debounce: Segundos de calma antes de notificar una ráfaga
+        """
+        self.directory = Path(directory).resolve()
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+
+        self._snapshot_state = self._snapshot()
+        self._pending_changed: Set[str] = set()
+        self._pending_removed: Set[str] = set()
+        self._last_change = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime, tamaño) de cada archivo de funciones"""
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.py') or entry.name.startswith('_') or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending_changed or self._pending_removed)
+
+    def poll(self) -> bool:
+        """
+        Un sondeo: acumula los cambios y los notifica si la ráfaga terminó
+        Returns:
+            bool: True si se notificaron cambios
+        """
+        current = self._snapshot()
+        previous, self._snapshot_state = self._snapshot_state, current
+
+        changed = {name for name, state in current.items() if previous.get(name) != state}
+        removed = previous.keys() - current.keys()
+        if changed or removed:
+            self._pending_changed = (self._pending_changed | changed) - removed
+            self._pending_removed = (self._pending_removed | removed) - changed
+            self._last_change = time.monotonic()
+            return False
+
+        if not self.pending or time.monotonic() - self._last_change < self.debounce:
+            return False
+
+        changed_paths = {self.directory / name for name in self._pending_changed}
+        removed_paths = {self.directory / name for name in self._pending_removed}
+        self._pending_changed, self._pending_removed = set(), set()
+        logger.info(f"Cambios en funciones: {len(changed_paths)} modificados, {len(removed_paths)} eliminados")
+        try:
+            self.callback(changed_paths, removed_paths)
+        except Exception as e:
+            logger.error(f"Error recargando funciones: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.debounce if self.pending else self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error vigilando {self.directory}: {e}")
+
+    def start(self) -> 'FunctionWatcher':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='lux-function-watcher', daemon=True)
+            self._thread.start()
+            logger.info(f"Vigilando cambios en {self.directory}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
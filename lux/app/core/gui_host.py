@@ -0,0 +1,302 @@
+import itertools
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, Iterable, List
+
+from .. import config
+from .metrics import metrics
+from .safe_executor import SafeExecutor, _load_from_file, _picklable
+
+logger = logging.getLogger('lux.gui')
+
+# Módulos cuya presencia convierte una función en función de interfaz
+GUI_MODULES = frozenset({'PyQt6', 'PyQt5', 'PySide6', 'PySide2'})
+
+def is_gui_function(imports: Iterable[str]) -> bool:
+    """True si los imports (de primer nivel) de una función usan Qt"""
+    return bool(GUI_MODULES.intersection(imports))
+
+# Proceso anfitrión
+#
+# Un único QApplication de larga duración. Las funciones generadas crean su
+# propia QApplication y llaman a app.exec(); dentro del anfitrión QApplication
+# se sustituye por un proxy de la instancia compartida cuyo exec() no bloquea.
+# Las ventanas que muestra cada petición se retienen desde show()/exec() (si
+# no, se destruirían al salir de la función) hasta que el usuario las cierra.
+
+class _AppProxy:
+    """Instancia compartida vista desde una función: exec() y quit() no afectan al anfitrión"""
+
+    def __init__(self, app, on_exec: Callable[[], None]):
+        self._app = app
+        self._on_exec = on_exec
+
+    def exec(self) -> int:
+        self._on_exec()
+        return 0
+
+    exec_ = exec
+
+    def quit(self):
+        pass
+
+    def exit(self, code: int = 0):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+class _ForwardingMeta(type):
+    def __getattr__(cls, name):
+        return getattr(cls._real, name)
+
+class _SharedApplication(metaclass=_ForwardingMeta):
+    """Sustituto de QApplication en el anfitrión: siempre retorna la instancia única"""
+    _real = None
+    _app = None
+    _on_exec: Callable[[], None] = staticmethod(lambda: None)
+
+    def __new__(cls, *args, **kwargs):
+        return _AppProxy(cls._app, cls._on_exec)
+
+    @classmethod
+    def instance(cls):
+        return _AppProxy(cls._app, cls._on_exec)
+
+class _HostLoop:
+    def __init__(self, app, conn):
+        self.app = app
+        self.conn = conn
+        self.windows: Dict[int, List[Any]] = {}  # petición -> ventanas abiertas
+        self._current: List[Any] = []  # ventanas mostradas por la petición en curso
+
+    def retain(self, widget=None):
+        """Retiene una ventana mostrada (o todas las visibles) durante la petición en curso"""
+        candidates = [widget] if widget is not None else self.app.topLevelWidgets()
+        kept = self._current + [window for windows in self.windows.values() for window in windows]
+        for candidate in candidates:
+            if candidate.isWindow() and candidate.isVisible() and not any(candidate is k for k in kept):
+                self._current.append(candidate)
+                kept.append(candidate)
+
+    def poll(self):
+        """Atiende los mensajes pendientes y avisa de las peticiones cuyas ventanas se cerraron"""
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                if message is None:
+                    self.app.quit()
+                    return
+                self._open(*message)
+        except (EOFError, OSError):
+            # El proceso principal terminó
+            self.app.quit()
+            return
+
+        for request_id, windows in list(self.windows.items()):
+            if not any(window.isVisible() for window in windows):
+                del self.windows[request_id]
+                for window in windows:
+                    window.deleteLater()
+                self._send(('closed', request_id))
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+        except (EOFError, OSError):
+            self.app.quit()
+
+    def _open(self, request_id: int, reference: tuple, args: tuple, kwargs: dict):
+        self._current = []
+        start = time.perf_counter()
+        try:
+            if reference[0] == 'file':
+                function = _load_from_file(reference[1], reference[2])
+            else:
+                function = pickle.loads(reference[1])
+            try:
+                result = function(*args, **kwargs)
+            except SystemExit:
+                # sys.exit(app.exec()) en plantillas antiguas
+                result = None
+            response = {'success': True, 'result': _picklable(result)}
+        except Exception as e:
+            response = {
+                'success': False,
+                'error': str(e),
+                'type': 'runtime',
+                'traceback': traceback.format_exc()
+            }
+
+        windows = [widget for widget in self._current if widget.isVisible()]
+        self._current = []
+        response.update({'execution_time': time.perf_counter() - start, 'windows': len(windows)})
+        self._send(('result', request_id, response))
+        if windows:
+            self.windows[request_id] = windows
+        else:
+            self._send(('closed', request_id))
+
+def _host_main(conn, poll_interval_ms: int):
+    """Proceso anfitrión: crea el QApplication y atiende peticiones desde su bucle de eventos"""
+    from PyQt6 import QtWidgets
+    from PyQt6.QtCore import QTimer
+
+    app = QtWidgets.QApplication(['lux-gui-host'])
+    app.setQuitOnLastWindowClosed(False)
+    _SharedApplication._real = QtWidgets.QApplication
+    _SharedApplication._app = app
+    QtWidgets.QApplication = _SharedApplication
+
+    loop = _HostLoop(app, conn)
+    _SharedApplication._on_exec = staticmethod(loop.retain)
+    show = QtWidgets.QWidget.show
+
+    def retaining_show(widget):
+        show(widget)
+        loop.retain(widget)
+
+    QtWidgets.QWidget.show = retaining_show
+    timer = QTimer()
+    timer.timeout.connect(loop.poll)
+    timer.start(poll_interval_ms)
+    conn.send(('ready', None))
+    app.exec()
+
+# Proceso principal
+
+class GuiHost:
+    """
+    Proceso anfitrión de interfaz para las funciones generadas con PyQt: un
+    solo QApplication que se arranca una vez (en la primera función de interfaz)
+    y abre las ventanas sin bloquear a quien llama. El resultado de la función
+    llega al abrirse la ventana; el cierre se notifica después por callback.
+    """
+
+    def __init__(self, open_timeout: Optional[float] = None, poll_interval_ms: int = 50):
+        self.open_timeout = config.GUI_HOST_OPEN_TIMEOUT if open_timeout is None else open_timeout
+        self.poll_interval_ms = poll_interval_ms
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._on_closed: Dict[int, Callable[[], None]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self.running:
+                return
+            start = time.perf_counter()
+            self._ready.clear()
+            self._conn, child_conn = self._context.Pipe()
+            self._process = self._context.Process(target=_host_main, args=(child_conn, self.poll_interval_ms),
+                                                  name='lux-gui-host', daemon=True)
+            self._process.start()
+            child_conn.close()
+            threading.Thread(target=self._read_loop, args=(self._conn,), name='lux-gui-reader', daemon=True).start()
+
+        if not self._ready.wait(self.open_timeout):
+            raise TimeoutError("El anfitrión de interfaz no respondió")
+        metrics.observe('gui_host.startup', time.perf_counter() - start)
+        logger.info(f"Anfitrión de interfaz iniciado ({time.perf_counter() - start:.2f} s)")
+
+    def _read_loop(self, conn):
+        while True:
+            try:
+                kind, request_id, *payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'ready':
+                self._ready.set()
+            elif kind == 'result':
+                future = self._pending.pop(request_id, None)
+                if future:
+                    future.set_result(payload[0])
+            elif kind == 'closed':
+                callback = self._on_closed.pop(request_id, None)
+                if callback:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error(f"Error en aviso de cierre de ventana: {e}")
+
+        # El anfitrión terminó: fallar lo pendiente; se relanza en la próxima petición
+        for future in self._pending.values():
+            future.set_result({'success': False, 'error': "El anfitrión de interfaz terminó", 'type': 'runtime'})
+        self._pending.clear()
+        self._on_closed.clear()
+        logger.warning("Anfitrión de interfaz detenido")
+
+    def open(self, function: Any, *args, on_closed: Optional[Callable[[], None]] = None,
+             arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Future:
+        """
+        Abre la ventana de una función en el anfitrión sin bloquear
+        Args:
+            function: LazyFunction del manifiesto o función importable
+            on_closed: Callable que se invoca cuando se cierran sus ventanas
+            arguments: Argumentos con nombre de la función, separados de las opciones
+        Returns:
+            Future con el dict de resultado (success, result/error, execution_time, windows)
+        """
+        reference = SafeExecutor._reference(function)
+        if reference is None:
+            raise ValueError(f"No se puede enviar {getattr(function, '__name__', function)} al anfitrión de interfaz")
+
+        self._ensure_started()
+        request_id = next(self._ids)
+        future: Future = Future()
+        self._pending[request_id] = future
+        if on_closed:
+            self._on_closed[request_id] = on_closed
+        try:
+            self._conn.send((request_id, reference, args, {**kwargs, **(arguments or {})}))
+        except (EOFError, OSError) as e:
+            self._pending.pop(request_id, None)
+            self._on_closed.pop(request_id, None)
+            raise RuntimeError(f"Anfitrión de interfaz no disponible: {e}")
+        return future
+
+    def execute(self, function: Any, *args, on_closed: Optional[Callable[[], None]] = None,
+                arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Abre la ventana y espera solo hasta que la función retorna (no hasta que se cierra)"""
+        start = time.perf_counter()
+        try:
+            response = self.open(function, *args, on_closed=on_closed, arguments=arguments,
+                                 **kwargs).result(timeout=self.open_timeout)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"No se pudo abrir la ventana: {e}",
+                'type': 'timeout' if isinstance(e, TimeoutError) else 'runtime',
+                'execution_time': time.perf_counter() - start
+            }
+        if not response['success']:
+            logger.debug(response.pop('traceback', ''))
+        metrics.observe('gui_host.open_time', time.perf_counter() - start)
+        return response
+
+    def shutdown(self):
+        """Cierra el anfitrión y sus ventanas"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except (EOFError, OSError):
+                    pass
+            if self._process is not None:
+                self._process.join(timeout=2)
+                if self._process.is_alive():
+                    self._process.kill()
+            self._process = None
@@ -0,0 +1,176 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Union
+
+from .. import config
+from .metrics import metrics
+
+logger = logging.getLogger('lux')
+
+# Permisos de los archivos nuevos según la umask del proceso (mkstemp crea 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_DEFAULT_MODE = 0o666 & ~_UMASK
+
+# Almacenes vivos: se vuelcan al salir sin que atexit los mantenga en memoria
+_stores: 'weakref.WeakSet[JsonStore]' = weakref.WeakSet()
+
+def _flush_all():
+    for store in list(_stores):
+        store.flush()
+
+atexit.register(_flush_all)
+
+class JsonStore:
+    """
+    Archivo JSON con un objeto de primer nivel, mantenido en memoria: las
+    consultas son accesos a un dict y el archivo solo se vuelve a leer si su
+    fecha de modificación o tamaño cambian (edición externa).
+
+    Las escrituras se agrupan: varios cambios seguidos producen una sola
+    escritura tras write_delay segundos. Cada escritura va a un archivo
+    temporal del mismo directorio que luego reemplaza al original, así que
+    una caída a mitad nunca deja el archivo a medias.
+    """
+
+    def __init__(self, path: Union[str, Path], write_delay: Optional[float] = None):
+        """
+        Args:
+            path: Archivo JSON
+            write_delay: Segundos que se agrupan los cambios (0 = escribir en cada cambio)
+        """
+        self.path = Path(path).absolute()  # el volcado al salir no depende del cwd
+        self.write_delay = config.JSON_STORE_WRITE_DELAY if write_delay is None else write_delay
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+        _stores.add(self)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """Lee el archivo (con el lock tomado o durante la construcción)"""
+        stamp = self._file_stamp()
+        if stamp is None:
+            self._data, self._stamp = {}, None
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            self._data = data
+            metrics.increment('json_store.loads')
+        except Exception as e:
+            logger.error(f"Error leyendo {self.path}: {e}")
+            self._data = {}
+        self._stamp = stamp
+
+    def _refresh(self):
+        """Relee el archivo si alguien más lo modificó (con el lock tomado)"""
+        if self._file_stamp() == self._stamp:
+            return
+        if self._dirty:
+            # Hay cambios propios sin volcar: prevalecen sobre la edición externa
+            logger.warning(f"{self.path} cambió en disco con cambios pendientes; se conservan los de memoria")
+            return
+        self._load()
+
+    # Lectura
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data.get(key, default))
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return key in self._data
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de todo el contenido"""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    # Escritura
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._refresh()
+            self._data[key] = copy.deepcopy(value)
+            self._changed()
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._refresh()
+            if key not in self._data:
+                return default
+            value = self._data.pop(key)
+            self._changed()
+            return value
+
+    def _changed(self):
+        self._dirty = True
+        if self.write_delay <= 0:
+            self._write()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.write_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """Escribe los cambios pendientes; True si se escribió algo"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return False
+            return self._write()
+
+    def _write(self) -> bool:
+        """Escritura atómica: temporal + fsync + rename (con el lock tomado)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix='.tmp', dir=self.path.parent)
+            try:
+                try:
+                    mode = os.stat(self.path).st_mode & 0o7777
+                except OSError:
+                    mode = _DEFAULT_MODE
+                os.fchmod(fd, mode)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporary, self.path)
+            except BaseException:
+                try:
+                    os.unlink(temporary)
+                except OSError:
+                    pass
+                raise
+            self._stamp = self._file_stamp()
+            self._dirty = False
+            metrics.increment('json_store.writes')
+            return True
+        except Exception as e:
+            logger.error(f"Error guardando {self.path}: {e}")
+            return False
@@ -4,6 +4,7 @@ import json
 from datetime import datetime
 from typing import Dict, Any
 import os
+from .metrics import metrics
 
 class LogManager:
     def __init__(self):
@@ -114,21 +115,7 @@ class LogManager:
                 
         # Actualizar métricas
         try:
-            if metrics_file.exists():
-                with open(metrics_file, 'r') as f:
-                    metrics = json.load(f)
-            else:
-                metrics = {
-                    'total_executions': 0,
-                    'successful_executions': 0,
-                    'total_execution_time': 0,
-                    'average_execution_time': 0,
-                    'total_memory_used': 0,
-                    'average_memory_used': 0,
-                    'error_count': 0,
-                    'last_execution': None,
-                    'execution_history': []
-                }
+            metrics = self._load_function_metrics(metrics_file)
                 
             # Actualizar estadísticas
             metrics['total_executions'] += 1
@@ -160,6 +147,41 @@ class LogManager:
         except Exception as e:
             logging.error(f"Error updating metrics for {function_name}: {e}")
             
+    def _load_function_metrics(self, metrics_file: Path) -> Dict[str, Any]:
+        metrics = {
+            'total_executions': 0,
+            'successful_executions': 0,
+            'total_execution_time': 0,
+            'average_execution_time': 0,
+            'total_memory_used': 0,
+            'average_memory_used': 0,
+            'error_count': 0,
+            'last_execution': None,
+            'execution_history': []
+        }
+        if metrics_file.exists():
+            with open(metrics_file, 'r') as f:
+                metrics.update(json.load(f))
+        return metrics
+
+    def attach_profile(self, function_name: str, profile: Dict[str, Any]):
+        """Enlaza un perfil guardado (rutas y marcos más costosos) desde las métricas de la función"""
+        metrics_file = self.logs_dir / 'metrics' / f'{function_name}_metrics.json'
+        try:
+            metrics_file.parent.mkdir(parents=True, exist_ok=True)
+            metrics = self._load_function_metrics(metrics_file)
+            metrics['last_profile'] = profile
+            # Solo las rutas de los anteriores: el resumen completo es el del último
+            metrics['profiles'] = (metrics.get('profiles', []) + [{
+                'timestamp': profile['timestamp'],
+                'pstats': profile['pstats'],
+                'collapsed': profile['collapsed']
+            }])[-20:]
+            with open(metrics_file, 'w') as f:
+                json.dump(metrics, f, indent=2)
+        except Exception as e:
+            logging.error(f"Error enlazando perfil de {function_name}: {e}")
+
     def get_function_metrics(self, function_name: str) -> Dict[str, Any]:
         """Obtiene las métricas de una función"""
         metrics_file = self.logs_dir / 'metrics' / f'{function_name}_metrics.json'
@@ -167,4 +189,12 @@ class LogManager:
         if metrics_file.exists():
             with open(metrics_file, 'r') as f:
                 return json.load(f)
-        return {} 
\ No newline at end of file
+        return {}
+
+    def get_runtime_metrics(self) -> Dict[str, Any]:
+        """Obtiene las métricas en memoria (cachés, latencias, colas)"""
+        return metrics.snapshot()
+
+    def save_runtime_metrics(self):
+        """Guarda las métricas en memoria junto a las métricas por función"""
+        metrics.save(self.logs_dir / 'metrics' / 'runtime.json')
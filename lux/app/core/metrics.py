@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Deque
+
+logger = logging.getLogger('lux.metrics')
+
+class MetricsRegistry:
+    """
+    Métricas de ejecución en memoria: contadores y distribuciones de valores
+    (latencias en segundos, tamaños, etc.) con una ventana acotada de muestras
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Incrementa un contador"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Fija el valor actual de una métrica instantánea (p. ej. profundidad de cola)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Registra una muestra en una distribución"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mide la duración de un bloque y la registra en la distribución `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def get_counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def percentile(self, name: str, q: float) -> float:
+        """Percentil q (0-100) de la distribución, 0 si no hay muestras"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self, name: str) -> Dict[str, float]:
+        """Resumen de una distribución: count, mean, p50, p95 y p99"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+
+        def pick(q):
+            return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+        return {
+            'count': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p50': pick(50),
+            'p95': pick(95),
+            'p99': pick(99)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual de todas las métricas"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            names = list(self._samples)
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'counters': counters,
+            'gauges': gauges,
+            'distributions': {name: self.summary(name) for name in names}
+        }
+
+    def save(self, path: Path = Path("resources/logs/metrics/runtime.json")):
+        """Guarda una instantánea en disco"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+        except Exception as e:
+            logger.error(f"Error guardando métricas: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+            self._gauges.clear()
+
+# Registro compartido por toda la aplicación
+metrics = MetricsRegistry()
@@ -1,7 +1,8 @@
 import logging
-from typing import Dict, List, Set, Optional
+from typing import List, Optional
 from pathlib import Path
-import json
+from .code_facts import NETWORK_MODULES, analyze_code
+from .json_store import JsonStore
 
 logger = logging.getLogger('lux.permissions')
 
@@ -14,7 +15,6 @@ class Permission:
 class PermissionManager:
     def __init__(self):
         self.permissions_file = Path("resources/permissions.json")
-        self.function_permissions: Dict[str, Set[str]] = {}
         
         # Definir permisos disponibles
         self.available_permissions = {
@@ -50,59 +50,31 @@ class PermissionManager:
             )
         }
         
-        self._load_permissions()
+        self._store = JsonStore(self.permissions_file)
         
-    def _load_permissions(self):
-        """Carga los permisos desde el archivo"""
-        try:
-            if self.permissions_file.exists():
-                with open(self.permissions_file, 'r') as f:
-                    data = json.load(f)
-                    self.function_permissions = {
-                        func: set(perms)
-                        for func, perms in data.items()
-                    }
-            else:
-                self._save_permissions()
-                
-        except Exception as e:
-            logger.error(f"Error cargando permisos: {e}")
-            
-    def _save_permissions(self):
-        """Guarda los permisos en el archivo"""
-        try:
-            data = {
-                func: list(perms)
-                for func, perms in self.function_permissions.items()
-            }
-            
-            with open(self.permissions_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
-        except Exception as e:
-            logger.error(f"Error guardando permisos: {e}")
-            
     def analyze_required_permissions(self, code: str) -> List[Permission]:
         """Analiza el código para determinar los permisos necesarios"""
         required_permissions = set()
+        facts = analyze_code(code)
+        modules = facts.modules
+        call_names = {call.name for call in facts.calls}
         
         # Buscar operaciones que requieren permisos
-        if 'open(' in code or 'Path(' in code:
-            if 'write' in code or 'create' in code:
-                required_permissions.add('file_write')
-            else:
-                required_permissions.add('file_read')
+        if facts.file_writes:
+            required_permissions.add('file_write')
+        elif facts.file_operations:
+            required_permissions.add('file_read')
                 
-        if 'socket' in code or 'urllib' in code or 'requests' in code:
+        if modules & NETWORK_MODULES or facts.network_operations:
             required_permissions.add('network_access')
             
-        if 'subprocess' in code or 'os.system' in code:
+        if 'subprocess' in modules or call_names & {'os.system', 'os.popen'}:
             required_permissions.add('system_exec')
             
-        if 'pygame' in code or 'tkinter' in code:
+        if modules & {'pygame', 'tkinter', 'PyQt5', 'PyQt6'}:
             required_permissions.add('gui_access')
             
-        if 'input(' in code or 'keyboard' in code:
+        if 'input' in call_names or modules & {'keyboard', 'pynput'}:
             required_permissions.add('input_device')
             
         return [
@@ -120,8 +92,7 @@ class PermissionManager:
                 logger.error(f"Permisos inválidos: {invalid_perms}")
                 return False
                 
-            self.function_permissions[function_name] = set(permissions)
-            self._save_permissions()
+            self._store.set(function_name, sorted(set(permissions)))
             return True
             
         except Exception as e:
@@ -130,20 +101,17 @@ class PermissionManager:
             
     def check_permissions(self, function_name: str, required_permissions: List[str]) -> bool:
         """Verifica si una función tiene los permisos necesarios"""
-        if function_name not in self.function_permissions:
+        granted_permissions = self._store.get(function_name)
+        if granted_permissions is None:
             return False
             
-        granted_permissions = self.function_permissions[function_name]
-        return all(perm in granted_permissions for perm in required_permissions)
+        return set(required_permissions) <= set(granted_permissions)
         
     def get_function_permissions(self, function_name: str) -> List[Permission]:
         """Obtiene los permisos de una función"""
-        if function_name not in self.function_permissions:
-            return []
-            
         return [
             self.available_permissions[perm]
-            for perm in self.function_permissions[function_name]
+            for perm in self._store.get(function_name, [])
             if perm in self.available_permissions
         ]
         
@@ -152,13 +120,12 @@ class PermissionManager:
         try:
             if permissions is None:
                 # Revocar todos los permisos
-                self.function_permissions.pop(function_name, None)
+                self._store.pop(function_name)
             else:
                 # Revocar permisos específicos
-                if function_name in self.function_permissions:
-                    self.function_permissions[function_name] -= set(permissions)
-                    
-            self._save_permissions()
+                granted = self._store.get(function_name)
+                if granted is not None:
+                    self._store.set(function_name, sorted(set(granted) - set(permissions)))
             
         except Exception as e:
             logger.error(f"Error revocando permisos: {e}") 
\ No newline at end of file
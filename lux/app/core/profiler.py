@@ -0,0 +1,122 @@
+import cProfile
+import logging
+import marshal
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+from .. import config
+
+logger = logging.getLogger('lux.executor')
+
+# Perfilado de una ejecución
+#
+# Se usa dentro del trabajador (o del hilo que ejecuta la función): cProfile
+# da los tiempos por función (pstats) y un muestreador en otro hilo toma la
+# pila completa cada pocos milisegundos (pilas colapsadas para flamegraph.pl
+# o speedscope). Todo lo que se retorna se puede enviar por el pipe.
+
+class _StackSampler(threading.Thread):
+    """Muestrea la pila de un hilo por encima del marco raíz de la llamada perfilada"""
+
+    def __init__(self, thread_id: int, root_code, interval: float):
+        super().__init__(name='lux-profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.root_code:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frame is not None and stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop_event.set()
+        self.join()
+        return dict(self.stacks)
+
+def top_frames(stats: Dict[Tuple, Tuple], limit: int) -> List[Dict[str, Any]]:
+    """Funciones con más tiempo propio según los datos de cProfile"""
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.items():
+        if filename == '~':
+            name = name.strip('<>')  # funciones internas: <built-in method time.sleep>
+            location = 'builtin'
+        else:
+            location = f"{Path(filename).name}:{line}"
+        rows.append({
+            'function': name,
+            'location': location,
+            'calls': calls,
+            'self_time': round(tottime, 6),
+            'total_time': round(cumtime, 6)
+        })
+    rows.sort(key=lambda row: row['self_time'], reverse=True)
+    return rows[:limit]
+
+def profile_call(call: Callable[[], Any], interval: Optional[float] = None,
+                 top_n: Optional[int] = None) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Ejecuta call() perfilada
+    Returns:
+        (resultado, perfil) con perfil = {'pstats': bytes, 'collapsed': {pila: muestras}, 'top': [...]}
+        Las excepciones de call() se propagan sin perfil.
+    """
+    interval = config.PROFILE_SAMPLE_INTERVAL if interval is None else interval
+    top_n = config.PROFILE_TOP_N if top_n is None else top_n
+
+    def profiled_root():
+        return call()
+
+    profiler = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), profiled_root.__code__, interval)
+    sampler.start()
+    try:
+        result = profiler.runcall(profiled_root)
+    finally:
+        collapsed = sampler.stop()
+    profiler.create_stats()
+    return result, {
+        'pstats': marshal.dumps(profiler.stats),
+        'collapsed': collapsed,
+        'top': top_frames(profiler.stats, top_n)
+    }
+
+def save_profile(function_name: str, profile: Dict[str, Any],
+                 directory: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+    """
+    Guarda un perfil como <función>/<fecha>.pstats (legible con pstats.Stats)
+    y <función>/<fecha>.collapsed (una línea "marco;marco;... muestras" por pila)
+    Returns:
+        Entrada para las métricas de la función: rutas y marcos más costosos
+    """
+    directory = Path(config.PROFILE_DIR if directory is None else directory) / function_name
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    pstats_path = directory / f"{stamp}.pstats"
+    collapsed_path = directory / f"{stamp}.collapsed"
+
+    pstats_path.write_bytes(profile['pstats'])
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        for stack, samples in sorted(profile['collapsed'].items()):
+            f.write(f"{stack} {samples}\n")
+
+    logger.info(f"Perfil de {function_name} guardado en {pstats_path}")
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'pstats': str(pstats_path),
+        'collapsed': str(collapsed_path),
+        'samples': sum(profile['collapsed'].values()),
+        'top': profile['top']
+    }
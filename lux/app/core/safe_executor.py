@@ -1,13 +1,28 @@
+import asyncio
+import atexit
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import tempfile
 import threading
-import signal
-from typing import Optional, Any, Dict
+import time
+import traceback
+from concurrent.futures import Future
+from typing import Optional, Any, Dict, List, Tuple, Callable, Iterable, AsyncIterable
 import logging
 from pathlib import Path
-import tempfile
-import os
-import sys
 import platform
 
+from .. import config
+from .metrics import metrics
+from .function_manifest import LazyFunction
+from .async_loop import get_async_loop
+from .profiler import profile_call
+
 logger = logging.getLogger('lux.executor')
 
 class TimeoutError(Exception):
@@ -16,101 +31,640 @@ class TimeoutError(Exception):
 class ResourceLimitError(Exception):
     pass
 
+# Proceso trabajador
+#
+# Se ejecuta en procesos hijos creados desde un forkserver que ya importó este
+# módulo (y los de SAFE_EXECUTOR_PRELOAD), así que arrancar uno es barato.
+# Los límites y el cambio de directorio afectan solo al trabajador.
+
+_module_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+def _load_from_file(path: str, name: str):
+    """Importa (o reutiliza mientras no cambie el archivo) el módulo de una función"""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _module_cache.get(path)
+    if cached and cached[0] == key:
+        module = cached[1]
+    else:
+        spec = importlib.util.spec_from_file_location(Path(path).stem, path)
+        if not spec or not spec.loader:
+            raise ImportError(f"No se pudo cargar {path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _module_cache[path] = (key, module)
+    return getattr(module, name)
+
+def _peak_rss_reset():
+    """Reinicia el pico de memoria del proceso (Linux); False si no es posible"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss() -> int:
+    """Pico de memoria residente en bytes"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        return peak if platform.system() == 'Darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+def _virtual_memory() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+def _apply_worker_limits(limits: Dict[str, int]):
+    """Límites permanentes del trabajador (memoria, archivos y procesos)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    # La memoria se limita por encima de lo que ya ocupa el intérprete con los preimports
+    memory = _virtual_memory() + limits['memory']
+    for name, value in (('RLIMIT_AS', memory), ('RLIMIT_NOFILE', limits['files']),
+                        ('RLIMIT_NPROC', limits['processes'])):
+        if value <= 0 or not hasattr(resource, name):
+            continue
+        try:
+            resource.setrlimit(getattr(resource, name), (value, value))
+        except (ValueError, OSError) as e:
+            logger.debug(f"No se pudo aplicar {name}: {e}")
+
+def _set_cpu_limit(seconds: float):
+    """Límite de CPU para la tarea actual (acumulado del proceso + margen)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+def _picklable(value: Any) -> Any:
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return repr(value)
+
+def _drain(chunks: Iterable[Any], on_chunk: Optional[Callable[[Any], None]]) -> str:
+    """Consume los fragmentos de una función generadora; el resultado es el texto completo"""
+    parts = []
+    for chunk in chunks:
+        parts.append(str(chunk))
+        if on_chunk:
+            on_chunk(chunk)
+    return "\n".join(parts)
+
+async def _drain_async(chunks: AsyncIterable[Any], on_chunk: Optional[Callable[[Any], None]]) -> str:
+    parts = []
+    async for chunk in chunks:
+        parts.append(str(chunk))
+        if on_chunk:
+            on_chunk(chunk)
+    return "\n".join(parts)
+
+def _call(function: Callable, args: tuple, kwargs: dict,
+          on_chunk: Optional[Callable[[Any], None]], profile: bool) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Llama a la función (vaciando las generadoras), perfilada si se pide"""
+    def call():
+        result = function(*args, **kwargs)
+        return _drain(result, on_chunk) if inspect.isgenerator(result) else result
+
+    if profile:
+        return profile_call(call)
+    return call(), None
+
+def _use_site_dir(site_dir: Optional[str]):
+    """
+    Hace importables en el trabajador los paquetes de un entorno aislado, con
+    prioridad sobre los del intérprete. Solo en trabajadores: el sys.path del
+    proceso principal no se toca
+    """
+    if not site_dir or site_dir in sys.path:
+        return
+    sys.path.insert(0, site_dir)
+    importlib.invalidate_caches()
+
+def _worker_main(conn, limits: Dict[str, int]):
+    """
+    Bucle del trabajador: recibe (referencia, args, kwargs, max_time, site_dir,
+    profile) y responde con el dict de resultado; las funciones generadoras
+    envían antes cada fragmento como ('chunk', valor)
+    """
+    _apply_worker_limits(limits)
+    workdir = tempfile.mkdtemp(prefix='lux-worker-')
+    os.chdir(workdir)
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        reference, args, kwargs, max_time, site_dir, profile = task
+        _use_site_dir(site_dir)
+        _set_cpu_limit(max_time)
+        _peak_rss_reset()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        response: Dict[str, Any]
+        try:
+            kind = reference[0]
+            if kind == 'file':
+                function = _load_from_file(reference[1], reference[2])
+            else:
+                function = pickle.loads(reference[1])
+
+            with tempfile.TemporaryDirectory(dir=workdir) as task_dir:
+                os.chdir(task_dir)
+                try:
+                    result, profile_data = _call(function, args, kwargs,
+                                                 lambda chunk: conn.send(('chunk', _picklable(chunk))), profile)
+                finally:
+                    os.chdir(workdir)
+            response = {'success': True, 'result': _picklable(result)}
+            if profile_data:
+                response['profile'] = profile_data
+        except MemoryError:
+            response = {'success': False, 'error': "Función excedió el límite de memoria", 'type': 'resource_limit'}
+        except Exception as e:
+            response = {
+                'success': False,
+                'error': str(e),
+                'type': 'runtime',
+                'traceback': traceback.format_exc()
+            }
+
+        response.update({
+            'execution_time': time.perf_counter() - start_wall,
+            'cpu_time': time.process_time() - start_cpu,
+            'peak_rss': _peak_rss()
+        })
+        try:
+            conn.send(response)
+        except (EOFError, OSError):
+            break
+
+# Proceso principal
+
+class _Worker:
+    def __init__(self, context, limits: Dict[str, int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, limits),
+                                       name='lux-executor-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        self.site_dir: Optional[str] = None  # entorno cuyos paquetes ya importó
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        except Exception:
+            pass
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=1)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
 class SafeExecutor:
-    def __init__(self, max_time: int = 30, max_memory: int = 100 * 1024 * 1024):  # 100MB default
+    """
+    Ejecuta funciones de usuario en un pool de procesos trabajadores precalentados
+    (forkserver con módulos comunes preimportados). Cada trabajador tiene sus
+    propios rlimits y directorio de trabajo; si una ejecución supera el tiempo
+    límite el trabajador se mata y se reemplaza. Retorna tiempo real, tiempo
+    de CPU y pico de memoria medidos en el trabajador.
+
+    Las funciones que no se pueden enviar a otro proceso (métodos ligados a
+    servicios de la app, closures) se ejecutan en un hilo del proceso
+    principal, sin límites de recursos. Las funciones async se ejecutan en el
+    bucle asyncio compartido del proceso principal y se cancelan al vencer
+    el tiempo límite. Las funciones generadoras (también async) entregan cada
+    fragmento a on_chunk mientras siguen ejecutándose; su resultado final es
+    el texto completo.
+
+    Las funciones con entorno de paquetes aislado (site_dir) se ejecutan en
+    trabajadores limpios o que ya usaban ese mismo entorno; un trabajador con
+    paquetes de otro entorno se recicla.
+
+    Una ejecución en un trabajador se puede abandonar con el evento cancel:
+    el trabajador se mata y se reemplaza (en hilos y en el bucle asyncio no
+    hay forma de detenerla y el evento se ignora).
+    """
+
+    # Intervalo con el que un trabajador ocupado comprueba el evento cancel
+    CANCEL_POLL_INTERVAL = 0.05
+
+    def __init__(self, max_time: int = 30, max_memory: int = 100 * 1024 * 1024,  # 100MB default
+                 workers: Optional[int] = None, mode: Optional[str] = None,
+                 max_tasks_per_worker: Optional[int] = None):
         self.max_time = max_time  # segundos
         self.max_memory = max_memory  # bytes
-        self.result = None
-        self.error = None
         self.is_windows = platform.system() == 'Windows'
-        
-    def _timeout_handler(self, signum, frame):
-        raise TimeoutError("Función excedió el tiempo límite")
-        
-    def _limit_resources(self):
-        """Establece límites de recursos para la ejecución"""
-        if not self.is_windows:
-            # En sistemas Unix/Linux
-            import resource
-            # Límite de memoria
-            resource.setrlimit(resource.RLIMIT_AS, (self.max_memory, self.max_memory))
-            # Límite de CPU
-            resource.setrlimit(resource.RLIMIT_CPU, (self.max_time, self.max_time))
-            # Límite de procesos
-            resource.setrlimit(resource.RLIMIT_NPROC, (1, 1))
-            # Límite de archivos
-            resource.setrlimit(resource.RLIMIT_NOFILE, (100, 100))
-        else:
-            # En Windows no podemos usar resource, así que solo usamos el timeout
+        self.mode = (mode or config.SAFE_EXECUTOR_MODE).lower()
+        self.workers = config.SAFE_EXECUTOR_WORKERS if workers is None else workers
+        self.max_tasks_per_worker = (config.SAFE_EXECUTOR_MAX_TASKS
+                                     if max_tasks_per_worker is None else max_tasks_per_worker)
+        self.limits = {
+            'memory': max_memory,
+            'files': 256,
+            'processes': config.SAFE_EXECUTOR_MAX_PROCESSES
+        }
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._pool_lock = threading.Lock()
+        self._context = None
+        self._closed = False
+        if self.mode == 'process':
+            self._start_pool()
+            atexit.register(self.shutdown)
+
+    # Pool
+
+    def _start_pool(self):
+        """Arranca el forkserver y los trabajadores en segundo plano"""
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(method)
+        if method == 'forkserver':
+            preload = [__name__] + [m for m in config.SAFE_EXECUTOR_PRELOAD if m]
+            self._context.set_forkserver_preload(preload)
+
+        def warm():
+            for _ in range(self.workers):
+                self._spawn()
+            logger.info(f"SafeExecutor: {self.workers} trabajadores listos ({method})")
+
+        threading.Thread(target=warm, name='lux-executor-warmup', daemon=True).start()
+
+    def _spawn(self) -> Optional[_Worker]:
+        if self._closed:
+            return None
+        try:
+            worker = _Worker(self._context, self.limits)
+        except Exception as e:
+            logger.error(f"Error creando trabajador: {e}")
+            return None
+        with self._pool_lock:
+            self._all.append(worker)
+        self._idle.put(worker)
+        return worker
+
+    def _discard(self, worker: _Worker, respawn: bool = True):
+        worker.kill()
+        with self._pool_lock:
+            if worker in self._all:
+                self._all.remove(worker)
+        if respawn:
+            metrics.increment('executor.respawns')
+            threading.Thread(target=self._spawn, name='lux-executor-respawn', daemon=True).start()
+
+    def _acquire(self, timeout: float, site_dir: Optional[str] = None) -> Optional[_Worker]:
+        deadline = time.monotonic() + timeout
+        while not self._closed:
+            try:
+                worker = self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if not worker.alive():
+                self._discard(worker)
+            elif worker.site_dir not in (None, site_dir):
+                # Tiene en sys.path (y quizá importados) paquetes de otro entorno
+                metrics.increment('executor.environment_switches')
+                self._discard(worker)
+            else:
+                return worker
+        return None
+
+    def shutdown(self):
+        """Detiene los trabajadores"""
+        self._closed = True
+        with self._pool_lock:
+            workers, self._all = self._all, []
+        for worker in workers:
+            worker.stop()
+
+    # Ejecución
+
+    @staticmethod
+    def _reference(function: Any) -> Optional[Tuple]:
+        """Cómo reconstruir la función en el trabajador, None si no se puede enviar"""
+        if isinstance(function, LazyFunction):
+            # Función del manifiesto: el trabajador importa el archivo, no el proceso principal
+            return ('file', str(Path(function.file_path).resolve()), function.__name__)
+
+        if not inspect.isfunction(function) or '<' in function.__qualname__ or '.' in function.__qualname__:
+            return None
+        try:
+            return ('pickle', pickle.dumps(function))
+        except Exception:
             pass
-        
-    def execute(self, function: Any, *args, **kwargs) -> Dict[str, Any]:
+        source = function.__code__.co_filename
+        if os.path.isfile(source):
+            # Módulo cargado desde archivo sin registrarse en sys.modules
+            return ('file', str(Path(source).resolve()), function.__name__)
+        return None
+
+    def execute(self, function: Any, *args, on_chunk: Optional[Callable[[Any], None]] = None,
+                site_dir: Optional[str] = None, timeout: Optional[float] = None,
+                profile: bool = False, cancel: Optional[threading.Event] = None,
+                arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
         """
         Ejecuta una función de forma segura con límites de recursos
+        Args:
+            arguments: Argumentos con nombre de la función (p. ej. los que pide el
+                modelo); no se confunden con las opciones del ejecutor
+            on_chunk: Callable que recibe cada fragmento de las funciones generadoras
+            site_dir: Directorio de paquetes del entorno aislado de la función
+            timeout: Tiempo límite de esta ejecución (por defecto max_time)
+            profile: Perfilar la ejecución (cProfile y muestreo de pilas)
+            cancel: Evento que, al activarse, mata el trabajador y abandona la ejecución
+        Returns:
+            Dict con resultado o error y métricas: execution_time (s, tiempo real),
+            cpu_time (s) y memory_used (bytes, pico de memoria residente); con
+            profile, 'profile' trae los datos de profiler.profile_call
+        """
+        kwargs = {**kwargs, **(arguments or {})}
+        if self.is_async(function):
+            # Las corrutinas comparten el bucle: un perfil mezclaría las de otras peticiones
+            return self.execute_async(function, *args, on_chunk=on_chunk, site_dir=site_dir,
+                                      timeout=timeout, arguments=kwargs).result()
+
+        reference = None
+        if self.mode == 'process' and not self._closed:
+            reference = self._reference(function)
+            try:
+                pickle.dumps((args, kwargs))
+            except Exception:
+                reference = None
+
+        on_chunk = self._safe_callback(on_chunk)
+        timeout = timeout or self.max_time
+        if reference is None and site_dir:
+            result = self._not_isolated(function, start=time.perf_counter())
+        elif reference is None:
+            result = self._execute_in_thread(function, args, kwargs, on_chunk=on_chunk, timeout=timeout,
+                                             profile=profile)
+        else:
+            result = self._execute_in_worker(reference, args, kwargs, on_chunk, site_dir, timeout, profile,
+                                             cancel)
+
+        metrics.observe('executor.wall_time', result.get('execution_time', 0.0))
+        if result.get('type') == 'timeout':
+            metrics.increment('executor.timeouts')
+        return result
+
+    @staticmethod
+    def is_async(function: Any) -> bool:
+        """True si la función es async def (sin importar el módulo de las del manifiesto)"""
+        if isinstance(function, LazyFunction):
+            return function.is_async
+        return inspect.iscoroutinefunction(function) or inspect.isasyncgenfunction(function)
+
+    @staticmethod
+    def _safe_callback(on_chunk: Optional[Callable[[Any], None]]) -> Optional[Callable[[Any], None]]:
+        """Un error del consumidor de fragmentos no interrumpe la función"""
+        if on_chunk is None:
+            return None
+
+        def emit(chunk):
+            try:
+                on_chunk(chunk)
+            except Exception as e:
+                logger.error(f"Error entregando fragmento: {e}")
+        return emit
+
+    def execute_async(self, function: Any, *args, on_chunk: Optional[Callable[[Any], None]] = None,
+                      site_dir: Optional[str] = None, timeout: Optional[float] = None,
+                      profile: bool = False, cancel: Optional[threading.Event] = None,
+                      arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Future:
+        """
+        Programa una función async en el bucle compartido sin ocupar un hilo
+        mientras espera; el tiempo límite se aplica cancelando la corrutina.
+        profile y cancel se ignoran: el bucle lo comparten las corrutinas de otras peticiones
         Returns:
-            Dict con resultado o error y métricas
+            Future con el mismo dict de resultado que execute()
         """
+        kwargs = {**kwargs, **(arguments or {})}
+        outcome: Future = Future()
+        start = time.perf_counter()
+
+        def finish(response: Dict[str, Any]):
+            response.setdefault('execution_time', time.perf_counter() - start)
+            response.update(cpu_time=0.0, memory_used=0)
+            metrics.observe('executor.wall_time', response['execution_time'])
+            if response.get('type') == 'timeout':
+                metrics.increment('executor.timeouts')
+            outcome.set_result(response)
+
+        if site_dir:
+            finish(self._not_isolated(function, start))
+            return outcome
+
         try:
-            # Crear directorio temporal para la ejecución
-            with tempfile.TemporaryDirectory() as temp_dir:
-                os.chdir(temp_dir)  # Cambiar al directorio temporal
-                
-                # Configurar timeout
-                if not self.is_windows:
-                    signal.signal(signal.SIGALRM, self._timeout_handler)
-                    signal.alarm(self.max_time)
-                
-                # Ejecutar en thread separado con límites
-                def run_function():
-                    try:
-                        self._limit_resources()
-                        self.result = function(*args, **kwargs)
-                    except Exception as e:
-                        self.error = str(e)
-                
-                thread = threading.Thread(target=run_function)
-                thread.start()
-                thread.join(timeout=self.max_time)
-                
-                # Desactivar alarma en sistemas Unix
-                if not self.is_windows:
-                    signal.alarm(0)
-                
-                if thread.is_alive():
-                    raise TimeoutError("Función excedió el tiempo límite")
-                
-                if self.error:
-                    raise Exception(self.error)
-                
-                return {
-                    'success': True,
-                    'result': self.result,
-                    'execution_time': self.max_time,  # Aproximado en Windows
-                    'memory_used': 0  # No podemos medir en Windows fácilmente
-                }
-                
-        except TimeoutError as e:
+            target = function.load() if isinstance(function, LazyFunction) else function
+            if inspect.isasyncgenfunction(target):
+                awaitable = _drain_async(target(*args, **kwargs), self._safe_callback(on_chunk))
+            else:
+                awaitable = target(*args, **kwargs)
+            coroutine = asyncio.wait_for(awaitable, timeout or self.max_time)
+        except Exception as e:
+            finish({'success': False, 'error': str(e), 'type': 'runtime'})
+            return outcome
+
+        def done(task: Future):
+            try:
+                finish({'success': True, 'result': task.result()})
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                finish({'success': False, 'error': "Función excedió el tiempo límite", 'type': 'timeout'})
+            except MemoryError:
+                finish({'success': False, 'error': "Función excedió el límite de memoria", 'type': 'resource_limit'})
+            except Exception as e:
+                finish({'success': False, 'error': str(e), 'type': 'runtime'})
+
+        get_async_loop().submit(coroutine).add_done_callback(done)
+        return outcome
+
+    def _execute_in_worker(self, reference: Tuple, args: tuple, kwargs: dict,
+                           on_chunk: Optional[Callable[[Any], None]] = None,
+                           site_dir: Optional[str] = None, timeout: Optional[float] = None,
+                           profile: bool = False, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        timeout = timeout or self.max_time
+        start = time.perf_counter()
+        # Un solo plazo: la espera de un trabajador libre se descuenta de la ejecución
+        deadline = start + timeout
+        if cancel is not None and cancel.is_set():
+            return self._cancelled(start)
+        worker = self._acquire(timeout=timeout, site_dir=site_dir)
+        if worker is not None and deadline - time.perf_counter() <= 0:
+            self._idle.put(worker)
+            worker = None
+        if worker is None:
             return {
                 'success': False,
-                'error': str(e),
-                'type': 'timeout'
+                'error': "No hay trabajadores disponibles",
+                'type': 'timeout',
+                'execution_time': time.perf_counter() - start,
+                'cpu_time': 0.0,
+                'memory_used': 0
             }
-        except ResourceLimitError as e:
+        metrics.observe('executor.queue_wait', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            worker.conn.send((reference, args, kwargs, deadline - start, site_dir, profile))
+            worker.site_dir = worker.site_dir or site_dir
+            while True:
+                remaining = deadline - time.perf_counter()
+                if cancel is not None:
+                    if cancel.is_set():
+                        self._discard(worker)
+                        return self._cancelled(start)
+                    if remaining > 0 and not worker.conn.poll(min(remaining, self.CANCEL_POLL_INTERVAL)):
+                        continue
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    self._discard(worker)
+                    return {
+                        'success': False,
+                        'error': "Función excedió el tiempo límite",
+                        'type': 'timeout',
+                        'execution_time': time.perf_counter() - start,
+                        'cpu_time': 0.0,
+                        'memory_used': 0
+                    }
+                message = worker.conn.recv()
+                if isinstance(message, tuple) and message[0] == 'chunk':
+                    if on_chunk:
+                        on_chunk(message[1])
+                    continue
+                response = message
+                break
+        except (EOFError, OSError, BrokenPipeError):
+            # El trabajador murió (p. ej. SIGXCPU por el límite de CPU o memoria)
+            self._discard(worker)
             return {
                 'success': False,
-                'error': str(e),
-                'type': 'resource_limit'
+                'error': "El proceso de ejecución terminó por exceder sus límites de recursos",
+                'type': 'resource_limit',
+                'execution_time': time.perf_counter() - start,
+                'cpu_time': 0.0,
+                'memory_used': 0
             }
-        except Exception as e:
+
+        worker.tasks += 1
+        if self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker:
+            # Reciclar para no acumular estado de módulos y memoria
+            self._discard(worker)
+        else:
+            self._idle.put(worker)
+
+        response['memory_used'] = response.pop('peak_rss', 0)
+        if not response['success']:
+            logger.debug(response.pop('traceback', ''))
+        else:
+            response.pop('traceback', None)
+        return response
+
+    @staticmethod
+    def _not_isolated(function: Any, start: float) -> Dict[str, Any]:
+        """
+        Una función con entorno aislado solo se ejecuta en un trabajador: en el
+        proceso principal sus paquetes quedarían en sys.path para siempre
+        """
+        name = getattr(function, '__name__', function)
+        logger.error(f"{name} tiene un entorno de paquetes aislado y no puede ejecutarse en un trabajador")
+        metrics.increment('executor.isolation_refused')
+        return {
+            'success': False,
+            'error': "La función necesita su entorno de paquetes aislado y no puede ejecutarse en un trabajador",
+            'type': 'runtime',
+            'execution_time': time.perf_counter() - start,
+            'cpu_time': 0.0,
+            'memory_used': 0
+        }
+
+    @staticmethod
+    def _cancelled(start: float) -> Dict[str, Any]:
+        metrics.increment('executor.cancelled')
+        return {
+            'success': False,
+            'error': "Ejecución cancelada",
+            'type': 'cancelled',
+            'execution_time': time.perf_counter() - start,
+            'cpu_time': 0.0,
+            'memory_used': 0
+        }
+
+    def _execute_in_thread(self, function: Any, args: tuple, kwargs: dict,
+                           on_chunk: Optional[Callable[[Any], None]] = None,
+                           timeout: Optional[float] = None, profile: bool = False) -> Dict[str, Any]:
+        """Ejecución en el proceso principal: mide tiempos pero no puede matar la función"""
+        outcome: Dict[str, Any] = {}
+
+        def run_function():
+            start_cpu = time.thread_time()
+            try:
+                outcome['result'], outcome['profile'] = _call(function, args, kwargs, on_chunk, profile)
+            except MemoryError:
+                outcome['error'] = ("Función excedió el límite de memoria", 'resource_limit')
+            except Exception as e:
+                outcome['error'] = (str(e), 'runtime')
+            outcome['cpu_time'] = time.thread_time() - start_cpu
+
+        start = time.perf_counter()
+        thread = threading.Thread(target=run_function, name='lux-executor-thread', daemon=True)
+        thread.start()
+        thread.join(timeout=timeout or self.max_time)
+        elapsed = time.perf_counter() - start
+
+        if thread.is_alive():
             return {
                 'success': False,
-                'error': str(e),
-                'type': 'runtime'
+                'error': "Función excedió el tiempo límite",
+                'type': 'timeout',
+                'execution_time': elapsed,
+                'cpu_time': 0.0,
+                'memory_used': 0
             }
-        finally:
-            # Restaurar directorio de trabajo
-            os.chdir(str(Path.cwd().parent))
-            # Restaurar señales en sistemas Unix
-            if not self.is_windows:
-                signal.alarm(0)
-                signal.signal(signal.SIGALRM, signal.SIG_DFL) 
\ No newline at end of file
+        metrics_data = {'execution_time': elapsed, 'cpu_time': outcome.get('cpu_time', 0.0), 'memory_used': 0}
+        if 'error' in outcome:
+            error, error_type = outcome['error']
+            return {'success': False, 'error': error, 'type': error_type, **metrics_data}
+        response = {'success': True, 'result': outcome.get('result'), **metrics_data}
+        if outcome.get('profile'):
+            response['profile'] = outcome['profile']
+        return response
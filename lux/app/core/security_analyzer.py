@@ -1,8 +1,9 @@
-import ast
 import logging
 from typing import Dict, List, Set, Optional
 from pathlib import Path
 import re
+from ..services.cache_service import ArtifactCache, get_artifact_cache
+from .code_facts import CodeFacts, analyze_code
 
 logger = logging.getLogger('lux.security')
 
@@ -13,6 +14,9 @@ class SecurityViolation:
         self.line = line
 
 class SecurityAnalyzer:
+    # Incrementar al cambiar la lógica de los chequeos (invalida veredictos en caché)
+    RULES_VERSION = 2
+
     def __init__(self):
         self.violations: List[SecurityViolation] = []
         
@@ -66,27 +70,56 @@ class SecurityAnalyzer:
             }
         }
         
+        # Huella de las reglas: los veredictos en caché solo valen para estas reglas
+        self.rules_version = ArtifactCache.content_hash(repr((
+            self.RULES_VERSION,
+            sorted(self.dangerous_patterns.items()),
+            sorted(self.prohibited_imports),
+            sorted(self.allowed_imports),
+            sorted(self.malicious_patterns.items()),
+            sorted((name, op['patterns'], op['permissions']) for name, op in self.sensitive_operations.items())
+        )))
+        self.artifact_cache = get_artifact_cache()
+        
     def analyze_code(self, code: str, function_name: str) -> List[SecurityViolation]:
         """Analiza el código en busca de problemas de seguridad"""
+        if self.artifact_cache:
+            cached = self.artifact_cache.get_verdict('security', code, self.rules_version)
+            if cached is not None:
+                self.violations = [SecurityViolation(*violation) for violation in cached]
+                return self.violations
+        
+        violations = self._analyze_code(code)
+        if self.artifact_cache:
+            self.artifact_cache.put_verdict(
+                'security', code,
+                [[v.type, v.message, v.line] for v in violations],
+                self.rules_version
+            )
+        return violations
+    
+    def _analyze_code(self, code: str) -> List[SecurityViolation]:
         self.violations = []
         
         try:
-            # Parsear el código
-            tree = ast.parse(code)
+            # Un único parseo y recorrido compartido con el resto de analizadores
+            facts = analyze_code(code)
+            if not facts.valid:
+                raise SyntaxError(facts.syntax_error)
             
             # Análisis estático básico
-            self._check_imports(tree)
-            self._check_dangerous_calls(tree)
-            self._check_file_operations(tree)
-            self._check_infinite_loops(tree)
-            self._check_resource_usage(tree)
+            self._check_imports(facts)
+            self._check_dangerous_calls(facts)
+            self._check_file_operations(facts)
+            self._check_infinite_loops(facts)
+            self._check_resource_usage(facts)
             
             # Análisis de seguridad avanzado
             self._check_malicious_patterns(code)
-            self._check_sensitive_operations(tree)
-            self._check_data_validation(tree)
-            self._check_error_handling(tree)
-            self._check_input_sanitization(tree)
+            self._check_sensitive_operations(facts)
+            self._check_data_validation(facts)
+            self._check_error_handling(facts)
+            self._check_input_sanitization(facts)
             
             return self.violations
             
@@ -97,109 +130,85 @@ class SecurityAnalyzer:
             )
             return self.violations
             
-    def _check_imports(self, tree: ast.AST):
+    def _check_imports(self, facts: CodeFacts):
         """Verifica imports prohibidos y permitidos"""
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                module = node.names[0].name
-                if module in self.prohibited_imports:
-                    self.violations.append(
-                        SecurityViolation(
-                            "import",
-                            f"Import prohibido: {module}",
-                            node.lineno
-                        )
+        for fact in facts.imports:
+            if fact.top_level in self.prohibited_imports:
+                self.violations.append(
+                    SecurityViolation(
+                        "import",
+                        f"Import prohibido: {fact.module}",
+                        fact.line
                     )
-                elif not any(module.startswith(allowed) for allowed in self.allowed_imports):
-                    self.violations.append(
-                        SecurityViolation(
-                            "import",
-                            f"Import no permitido: {module}",
-                            node.lineno
-                        )
+                )
+            elif not any(fact.module.startswith(allowed) for allowed in self.allowed_imports):
+                self.violations.append(
+                    SecurityViolation(
+                        "import",
+                        f"Import no permitido: {fact.module}",
+                        fact.line
                     )
+                )
                     
-    def _check_dangerous_calls(self, tree: ast.AST):
+    def _check_dangerous_calls(self, facts: CodeFacts):
         """Verifica llamadas a funciones peligrosas"""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name):
-                    func_name = node.func.id
-                    if func_name in {'eval', 'exec', 'compile'}:
-                        self.violations.append(
-                            SecurityViolation(
-                                "dangerous_call",
-                                f"Llamada peligrosa a {func_name}()",
-                                node.lineno
-                            )
-                        )
+        for call in facts.calls:
+            if call.name in {'eval', 'exec', 'compile'}:
+                self.violations.append(
+                    SecurityViolation(
+                        "dangerous_call",
+                        f"Llamada peligrosa a {call.name}()",
+                        call.line
+                    )
+                )
                         
-    def _check_file_operations(self, tree: ast.AST):
+    def _check_file_operations(self, facts: CodeFacts):
         """Verifica operaciones de archivo seguras"""
         allowed_dirs = {'resources', 'logs', 'temp'}
         
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name) and node.func.id == 'open':
-                    # Verificar que el path esté en directorios permitidos
-                    if len(node.args) > 0:
-                        path_arg = node.args[0]
-                        if isinstance(path_arg, ast.Str):
-                            path = Path(path_arg.s)
-                            if not any(dir in path.parts for dir in allowed_dirs):
-                                self.violations.append(
-                                    SecurityViolation(
-                                        "file_access",
-                                        f"Acceso a archivo fuera de directorios permitidos: {path}",
-                                        node.lineno
-                                    )
-                                )
-                                
-    def _check_infinite_loops(self, tree: ast.AST):
-        """Detecta posibles loops infinitos"""
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.While, ast.For)):
-                if not self._has_break_or_return(node):
+        for call in facts.calls:
+            # Verificar que el path esté en directorios permitidos
+            if call.name == 'open' and call.first_arg is not None:
+                path = Path(call.first_arg)
+                if not any(dir in path.parts for dir in allowed_dirs):
                     self.violations.append(
                         SecurityViolation(
-                            "infinite_loop",
-                            "Posible loop infinito detectado",
-                            node.lineno
+                            "file_access",
+                            f"Acceso a archivo fuera de directorios permitidos: {path}",
+                            call.line
                         )
                     )
-                    
-    def _has_break_or_return(self, node: ast.AST) -> bool:
-        """Verifica si un nodo contiene break o return"""
-        for child in ast.walk(node):
-            if isinstance(child, (ast.Break, ast.Return)):
-                return True
-        return False
+                                
+    def _check_infinite_loops(self, facts: CodeFacts):
+        """Detecta posibles loops infinitos"""
+        for loop in facts.loops:
+            if not loop.has_exit:
+                self.violations.append(
+                    SecurityViolation(
+                        "infinite_loop",
+                        "Posible loop infinito detectado",
+                        loop.line
+                    )
+                )
         
-    def _check_resource_usage(self, tree: ast.AST):
+    def _check_resource_usage(self, facts: CodeFacts):
         """Analiza uso de recursos"""
-        # Contar variables y loops anidados
-        loop_depth = 0
-        var_count = 0
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.For, ast.While)):
-                loop_depth += 1
-                if loop_depth > 2:
-                    self.violations.append(
-                        SecurityViolation(
-                            "resource_usage",
-                            "Demasiados loops anidados",
-                            node.lineno
-                        )
+        # Loops anidados y cantidad de variables
+        for loop in facts.loops:
+            if loop.depth > 2:
+                self.violations.append(
+                    SecurityViolation(
+                        "resource_usage",
+                        "Demasiados loops anidados",
+                        loop.line
                     )
-            elif isinstance(node, ast.Name):
-                var_count += 1
+                )
                 
-        if var_count > 50:
+        if facts.name_count > 50:
             self.violations.append(
                 SecurityViolation(
                     "resource_usage",
-                    f"Demasiadas variables ({var_count})"
+                    f"Demasiadas variables ({facts.name_count})"
                 )
             )
             
@@ -227,35 +236,25 @@ class SecurityAnalyzer:
                     )
                 )
 
-    def _check_sensitive_operations(self, tree: ast.AST):
+    def _check_sensitive_operations(self, facts: CodeFacts):
         """Verifica operaciones que requieren permisos especiales"""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                call_str = ast.unparse(node)
-                for op_name, op_info in self.sensitive_operations.items():
-                    for pattern in op_info['patterns']:
-                        if re.search(pattern, call_str):
-                            self.violations.append(
-                                SecurityViolation(
-                                    "sensitive_operation",
-                                    f"Operación sensible detectada ({op_name}): {call_str}. "
-                                    f"Requiere permisos: {', '.join(op_info['permissions'])}"
-                                )
+        for call in facts.calls:
+            call_str = f"{call.name}()"
+            for op_name, op_info in self.sensitive_operations.items():
+                for pattern in op_info['patterns']:
+                    if re.search(pattern, call_str):
+                        self.violations.append(
+                            SecurityViolation(
+                                "sensitive_operation",
+                                f"Operación sensible detectada ({op_name}): {call_str}. "
+                                f"Requiere permisos: {', '.join(op_info['permissions'])}",
+                                call.line
                             )
+                        )
 
-    def _check_data_validation(self, tree: ast.AST):
+    def _check_data_validation(self, facts: CodeFacts):
         """Verifica la validación de datos de entrada"""
-        has_input_validation = False
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.If):
-                # Buscar comparaciones o validaciones
-                for child in ast.walk(node):
-                    if isinstance(child, (ast.Compare, ast.Call)):
-                        has_input_validation = True
-                        break
-        
-        if not has_input_validation:
+        if not facts.has_validation:
             self.violations.append(
                 SecurityViolation(
                     "input_validation",
@@ -263,17 +262,25 @@ class SecurityAnalyzer:
                 )
             )
 
-    def _check_input_sanitization(self, tree: ast.AST):
+    def _check_error_handling(self, facts: CodeFacts):
+        """Verifica que el código maneje errores"""
+        if not facts.has_try:
+            self.violations.append(
+                SecurityViolation(
+                    "error_handling",
+                    "No se detectó manejo de errores (try/except)"
+                )
+            )
+
+    def _check_input_sanitization(self, facts: CodeFacts):
         """Verifica la sanitización de inputs"""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name):
-                    # Detectar uso directo de inputs sin sanitización
-                    if node.func.id in {'input', 'raw_input'}:
-                        self.violations.append(
-                            SecurityViolation(
-                                "input_sanitization",
-                                "Uso de input sin sanitización detectado",
-                                node.lineno
-                            )
-                        ) 
\ No newline at end of file
+        for call in facts.calls:
+            # Detectar uso directo de inputs sin sanitización
+            if call.name in {'input', 'raw_input'}:
+                self.violations.append(
+                    SecurityViolation(
+                        "input_sanitization",
+                        "Uso de input sin sanitización detectado",
+                        call.line
+                    )
+                )
@@ -1,10 +1,10 @@
-import requests
 import base64
 from pathlib import Path
 import os
 import logging
 from typing import Optional
 import pygame
+from ...services.http_transport import get_transport
 
 logger = logging.getLogger('lux')
 
@@ -20,6 +20,7 @@ class DeepgramTTSService:
             "referer": "https://deepgram.com/",
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        self.http = get_transport()
         pygame.mixer.init()
         self.voice = "aura-orion-en"  # Voz por defecto
     
@@ -38,7 +39,7 @@ class DeepgramTTSService:
             url = "https://deepgram.com/api/ttsAudioGeneration"
             payload = {"text": text, "model": model}
             
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self.http.post(url, headers=self.headers, json=payload, timeout=(5, 15))
             response.raise_for_status()
             
             # Crear directorio si no existe
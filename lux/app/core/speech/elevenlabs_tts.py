@@ -1,10 +1,10 @@
 import os
-import requests
 import logging
 import pygame
 from typing import Optional, Dict
 from pathlib import Path
 from ...services.proxy_service import ProxyService
+from ...services.http_transport import get_transport
 
 logger = logging.getLogger('lux')
 
@@ -50,7 +50,7 @@ class ElevenLabsTTSService:
             "jeremy": "bVMeCyTHy58xNoL34h3p"
         }
         
-        self.session = requests.Session()
+        self.http = get_transport()
         self.current_voice = "daniel"  # Voz por defecto
         pygame.mixer.init()
         self.proxy_service = ProxyService()
@@ -75,12 +75,12 @@ class ElevenLabsTTSService:
             proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'} if proxy else None
             
             logger.debug(f"Solicitando síntesis para voz: {self.current_voice} usando proxy: {proxy}")
-            response = self.session.post(
+            response = self.http.post(
                 url, 
                 headers=self.headers, 
                 json=payload,
                 proxies=proxies,
-                timeout=10
+                timeout=(5, 10)
             )
             
             if response.status_code == 200:
@@ -0,0 +1,35 @@
+import re
+from typing import List
+
+class SentenceSegmenter:
+    """
+    Segmenta texto que llega por fragmentos (streaming) en oraciones completas,
+    para poder sintetizar cada una mientras el resto sigue llegando.
+    """
+
+    # Fin de oración: puntuación final seguida de espacio, o salto de línea
+    _BOUNDARY = re.compile(r'(?<=[.!?…:;])["\')\]]*\s+|\n+')
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars  # oraciones más cortas se unen con la siguiente
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """Agrega un fragmento y retorna las oraciones que quedaron completas"""
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Retorna el texto restante al terminar el stream"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
@@ -1,16 +1,36 @@
 import logging
+import shutil
+import tempfile
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List
 from pathlib import Path
-import importlib.util
-import ast
+from .. import config
+from .metrics import metrics
+from .code_facts import analyze_code
+from .execution_scheduler import Priority
+from .function_manifest import FunctionManifest
+from .safe_executor import SafeExecutor
+from .gui_host import is_gui_function
+from ..services.cache_service import get_artifact_cache
 
 logger = logging.getLogger('lux.testing')
 
 class TestManager:
-    def __init__(self, ai_service):
+    def __init__(self, ai_service, scheduler=None):
         self.ai_service = ai_service
+        # Si hay planificador, las pruebas corren en él con prioridad baja (y con tiempo límite);
+        # si no, en un SafeExecutor propio que se crea en la primera prueba
+        self.scheduler = scheduler
+        self._executor: Optional[SafeExecutor] = None
+        self._executor_lock = threading.Lock()
         self.max_repair_attempts = 4  # 3 intentos de reparación + 1 reescritura completa
+        # 'parallel': varios candidatos a la vez | 'sequential': uno tras otro
+        self.repair_mode = config.TEST_REPAIR_MODE
+        self.repair_candidates = max(1, config.TEST_REPAIR_CANDIDATES)
+        self.artifact_cache = get_artifact_cache()
         
     def test_function(self, function_name: str, code: str) -> Dict[str, Any]:
         """
@@ -18,74 +38,102 @@ class TestManager:
         Returns:
             Dict con resultado y código reparado si aplica
         """
+        # Solo se guardan los éxitos: un fallo puede deberse al entorno (p. ej. un paquete)
+        if self.artifact_cache:
+            cached = self.artifact_cache.get_verdict('test', code, function_name)
+            if cached is not None:
+                return cached
+        
+        check = self._check_code(function_name, code)
+        if check['success']:
+            self._remember_success(function_name, code, check)
+            return check
+        
+        start = time.perf_counter()
+        if self.repair_mode == 'parallel':
+            result = self._repair_parallel(function_name, code, check['error'])
+        else:
+            result = self._repair_code(function_name, code, check['error'])
+        metrics.observe('test_manager.repair_seconds', time.perf_counter() - start)
+        if result['success']:
+            # Se guarda bajo el código original (apunta a la reparación) y bajo el reparado
+            self._remember_success(function_name, code, result)
+            self._remember_success(function_name, result['code'], result)
+        return result
+    
+    def _remember_success(self, function_name: str, code: str, result: Dict[str, Any]):
+        if self.artifact_cache:
+            verdict = {key: result[key] for key in ('success', 'code', 'result')}
+            self.artifact_cache.put_verdict('test', code, verdict, function_name)
+    
+    def _check_code(self, function_name: str, code: str,
+                    cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Ejecuta y valida el código una vez, sin reparar. El código candidato se
+        escribe en un archivo temporal y lo importa por ruta un trabajador del
+        SafeExecutor, no el proceso principal (salvo las async, que como en
+        producción corren en el bucle compartido)
+        Args:
+            cancel: Evento que abandona la ejecución y mata su trabajador
+        Returns:
+            Dict con 'success' y 'result' o 'error'
+        """
+        workdir = Path(tempfile.mkdtemp(prefix='lux-test-'))
         try:
-            # Crear módulo temporal para pruebas
-            spec = importlib.util.spec_from_file_location(function_name, "")
-            module = importlib.util.module_from_spec(spec)
-            
-            # Ejecutar código en el módulo
-            exec(code, module.__dict__)
-            
-            # Obtener la función
-            func = getattr(module, function_name, None)
+            path = workdir / f"{function_name}.py"
+            path.write_text(code, encoding='utf-8')
+            func = FunctionManifest(workdir).refresh_file(path).get(function_name)
             if not func:
-                return self._repair_code(
-                    code, 
-                    f"Función {function_name} no encontrada en el código"
-                )
+                return {
+                    'success': False,
+                    'error': f"Función {function_name} no encontrada en el código",
+                    'code': code
+                }
             
             # Validar estructura
             validation_result = self._validate_function(func, code)
             if not validation_result['valid']:
-                return self._repair_code(code, validation_result['error'])
+                return {'success': False, 'error': validation_result['error'], 'code': code}
             
-            # Ejecutar prueba básica
-            try:
-                result = func()
-                if not isinstance(result, str):
-                    return self._repair_code(
-                        code,
-                        "La función debe retornar un string"
-                    )
-                    
-                return {
-                    'success': True,
-                    'code': code,
-                    'result': result
-                }
+            # Las funciones de interfaz no se abren en la prueba: bloquearían hasta cerrar la ventana
+            if is_gui_function(analyze_code(code).modules):
+                return {'success': True, 'code': code, 'result': "Función de interfaz validada sin abrir la ventana"}
+            
+            # Ejecutar prueba básica (las generadoras retornan el texto completo)
+            outcome = self._execute(function_name, func, cancel)
+            if not outcome['success']:
+                return {'success': False, 'error': f"Error ejecutando función: {outcome['error']}", 'code': code}
+            result = outcome['result']
+            if not isinstance(result, str):
+                return {'success': False, 'error': "La función debe retornar un string", 'code': code}
                 
-            except Exception as e:
-                return self._repair_code(
-                    code,
-                    f"Error ejecutando función: {str(e)}\n{traceback.format_exc()}"
-                )
+            return {
+                'success': True,
+                'code': code,
+                'result': result
+            }
                 
         except Exception as e:
-            return self._repair_code(
-                code,
-                f"Error en prueba: {str(e)}\n{traceback.format_exc()}"
-            )
-            
-    def _repair_code(self, code: str, error: str, attempt: int = 1) -> Dict[str, Any]:
-        """
-        Intenta reparar código con errores
-        Args:
-            code: Código original
-            error: Descripción del error
-            attempt: Número de intento actual
-        """
-        logger.info(f"Intento {attempt} de reparación")
-        logger.error(f"Error encontrado: {error}")
-        
-        if attempt > self.max_repair_attempts:
             return {
                 'success': False,
-                'error': "Se agotaron los intentos de reparación",
+                'error': f"Error en prueba: {str(e)}\n{traceback.format_exc()}",
                 'code': code
             }
-            
-        try:
-            prompt = f"""
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    def _execute(self, function_name: str, func: Any,
+                 cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Ejecuta la prueba en el planificador (prioridad baja) o en el ejecutor propio"""
+        if self.scheduler:
+            return self.scheduler.execute(function_name, func, priority=Priority.BACKGROUND, cancel=cancel)
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = SafeExecutor()
+        return self._executor.execute(func, cancel=cancel)
+    
+    def _repair_prompt(self, code: str, error: str, rewrite: bool) -> str:
+        return f"""
             REPARA ESTE CÓDIGO PYTHON QUE TIENE ERRORES:
 
             ERROR ENCONTRADO:
@@ -94,7 +142,7 @@ class TestManager:
             CÓDIGO ACTUAL:
             {code}
 
-            {'IMPORTANTE: Genera el código completamente nuevo' if attempt == self.max_repair_attempts else 'IMPORTANTE: Corrige solo los errores encontrados'}
+            {'IMPORTANTE: Genera el código completamente nuevo' if rewrite else 'IMPORTANTE: Corrige solo los errores encontrados'}
 
             REGLAS:
             1. La función debe retornar siempre un string descriptivo
@@ -105,8 +153,52 @@ class TestManager:
 
             Responde SOLO con el código corregido, sin explicaciones.
             """
-
-            repaired_code = self.ai_service.generate_content(prompt)
+    
+    def _generate_repair(self, code: str, error: str, rewrite: bool, model: str = 'auto') -> Optional[str]:
+        """Pide al modelo una versión reparada (o reescrita) del código"""
+        response = self.ai_service.chat_with_model(
+            self._repair_prompt(code, error, rewrite),
+            model=model,
+            use_cache=False,
+            request_class='codegen'
+        )
+        if not response:
+            return None
+        return self._strip_code_fence(response)
+    
+    @staticmethod
+    def _strip_code_fence(text: str) -> str:
+        code = text.strip()
+        if code.startswith("```python"):
+            code = code[len("```python"):]
+        elif code.startswith("```"):
+            code = code[3:]
+        if code.endswith("```"):
+            code = code[:-3]
+        return code.strip()
+            
+    def _repair_code(self, function_name: str, code: str, error: str, attempt: int = 1) -> Dict[str, Any]:
+        """
+        Intenta reparar código con errores, un intento tras otro
+        Args:
+            function_name: Nombre de la función a probar
+            code: Código original
+            error: Descripción del error
+            attempt: Número de intento actual
+        """
+        logger.info(f"Intento {attempt} de reparación")
+        logger.error(f"Error encontrado: {error}")
+        
+        if attempt > self.max_repair_attempts:
+            return {
+                'success': False,
+                'error': "Se agotaron los intentos de reparación",
+                'code': code
+            }
+            
+        try:
+            repaired_code = self._generate_repair(code, error, rewrite=attempt == self.max_repair_attempts)
+            metrics.increment('test_manager.candidates')
             if not repaired_code:
                 return {
                     'success': False,
@@ -115,16 +207,13 @@ class TestManager:
                 }
                 
             # Probar código reparado
-            test_result = self.test_function(
-                self._extract_function_name(code),
-                repaired_code
-            )
-            
+            test_result = self._check_code(function_name, repaired_code)
             if test_result['success']:
                 return test_result
                 
             # Si falla, intentar de nuevo
             return self._repair_code(
+                function_name,
                 repaired_code,
                 test_result['error'],
                 attempt + 1
@@ -137,6 +226,75 @@ class TestManager:
                 'error': str(e),
                 'code': code
             }
+    
+    def _repair_parallel(self, function_name: str, code: str, error: str) -> Dict[str, Any]:
+        """
+        Pide varios candidatos a la vez (repartidos entre los modelos de código
+        disponibles; el último de cada tanda es una reescritura completa), los prueba
+        en paralelo y se queda con el primero que pasa; los trabajadores de los que
+        aún se están probando se matan. Si toda la tanda falla, la siguiente parte
+        del último candidato fallido, hasta agotar max_repair_attempts.
+        """
+        models = self.ai_service.available_models('codegen') or ['auto']
+        remaining = self.max_repair_attempts
+        round_number = 0
+        
+        while remaining > 0:
+            batch = min(self.repair_candidates, remaining)
+            remaining -= batch
+            round_number += 1
+            logger.info(f"Reparación en paralelo: tanda {round_number} con {batch} candidatos")
+            logger.error(f"Error encontrado: {error}")
+            
+            found = threading.Event()
+            
+            def attempt(index: int) -> Optional[Dict[str, Any]]:
+                model = models[(index + round_number - 1) % len(models)]
+                candidate = self._generate_repair(code, error, rewrite=index == batch - 1, model=model)
+                metrics.increment('test_manager.candidates')
+                if not candidate or found.is_set():
+                    return None
+                result = self._check_code(function_name, candidate, cancel=found)
+                result['model'] = model
+                return result
+            
+            executor = ThreadPoolExecutor(max_workers=batch, thread_name_prefix='lux-repair')
+            failures = []
+            try:
+                futures = [executor.submit(attempt, index) for index in range(batch)]
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error en candidato de reparación: {e}")
+                        continue
+                    if result is None:
+                        continue
+                    if result['success']:
+                        found.set()
+                        logger.info(f"Candidato válido generado con {result['model']}")
+                        return result
+                    failures.append(result)
+            finally:
+                # Los candidatos pendientes se cancelan y los que se están probando se
+                # abandonan (found mata su trabajador); los que aún esperan al modelo
+                # terminan sin probarse
+                found.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            if not failures:
+                return {
+                    'success': False,
+                    'error': "No se pudo generar código reparado",
+                    'code': code
+                }
+            code, error = failures[-1]['code'], failures[-1]['error']
+        
+        return {
+            'success': False,
+            'error': "Se agotaron los intentos de reparación",
+            'code': code
+        }
             
     def _validate_function(self, func: Any, code: str) -> Dict[str, Any]:
         """Valida la estructura y documentación de una función"""
@@ -149,15 +307,7 @@ class TestManager:
                 }
                 
             # Verificar manejo de errores
-            tree = ast.parse(code)
-            has_try_except = False
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Try):
-                    has_try_except = True
-                    break
-                    
-            if not has_try_except:
+            if not analyze_code(code).has_try:
                 return {
                     'valid': False,
                     'error': "Función sin manejo de errores"
@@ -173,11 +323,4 @@ class TestManager:
             
     def _extract_function_name(self, code: str) -> str:
         """Extrae el nombre de la función del código"""
-        try:
-            tree = ast.parse(code)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    return node.name
-            return ""
-        except:
-            return "" 
\ No newline at end of file
+        return analyze_code(code).first_function_name 
\ No newline at end of file
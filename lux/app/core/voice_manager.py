@@ -1,5 +1,6 @@
 import logging
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterable
+import queue
 import wave
 import threading
 from pathlib import Path
@@ -17,6 +18,9 @@ from .speech.simple_stt import SimpleSTTService
 from .speech.simple_tts import SimpleTTSService
 from .speech.elevenlabs_tts import ElevenLabsTTSService
 from .function_manager import FunctionManager
+from .execution_scheduler import Priority
+from .speech.sentence_stream import SentenceSegmenter
+from .metrics import metrics
 
 logger = logging.getLogger('lux')
 
@@ -50,6 +54,8 @@ class VoiceManager:
         
         self.is_listening = False
         self.callback = self._on_voice_command
+        # Recibe el texto acumulado cada vez que se completa una oración
+        self.on_partial: Optional[Callable[[str], None]] = None
         
         # Dependencias
         self.command_handler = command_handler
@@ -109,6 +115,61 @@ class VoiceManager:
         service = self.tts_services[self.current_tts]
         service.speak(text)
     
+    def speak_stream(self, chunks: Iterable[str]) -> str:
+        """
+        Reproduce texto que llega por fragmentos: cada oración completa se envía
+        al servicio TTS mientras los siguientes fragmentos siguen llegando
+        Returns:
+            str: Texto completo reproducido
+        """
+        service = self.tts_services[self.current_tts]
+        sentences: "queue.Queue[Optional[str]]" = queue.Queue()
+        start = time.perf_counter()
+
+        def tts_worker():
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    break
+                try:
+                    service.speak(sentence)
+                except Exception as e:
+                    logger.error(f"Error en TTS por oraciones: {e}")
+
+        worker = threading.Thread(target=tts_worker, daemon=True)
+        worker.start()
+
+        segmenter = SentenceSegmenter()
+        parts = []
+        first_sentence = True
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                for sentence in segmenter.feed(chunk):
+                    if first_sentence:
+                        metrics.observe('voice.time_to_first_audio', time.perf_counter() - start)
+                        first_sentence = False
+                    sentences.put(sentence)
+                    self._notify_partial("".join(parts))
+            for sentence in segmenter.flush():
+                if first_sentence:
+                    metrics.observe('voice.time_to_first_audio', time.perf_counter() - start)
+                sentences.put(sentence)
+                self._notify_partial("".join(parts))
+        finally:
+            sentences.put(None)
+            worker.join()
+
+        metrics.observe('voice.total_response_time', time.perf_counter() - start)
+        return "".join(parts).strip()
+    
+    def _notify_partial(self, text: str):
+        if self.on_partial:
+            try:
+                self.on_partial(text.strip())
+            except Exception as e:
+                logger.error(f"Error notificando respuesta parcial: {e}")
+
     def text_to_speech(self, text: str) -> Optional[str]:
         """Convierte texto a voz"""
         service = self.tts_services[self.current_tts]
@@ -126,22 +187,31 @@ class VoiceManager:
         """
         try:
             logger.info(f"Procesando comando de voz: '{text}'")
-            
+
+            # Coincidencias de alta confianza del índice local: sin LLM
+            local_function = self.function_manager.route_locally(text)
+            if local_function:
+                logger.info(f"Resuelto por índice local: {local_function}")
+                return self._run_function(local_function, text)
+
+            # Modo nativo: enrutamiento, ejecución y respuesta en un solo intercambio.
+            # Si no hace falta ninguna función, la respuesta se pide por streaming
+            # (más abajo) para empezar a hablar con la primera oración.
+            native = self.function_manager.function_calling_mode == 'native'
+            if native:
+                response = self.function_manager.execute_function(text, priority=Priority.VOICE)
+                if response:
+                    self.speak(response)
+                    return response
+
             # Verificar si es una solicitud de función
-            function_request = self.ai_manager.verify_function_request(text)
+            function_request = {"type": "NO"} if native else self.ai_manager.verify_function_request(text)
             logger.debug(f"Resultado de verificación de función: {function_request}")
             
             if function_request["type"] == "YES":
                 # Ejecutar función existente
                 logger.info(f"Ejecutando función: {function_request['function_name']}")
-                result = self.function_manager.execute_function(
-                    function_request['function_name'],
-                    function_request['extra_info']
-                )
-                if result:
-                    self.speak(result)
-                    return result
-                return "Hubo un error al ejecutar la función"
+                return self._run_function(function_request['function_name'], text)
                 
             elif function_request["type"] == "NEW":
                 # Solicitud de nueva función
@@ -155,7 +225,7 @@ class VoiceManager:
                 
                 if result["success"]:
                     # Ejecutar la función recién creada
-                    response = self.function_manager.execute_function(result["function"])
+                    response = self.function_manager.execute_existing(result["function"], text, priority=Priority.VOICE)
                     if response:
                         return f"He creado y ejecutado la función. {response}"
                     return "He creado la función pero hubo un error al ejecutarla."
@@ -164,16 +234,16 @@ class VoiceManager:
             
             # Si no es comando, procesar como chat
             logger.debug("No es comando, procesando como chat...")
-            chat_response = self.ai_manager.chat(text)
+            try:
+                logger.debug(f"Iniciando TTS por oraciones usando servicio: {self.current_tts}")
+                chat_response = self.speak_stream(self.ai_manager.chat_stream(text))
+                logger.info("TTS completado exitosamente")
+            except Exception as e:
+                logger.error(f"Error en TTS para chat: {e}", exc_info=True)
+                chat_response = None
             
             if chat_response:
                 logger.info(f"Chat procesado. Respuesta: '{chat_response}'")
-                try:
-                    logger.debug(f"Iniciando TTS para respuesta de chat usando servicio: {self.current_tts}")
-                    self.speak(chat_response)
-                    logger.info("TTS completado exitosamente")
-                except Exception as e:
-                    logger.error(f"Error en TTS para chat: {e}", exc_info=True)
                 return chat_response
             
             logger.warning("No se pudo procesar ni como comando ni como chat")
@@ -183,6 +253,20 @@ class VoiceManager:
             logger.error(f"Error procesando comando de voz: {e}", exc_info=True)
             return "Lo siento, ocurrió un error al procesar tu comando."
 
+    def _run_function(self, function_name: str, text: str) -> str:
+        """Ejecuta una función ya elegida y dice su resultado"""
+        if self.function_manager.is_streaming(function_name):
+            # Función generadora: cada parte se dice en cuanto está lista
+            result = self.speak_stream(self.function_manager.stream_existing(
+                function_name, text, priority=Priority.VOICE
+            ))
+            return result or "Hubo un error al ejecutar la función"
+        result = self.function_manager.execute_existing(function_name, text, priority=Priority.VOICE)
+        if result:
+            self.speak(result)
+            return result
+        return "Hubo un error al ejecutar la función"
+
     def set_command_handler(self, command_handler):
         """Actualiza el manejador de comandos"""
         self.command_handler = command_handler
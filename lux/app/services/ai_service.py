@@ -1,28 +1,48 @@
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable, Tuple, Iterator, Iterable
 import google.generativeai as genai
-import requests
 import json
 import time
+import inspect
+import unicodedata
+import re
 from datetime import datetime
 from .. import config
+from .cache_service import ResponseCache, get_artifact_cache
+from .http_transport import get_transport
+from .model_router import ModelRouter
+from ..core.code_facts import analyze_code
 
 logger = logging.getLogger('lux.ai')
 
 class AIService:
+    # Declaración especial para pedir la creación de una función nueva
+    NEW_FUNCTION_TOOL = 'crear_funcion_nueva'
+
+    _SCHEMA_TYPES = {
+        str: 'STRING',
+        int: 'INTEGER',
+        float: 'NUMBER',
+        bool: 'BOOLEAN',
+        list: 'ARRAY',
+        dict: 'OBJECT',
+    }
+
     def __init__(self):
+        self.http = get_transport()
+        self.openrouter_url = config.OPENROUTER_API_URL
         self.models = {
             'gemini': self._init_gemini(),
             'deepseek': {
-                'url': 'https://openrouter.ai/api/v1/chat/completions',
+                'url': self.openrouter_url,
                 'model': 'deepseek-ai/deepseek-coder-33b-instruct',
             },
             'claude': {
-                'url': 'https://openrouter.ai/api/v1/chat/completions',
+                'url': self.openrouter_url,
                 'model': 'anthropic/claude-3-opus',
             },
             'gpt4': {
-                'url': 'https://openrouter.ai/api/v1/chat/completions',
+                'url': self.openrouter_url,
                 'model': 'openai/gpt-4-turbo',
             }
         }
@@ -31,55 +51,263 @@ class AIService:
             "Content-Type": "application/json",
             "HTTP-Referer": config.APP_DOMAIN,
         }
+        self.gemini_rest_url = f"{config.GEMINI_API_URL}/models/{config.GEMINI_MODEL}:generateContent"
+        self.gemini_stream_url = f"{config.GEMINI_API_URL}/models/{config.GEMINI_MODEL}:streamGenerateContent"
+        self.response_cache = self._init_response_cache()
+        self.artifact_cache = get_artifact_cache()
+        self.router = ModelRouter(
+            providers={key: 'google' if key == 'gemini' else 'openrouter' for key in self.models},
+            routes=config.MODEL_ROUTES,
+            rate_limits=config.RATE_LIMITS,
+            hedge_classes=config.MODEL_HEDGE_CLASSES,
+            hedge_delay=config.MODEL_HEDGE_DELAY,
+            breaker_threshold=config.MODEL_BREAKER_THRESHOLD,
+            breaker_cooldown=config.MODEL_BREAKER_COOLDOWN,
+            rate_limit_wait=config.MODEL_RATE_LIMIT_WAIT
+        )
         logger.info("AIService inicializado")
 
+    def _init_response_cache(self) -> Optional[ResponseCache]:
+        if not config.RESPONSE_CACHE_ENABLED:
+            return None
+        try:
+            return ResponseCache(
+                ttl=config.RESPONSE_CACHE_TTL,
+                max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+                similarity_threshold=config.RESPONSE_CACHE_SIMILARITY
+            )
+        except Exception as e:
+            logger.error(f"Error al inicializar caché de respuestas: {e}")
+            return None
+
     def _init_gemini(self):
         try:
             genai.configure(api_key=config.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-pro')
+            model = genai.GenerativeModel(config.GEMINI_MODEL)
             logger.info("Gemini inicializado")
             return model
         except Exception as e:
             logger.error(f"Error al inicializar Gemini: {e}")
             return None
 
-    def chat_with_model(self, message: str, model: str = 'gemini') -> Optional[str]:
+    def chat_with_model(self, message: str, model: str = 'auto',
+                        system_prompt: Optional[str] = None, use_cache: bool = True,
+                        request_class: str = 'chat') -> Optional[str]:
+        """
+        Envía un mensaje al modelo indicado
+        Args:
+            message: Mensaje del usuario
+            model: Clave del modelo ('gemini', 'deepseek', 'claude', 'gpt4') o 'auto'
+                   para que el enrutador elija el más rápido y sano
+            system_prompt: Instrucciones de sistema opcionales
+            use_cache: Consultar y guardar en la caché de respuestas
+            request_class: Clase de petición para el enrutador ('chat', 'routing', 'codegen')
+        """
         try:
-            if model == 'gemini':
-                return self._chat_with_gemini(message)
+            cache = self.response_cache if use_cache else None
+            # La caché va por el modelo que responde: con 'auto', el que elegiría el enrutador
+            served = self.router.choose(request_class, self._model_ready) if model == 'auto' else model
+            if cache and served:
+                cached = cache.get_response(message, served, system_prompt)
+                if cached is not None:
+                    logger.info(f"Respuesta obtenida de caché ({served})")
+                    return cached
+
+            start = time.perf_counter()
+            if model == 'auto':
+                served, response = self.router.call(
+                    request_class,
+                    lambda key, timeout: self._chat_once(key, message, system_prompt, timeout),
+                    allowed=self._model_ready
+                )
+                logger.debug(f"Enrutador ({request_class}): {served}")
             else:
-                return self._chat_with_openrouter(message, model)
+                response = self._chat_once(model, message, system_prompt)
+                self.router.record(model, time.perf_counter() - start, response is not None)
+
+            if cache and response and served:
+                cache.put_response(message, served, response, system_prompt,
+                                   latency=time.perf_counter() - start)
+            return response
         except Exception as e:
             logger.error(f"Error en chat_with_model ({model}): {e}")
             return None
 
-    def _chat_with_gemini(self, message: str) -> Optional[str]:
+    def stream_chat(self, message: str, model: str = 'auto',
+                    system_prompt: Optional[str] = None, use_cache: bool = True) -> Iterator[str]:
+        """
+        Igual que chat_with_model pero retorna la respuesta en fragmentos
+        a medida que el modelo los genera
+        """
+        cache = self.response_cache if use_cache else None
+        source = model
+        if model == 'auto':
+            source = self.router.choose('chat', self._model_ready) or 'gemini'
+        if cache:
+            cached = cache.get_response(message, source, system_prompt)
+            if cached is not None:
+                logger.info(f"Respuesta obtenida de caché ({source})")
+                yield cached
+                return
+
+        start = time.perf_counter()
+        parts = []
+        completed = False
+        try:
+            if source == 'gemini':
+                chunks = self._stream_gemini(message, system_prompt)
+            else:
+                chunks = self._stream_openrouter(message, source, system_prompt)
+            for chunk in chunks:
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+            completed = True
+        except Exception as e:
+            logger.error(f"Error en stream_chat ({source}): {e}")
+        self.router.record(source, time.perf_counter() - start, completed and bool(parts))
+
+        # Solo respuestas completas: un corte a mitad dejaría en caché una respuesta truncada
+        if cache and completed and parts:
+            cache.put_response(message, source, "".join(parts), system_prompt,
+                               latency=time.perf_counter() - start)
+
+    def _stream_gemini(self, message: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        prompt = f"{system_prompt}\n\n{message}" if system_prompt else message
+        if config.GEMINI_TRANSPORT == 'rest':
+            yield from self._stream_gemini_rest(prompt)
+            return
+        if not self.models['gemini']:
+            logger.error("Gemini no está disponible")
+            return
+        for chunk in self.models['gemini'].generate_content(prompt, stream=True):
+            yield chunk.text
+
+    def _stream_gemini_rest(self, prompt: str) -> Iterator[str]:
+        response = self.http.post(
+            self.gemini_stream_url,
+            params={"key": config.GEMINI_API_KEY, "alt": "sse"},
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+            stream=True
+        )
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Error en Gemini (stream): {response.status_code} - {response.text}")
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                try:
+                    candidates = json.loads(line[len('data:'):].strip()).get('candidates') or []
+                except ValueError:
+                    continue
+                if candidates:
+                    text = self._extract_text(candidates[0].get('content') or {})
+                    if text:
+                        yield text
+
+    def _stream_openrouter(self, message: str, model_key: str,
+                           system_prompt: Optional[str] = None) -> Iterator[str]:
+        model_info = self.models.get(model_key)
+        if not model_info:
+            logger.error(f"Modelo {model_key} no encontrado")
+            return
+
+        messages = [{"role": "user", "content": message}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+
+        response = self.http.post(
+            model_info['url'],
+            headers=self.openrouter_headers,
+            json={
+                "model": model_info['model'],
+                "messages": messages,
+                "temperature": 0.7,
+                "stream": True
+            },
+            stream=True
+        )
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Error en OpenRouter: {response.text}")
+                return
+            # Server-Sent Events: líneas "data: {...}" terminadas en "data: [DONE]"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    delta = json.loads(data)['choices'][0].get('delta', {})
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta.get('content'):
+                    yield delta['content']
+
+    def _model_ready(self, model: str) -> bool:
+        """Indica si el modelo está configurado (cliente inicializado o API key presente)"""
+        if model == 'gemini':
+            return config.GEMINI_TRANSPORT == 'rest' or self.models['gemini'] is not None
+        return model in self.models and bool(config.OPENROUTER_API_KEY)
+
+    def _chat_once(self, model: str, message: str, system_prompt: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Args:
+            timeout: Tiempo límite de lectura de este intento (None = el del transporte)
+        """
+        if model == 'gemini':
+            return self._chat_with_gemini(message, system_prompt, timeout)
+        return self._chat_with_openrouter(message, model, system_prompt, timeout)
+
+    @staticmethod
+    def _http_timeout(timeout: Optional[float]) -> Optional[Tuple[float, float]]:
+        return (config.HTTP_CONNECT_TIMEOUT, timeout) if timeout else None
+
+    def _chat_with_gemini(self, message: str, system_prompt: Optional[str] = None,
+                          timeout: Optional[float] = None) -> Optional[str]:
+        prompt = f"{system_prompt}\n\n{message}" if system_prompt else message
+        if config.GEMINI_TRANSPORT == 'rest':
+            content = self._generate_with_tools([{"role": "user", "parts": [{"text": prompt}]}], [], timeout)
+            if content is None:
+                return None
+            return self._extract_text(content) or None
         if not self.models['gemini']:
-            return "Gemini no está disponible"
+            logger.error("Gemini no está disponible")
+            return None
         try:
-            response = self.models['gemini'].generate_content(message)
+            options = {'timeout': timeout} if timeout else None
+            response = self.models['gemini'].generate_content(prompt, request_options=options)
             return response.text
         except Exception as e:
             logger.error(f"Error en Gemini: {e}")
             return None
 
-    def _chat_with_openrouter(self, message: str, model_key: str) -> Optional[str]:
+    def _chat_with_openrouter(self, message: str, model_key: str, system_prompt: Optional[str] = None,
+                              timeout: Optional[float] = None) -> Optional[str]:
         try:
             model_info = self.models.get(model_key)
             if not model_info:
-                return f"Modelo {model_key} no encontrado"
+                logger.error(f"Modelo {model_key} no encontrado")
+                return None
+
+            messages = [{"role": "user", "content": message}]
+            if system_prompt:
+                messages.insert(0, {"role": "system", "content": system_prompt})
 
             payload = {
                 "model": model_info['model'],
-                "messages": [{"role": "user", "content": message}],
+                "messages": messages,
                 "temperature": 0.7
             }
 
-            response = requests.post(
+            response = self.http.post(
                 model_info['url'],
                 headers=self.openrouter_headers,
                 json=payload,
-                timeout=30
+                timeout=self._http_timeout(timeout)
             )
 
             if response.status_code == 200:
@@ -96,6 +324,10 @@ class AIService:
         """Retorna lista de modelos disponibles"""
         return list(self.models.keys())
 
+    def available_models(self, request_class: str = 'chat') -> List[str]:
+        """Modelos configurados y sanos para la clase de petición, del más rápido al más lento"""
+        return self.router.candidates(request_class, self._model_ready)
+
     def is_model_available(self, model: str) -> bool:
         """Verifica si un modelo está disponible"""
         if model == 'gemini':
@@ -135,7 +367,7 @@ class AIService:
                 "max_tokens": 2000
             }
             
-            response = requests.post(
+            response = self.http.post(
                 self.openrouter_url,
                 headers=self.openrouter_headers,
                 json=payload
@@ -234,26 +466,68 @@ class AIService:
         # Implementar extracción de texto explicativo
         return content
     
-    def rate_limit_check(self) -> bool:
-        """Verifica límites de tasa de la API"""
-        # Implementar lógica de rate limiting
-        return True
-
-    def analyze_request(self, request: str, registry: Dict[str, Any]) -> str:
+    def rate_limit_check(self, model: Optional[str] = None, consume: bool = False) -> bool:
+        """
+        Verifica límites de tasa de la API
+        Args:
+            model: Modelo cuyo proveedor se consulta; sin modelo indica si algún
+                   proveedor tiene capacidad disponible
+            consume: Gastar un token del proveedor (la llamada se va a hacer)
+        """
+        return self.router.rate_limit_check(model, consume=consume)
+
+    def get_router_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latencia, tasa de error y estado de cada modelo según el enrutador"""
+        return self.router.get_stats()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimación aproximada de tokens (~4 caracteres por token)"""
+        return max(1, len(text) // 4)
+
+    @staticmethod
+    def compact_description(description: Optional[str], max_chars: int = 160) -> str:
+        """Reduce una descripción (o docstring multilínea) a su primera parte útil"""
+        text = " ".join((description or '').split())
+        text = re.split(r'\b(?:Args|Returns|Raises):', text)[0].strip()
+        if not text:
+            return 'Sin descripción'
+        if len(text) > max_chars:
+            text = text[:max_chars - 3].rstrip() + '...'
+        return text
+
+    def format_function_list(self, registry: Dict[str, Any], token_budget: Optional[int] = None) -> str:
+        """
+        Formatea funciones como líneas "- nombre: descripción" respetando el orden
+        recibido y deteniéndose al agotar el presupuesto de tokens
+        """
+        lines = []
+        used = 0
+        for name, info in registry.items():
+            line = f"- {name}: {self.compact_description(info.get('description'))}"
+            cost = self.estimate_tokens(line) + 1  # el salto de línea que la separa
+            if token_budget and lines and used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def analyze_request(self, request: str, registry: Dict[str, Any],
+                        token_budget: Optional[int] = None) -> str:
         """
         Analiza una petición para determinar si existe una función o se debe crear una nueva
         Args:
             request: Petición del usuario
-            registry: Diccionario con las funciones registradas
+            registry: Diccionario con las funciones candidatas, en orden de relevancia
+            token_budget: Máximo aproximado de tokens para la lista de funciones
         Returns:
             str: Formato "YES - función" | "NEW - función descripción" | "NO"
         """
         try:
-            # Formatear registry para el prompt
-            functions_list = "\n".join([
-                f"- {name}: {info.get('description', 'Sin descripción')}"
-                for name, info in registry.items()
-            ])
+            # Formatear registry para el prompt (compacto y con presupuesto de tokens)
+            functions_list = self.format_function_list(registry, token_budget)
+            logger.debug(f"Funciones en el prompt: {len(functions_list.splitlines())} "
+                         f"(~{self.estimate_tokens(functions_list)} tokens)")
 
             prompt = f"""
             ANALIZA ESTA PETICIÓN Y DETERMINA SI HAY UNA FUNCIÓN EXISTENTE QUE LA CUMPLA
@@ -279,90 +553,33 @@ class AIService:
             Responde SOLO con uno de los 3 formatos mencionados, sin explicaciones adicionales.
             """
 
-            response = self.models['gemini'].generate_content(prompt)
-            if response.text:
-                return response.text.strip()
+            response = self.chat_with_model(prompt, use_cache=False, request_class='routing')
+            if response:
+                return response.strip()
             return "NO"
 
         except Exception as e:
             logger.error(f"Error en análisis de petición: {e}")
             return "NO"
 
-    def generate_code(self, function_name: str, description: str) -> Optional[str]:
+    def generate_code(self, function_name: str, description: str, model: str = 'auto') -> Optional[str]:
         """
-        Genera código Python para una nueva función
+        Genera código Python para una nueva función. Si el código de un prompt
+        igual (nombre y descripción) ya se aceptó antes, se reutiliza sin llamar
+        al LLM; el llamador lo guarda con remember_code tras validarlo y probarlo
         """
         try:
-            prompt = f"""
-            GENERA EL CÓDIGO COMPLETO PARA ESTA FUNCIÓN:
-
-            NOMBRE: {function_name}
-            DESCRIPCIÓN: {description}
-
-            REGLAS IMPORTANTES:
-            1. USAR PyQt6 para crear una ventana separada
-            2. La función debe ser autocontenida (toda la UI en la misma ventana)
-            3. Manejar TODOS los errores posibles
-            4. Documentar el código claramente
-            5. Retornar un string con el resultado al cerrar
-
-            LIBRERÍAS PERMITIDAS:
-            - GUI: PyQt6
-            - Audio: pygame, pyttsx3, SpeechRecognition
-            - Datos: numpy, pandas
-            - Sistema: os, sys, pathlib, datetime, json
-            - NO USAR: requests, selenium, etc.
-
-            EJEMPLO DE FORMATO:
-            ```python
-            from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout
-            import sys
-
-            def {function_name}() -> str:
-                '''
-                {description}
-                Returns:
-                    str: Mensaje con el resultado
-                '''
-                try:
-                    class MainWindow(QMainWindow):
-                        def __init__(self):
-                            super().__init__()
-                            self.setWindowTitle("{function_name}")
-                            self.setGeometry(100, 100, 400, 300)
-                            
-                            # Crear widget central y layout
-                            central_widget = QWidget()
-                            self.setCentralWidget(central_widget)
-                            layout = QVBoxLayout(central_widget)
-                            
-                            # Agregar widgets aquí...
-                            
-                            self.show()
-                
-                    # Crear aplicación
-                    app = QApplication(sys.argv)
-                    window = MainWindow()
-                    app.exec()
-                    
-                    return "Operación completada exitosamente"
-                    
-                except Exception as e:
-                    return f"Error: {{e}}"
-            ```
-
-            IMPORTANTE: 
-            - La ventana debe ser independiente y funcional
-            - Incluir todos los imports necesarios
-            - Manejar el cierre de la ventana
-            - NO incluir el template en el archivo
-
-            Responde SOLO con el código Python, sin explicaciones.
-            """
+            prompt = self._code_prompt(function_name, description)
 
-            response = self.models['gemini'].generate_content(prompt)
-            if response.text:
-                code = response.text.strip()
+            if self.artifact_cache:
+                cached = self.artifact_cache.get_generation(prompt, model)
+                if cached is not None:
+                    logger.info(f"Código de {function_name} obtenido de caché")
+                    return cached
+
+            response = self.chat_with_model(prompt, model=model, use_cache=False, request_class='codegen')
+            if response:
+                code = response.strip()
                 if code.startswith("```python"):
                     code = code[10:]
                 if code.endswith("```"):
@@ -374,6 +591,86 @@ class AIService:
             logger.error(f"Error generando código: {e}")
             return None
 
+    def remember_code(self, function_name: str, description: str, code: str, model: str = 'auto'):
+        """Guarda código ya validado y probado para reutilizarlo con el mismo prompt"""
+        if self.artifact_cache:
+            self.artifact_cache.put_generation(self._code_prompt(function_name, description), model, code)
+
+    def _code_prompt(self, function_name: str, description: str) -> str:
+        return f"""
+        GENERA EL CÓDIGO COMPLETO PARA ESTA FUNCIÓN:
+
+        NOMBRE: {function_name}
+        DESCRIPCIÓN: {description}
+
+        REGLAS IMPORTANTES:
+        1. USAR PyQt6 para crear una ventana separada
+        2. La función debe ser autocontenida (toda la UI en la misma ventana)
+        3. Manejar TODOS los errores posibles
+        4. Documentar el código claramente
+        5. Retornar un string con el resultado (la ventana sigue abierta hasta que el usuario la cierre)
+        6. Obtener la aplicación con QApplication.instance() y crearla solo si no existe
+        7. Si la función NO tiene ventana y solo espera E/S (temporizadores, archivos,
+           subprocesos), definirla como `async def {function_name}() -> str` usando
+           asyncio y await en lugar de time.sleep u operaciones bloqueantes
+        8. Si la función NO tiene ventana y su resultado se produce en pasos largos
+           (varias consultas, un informe por secciones), puede usar `yield` para
+           entregar cada frase completa en cuanto esté lista
+
+        LIBRERÍAS PERMITIDAS:
+        - GUI: PyQt6
+        - Audio: pygame, pyttsx3, SpeechRecognition
+        - Datos: numpy, pandas
+        - Sistema: os, sys, pathlib, datetime, json, asyncio
+        - NO USAR: requests, selenium, etc.
+
+        EJEMPLO DE FORMATO:
+        ```python
+        from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout
+        import sys
+
+        def {function_name}() -> str:
+            '''
+            {description}
+            Returns:
+                str: Mensaje con el resultado
+            '''
+            try:
+                class MainWindow(QMainWindow):
+                    def __init__(self):
+                        super().__init__()
+                        self.setWindowTitle("{function_name}")
+                        self.setGeometry(100, 100, 400, 300)
+                        
+                        # Crear widget central y layout
+                        central_widget = QWidget()
+                        self.setCentralWidget(central_widget)
+                        layout = QVBoxLayout(central_widget)
+                        
+                        # Agregar widgets aquí...
+                        
+                        self.show()
+            
+                # Reutilizar la aplicación si ya existe (anfitrión de interfaz de Lux)
+                app = QApplication.instance() or QApplication(sys.argv)
+                window = MainWindow()
+                app.exec()
+                
+                return "Operación completada exitosamente"
+                
+            except Exception as e:
+                return f"Error: {{e}}"
+        ```
+
+        IMPORTANTE: 
+        - La ventana debe ser independiente y funcional
+        - Incluir todos los imports necesarios
+        - Manejar el cierre de la ventana
+        - NO incluir el template en el archivo
+
+        Responde SOLO con el código Python, sin explicaciones.
+        """
+
     def validate_code(self, code: str) -> bool:
         """
         Valida que el código generado cumpla con los requisitos
@@ -382,18 +679,28 @@ class AIService:
         Returns:
             bool: True si el código es válido
         """
+        if self.artifact_cache:
+            verdict = self.artifact_cache.get_verdict('validation', code)
+            if verdict is not None:
+                return verdict
+        valid = self._validate_code(code)
+        if self.artifact_cache:
+            self.artifact_cache.put_verdict('validation', code, valid)
+        return valid
+
+    def _validate_code(self, code: str) -> bool:
         try:
             # Verificar sintaxis
-            compile(code, '<string>', 'exec')
+            facts = analyze_code(code)
+            if not facts.valid:
+                logger.error(f"Error de sintaxis en el código: {facts.syntax_error}")
+                return False
 
             # Verificar imports prohibidos
-            prohibited = ['requests', 'beautifulsoup', 'selenium', 'tensorflow', 'torch']
-            for line in code.split('\n'):
-                if line.strip().startswith('import '):
-                    for lib in prohibited:
-                        if lib in line:
-                            logger.error(f"Librería prohibida encontrada: {lib}")
-                            return False
+            prohibited = {'requests', 'bs4', 'beautifulsoup', 'selenium', 'tensorflow', 'torch'}
+            for lib in sorted(facts.modules & prohibited):
+                logger.error(f"Librería prohibida encontrada: {lib}")
+                return False
 
             return True
 
@@ -441,11 +748,246 @@ class AIService:
             Responde SOLO con la traducción conversacional, sin explicaciones adicionales.
             """
 
-            response = self.models['gemini'].generate_content(prompt)
-            if response.text:
-                return response.text.strip()
+            response = self.chat_with_model(prompt, use_cache=False)
+            if response:
+                return response.strip()
             return result
 
         except Exception as e:
             logger.error(f"Error traduciendo resultado: {e}")
-            return result 
\ No newline at end of file
+            return result
+
+    def translate_result_stream(self, chunks: Iterable[str], context: str) -> Iterator[str]:
+        """
+        Traduce un resultado que llega por partes: cada parte se traduce en
+        cuanto llega (con lo ya dicho como contexto) y la traducción se emite
+        en fragmentos, mientras la función sigue produciendo las siguientes
+        Args:
+            chunks: Partes del resultado técnico, en orden
+            context: Contexto de la petición original
+        """
+        said = []
+        for chunk in chunks:
+            prompt = f"""
+            CONTINÚA UNA RESPUESTA NATURAL Y CONVERSACIONAL SOBRE UN RESULTADO QUE LLEGA POR PARTES:
+
+            CONTEXTO DE LA PETICIÓN:
+            {context}
+
+            LO QUE YA DIJISTE:
+            {" ".join(said) or "(nada todavía)"}
+
+            NUEVA PARTE DEL RESULTADO:
+            {chunk}
+
+            REGLAS:
+            1. Comunicar solo la nueva parte, en una o dos oraciones
+            2. No repetir lo ya dicho ni volver a saludar
+            3. Lenguaje natural, claro y directo
+
+            Responde SOLO con el texto nuevo, sin explicaciones adicionales.
+            """
+            parts = []
+            try:
+                for piece in self.stream_chat(prompt, use_cache=False):
+                    if not parts and said:
+                        yield " "
+                    parts.append(piece)
+                    yield piece
+            except Exception as e:
+                logger.error(f"Error traduciendo resultado parcial: {e}")
+            if not parts:
+                # Sin modelo disponible: se entrega la parte tal cual
+                text = str(chunk)
+                yield f" {text}" if said else text
+                parts.append(text)
+            said.append("".join(parts).strip())
+
+    def _tool_name(self, name: str) -> str:
+        """Convierte un nombre de función a uno válido para Gemini ([a-zA-Z0-9_])"""
+        ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+        return re.sub(r'[^a-zA-Z0-9_]', '_', ascii_name)[:63] or 'funcion'
+
+    def _function_parameters(self, function: Optional[Callable]) -> Optional[Dict[str, Any]]:
+        """Genera el esquema de parámetros a partir de la firma de la función"""
+        if function is None:
+            return None
+        try:
+            signature = inspect.signature(function)
+        except (TypeError, ValueError):
+            return None
+
+        properties = {}
+        required = []
+        for param in signature.parameters.values():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            schema_type = self._SCHEMA_TYPES.get(param.annotation, 'STRING')
+            properties[param.name] = {"type": schema_type, "description": param.name}
+            if param.default is param.empty:
+                required.append(param.name)
+
+        if not properties:
+            return None
+        parameters = {"type": "OBJECT", "properties": properties}
+        if required:
+            parameters["required"] = required
+        return parameters
+
+    def build_function_declarations(self, registry: Dict[str, Any],
+                                    functions: Dict[str, Callable]) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Convierte el registro de funciones en declaraciones de funciones de Gemini
+        Args:
+            registry: Diccionario con las funciones registradas
+            functions: Funciones cargadas {nombre: callable}
+        Returns:
+            Tuple con la lista de declaraciones y el mapa {nombre_gemini: nombre_real}
+        """
+        declarations = []
+        name_map = {}
+
+        for name, info in registry.items():
+            if name not in functions or not info.get('enabled', True):
+                continue
+            tool_name = self._tool_name(name)
+            description = self.compact_description(info.get('description'), max_chars=300)
+            declaration = {"name": tool_name, "description": description}
+            parameters = self._function_parameters(functions.get(name))
+            if parameters:
+                declaration["parameters"] = parameters
+            declarations.append(declaration)
+            name_map[tool_name] = name
+
+        declarations.append({
+            "name": self.NEW_FUNCTION_TOOL,
+            "description": "Crea una función nueva cuando la petición requiere una acción "
+                           "que ninguna función disponible cumple",
+            "parameters": {
+                "type": "OBJECT",
+                "properties": {
+                    "nombre": {"type": "STRING", "description": "Nombre descriptivo en snake_case"},
+                    "descripcion": {"type": "STRING", "description": "Descripción clara y específica"}
+                },
+                "required": ["nombre", "descripcion"]
+            }
+        })
+        return declarations, name_map
+
+    def _generate_with_tools(self, contents: List[Dict], declarations: List[Dict],
+                             timeout: Optional[float] = None) -> Optional[Dict]:
+        """Llama a la API REST de Gemini con las declaraciones de funciones"""
+        payload = {"contents": contents}
+        if declarations:
+            payload["tools"] = [{"function_declarations": declarations}]
+
+        response = self.http.post(
+            self.gemini_rest_url,
+            params={"key": config.GEMINI_API_KEY},
+            json=payload,
+            timeout=self._http_timeout(timeout)
+        )
+        if response.status_code != 200:
+            logger.error(f"Error en Gemini (tools): {response.status_code} - {response.text}")
+            return None
+
+        candidates = response.json().get('candidates') or []
+        if not candidates:
+            return None
+        return candidates[0].get('content') or {}
+
+    def _generate_routed(self, contents: List[Dict], declarations: List[Dict]) -> Optional[Dict]:
+        """
+        _generate_with_tools a través del enrutador (límite de tasa, cortacircuitos
+        y latencias de Gemini); solo Gemini admite las declaraciones de funciones
+        """
+        _, content = self.router.call(
+            'routing',
+            lambda key, timeout: self._generate_with_tools(contents, declarations, timeout),
+            allowed=lambda key: key == 'gemini',
+            hedge=False
+        )
+        return content
+
+    @staticmethod
+    def _extract_function_call(content: Dict) -> Optional[Dict]:
+        for part in content.get('parts', []):
+            call = part.get('functionCall') or part.get('function_call')
+            if call:
+                return call
+        return None
+
+    @staticmethod
+    def _extract_text(content: Dict) -> str:
+        return "".join(part.get('text', '') for part in content.get('parts', [])).strip()
+
+    def run_with_tools(self, request: str, declarations: List[Dict],
+                       dispatcher: Callable[[str, Dict[str, Any]], str]) -> Optional[Dict[str, Any]]:
+        """
+        Resuelve una petición en un solo intercambio con el modelo: el modelo elige
+        la función y sus argumentos, se ejecuta y redacta la respuesta final.
+        Args:
+            request: Petición del usuario
+            declarations: Declaraciones de funciones (ver build_function_declarations)
+            dispatcher: Callable(nombre_gemini, args) que ejecuta la función y retorna su salida
+        Returns:
+            Dict con 'function' (None si no se llamó ninguna), 'args', 'result' y 'text',
+            o None si la API no está disponible (el llamador debe usar el flujo clásico)
+        """
+        try:
+            prompt = f"""
+            Eres Luxion, un asistente virtual amigable y servicial.
+
+            PETICIÓN DEL USUARIO:
+            {request}
+
+            REGLAS:
+            1. Si una de las funciones disponibles cumple la petición, llámala con los argumentos adecuados
+            2. Si se pide una acción que ninguna función cumple, llama a {self.NEW_FUNCTION_TOOL}
+            3. Si no se pide ninguna acción, responde directamente de forma conversacional
+            4. Cuando recibas el resultado de una función, responde de forma natural, clara
+               y directa confirmando lo realizado o explicando el problema con empatía
+            """
+            contents = [{"role": "user", "parts": [{"text": prompt}]}]
+
+            content = self._generate_routed(contents, declarations)
+            if content is None:
+                return None
+
+            call = self._extract_function_call(content)
+            if not call:
+                return {
+                    'function': None,
+                    'args': {},
+                    'result': None,
+                    'text': self._extract_text(content)
+                }
+
+            name = call.get('name', '')
+            args = call.get('args') or {}
+            logger.info(f"Gemini solicitó la función: {name} {args}")
+            result = dispatcher(name, args)
+
+            contents.append({"role": "model", "parts": content.get('parts', [])})
+            contents.append({
+                "role": "function",
+                "parts": [{
+                    "functionResponse": {
+                        "name": name,
+                        "response": {"name": name, "content": str(result)}
+                    }
+                }]
+            })
+
+            final = self._generate_routed(contents, declarations)
+            text = self._extract_text(final) if final else ""
+            return {
+                'function': name,
+                'args': args,
+                'result': result,
+                'text': text or str(result)
+            }
+
+        except Exception as e:
+            logger.error(f"Error en run_with_tools: {e}")
+            return None
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Union
+
+from .. import config
+from ..core.metrics import metrics
+from ..utils.helpers import normalize_text, char_ngrams
+
+logger = logging.getLogger('lux.cache')
+
+class SQLiteCache:
+    """
+    Caché persistente clave-valor sobre SQLite con TTL, expulsión LRU
+    y límite total de bytes
+    """
+
+    def __init__(self, db_path: Union[str, Path], ttl: Optional[float] = None,
+                 max_bytes: int = 10 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl  # segundos, None = sin expiración
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT,
+                    text TEXT,
+                    value TEXT NOT NULL,
+                    meta TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_namespace ON entries(namespace, last_access)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Clave estable (sha256) a partir de varias partes"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part if part is not None else '').encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna el valor si existe y no expiró (y lo marca como usado)"""
+        entry = self.get_entry(key)
+        return entry['value'] if entry else None
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna valor y metadatos de una entrada vigente"""
+        try:
+            now = time.time()
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, meta, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, meta, expires_at = row
+                if expires_at is not None and expires_at < now:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            return {'value': value, 'meta': json.loads(meta) if meta else {}}
+        except Exception as e:
+            logger.error(f"Error leyendo caché {self.db_path.name}: {e}")
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None,
+            namespace: Optional[str] = None, text: Optional[str] = None,
+            meta: Optional[Dict[str, Any]] = None):
+        """Guarda un valor y aplica la política de expulsión"""
+        try:
+            now = time.time()
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = now + ttl if ttl else None
+            meta_json = json.dumps(meta, ensure_ascii=False) if meta else None
+            size = len(value.encode('utf-8')) + len((text or '').encode('utf-8'))
+            with self._lock:
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO entries
+                       (key, namespace, text, value, meta, size, created_at, last_access, expires_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (key, namespace, text, value, meta_json, size, now, now, expires_at)
+                )
+                self._evict(now)
+                self._conn.commit()
+        except Exception as e:
+            logger.error(f"Error escribiendo caché {self.db_path.name}: {e}")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Elimina entradas expiradas y, si se supera el límite, las menos usadas"""
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        logger.debug(f"Caché {self.db_path.name}: expulsadas {len(victims)} entradas ({freed} bytes)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {'entries': count, 'bytes': total, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ResponseCache(SQLiteCache):
+    """
+    Caché de respuestas de chat indexada por prompt normalizado, modelo y prompt
+    de sistema. Opcionalmente acepta reformulaciones cercanas (similitud de
+    trigramas de caracteres) dentro del mismo modelo y prompt de sistema.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = Path("resources/cache/responses.db"),
+                 ttl: Optional[float] = 24 * 3600, max_bytes: int = 10 * 1024 * 1024,
+                 similarity_threshold: float = 0.0, max_candidates: int = 200):
+        super().__init__(db_path, ttl=ttl, max_bytes=max_bytes)
+        self.similarity_threshold = similarity_threshold  # 0 desactiva la búsqueda aproximada
+        self.max_candidates = max_candidates
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        return set(char_ngrams(text, 3, 3))
+
+    def _namespace(self, model: str, system_prompt: Optional[str]) -> str:
+        return self.make_key(model, system_prompt)
+
+    def get_response(self, prompt: str, model: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Busca una respuesta exacta o, si está habilitado, una reformulación cercana"""
+        start = time.perf_counter()
+        normalized = normalize_text(prompt)
+        namespace = self._namespace(model, system_prompt)
+
+        entry = self.get_entry(self.make_key(namespace, normalized))
+        if entry is None and self.similarity_threshold > 0:
+            entry = self._get_similar(namespace, normalized)
+
+        lookup_time = time.perf_counter() - start
+        metrics.observe('response_cache.lookup_seconds', lookup_time)
+        if entry is None:
+            metrics.increment('response_cache.misses')
+            return None
+
+        metrics.increment('response_cache.hits')
+        saved = entry['meta'].get('latency', 0) - lookup_time
+        if saved > 0:
+            metrics.increment('response_cache.saved_seconds', saved)
+        return entry['value']
+
+    def _get_similar(self, namespace: str, normalized: str) -> Optional[Dict[str, Any]]:
+        query = self._trigrams(normalized)
+        if not query:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT key, text FROM entries
+                   WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)
+                   ORDER BY last_access DESC LIMIT ?""",
+                (namespace, time.time(), self.max_candidates)
+            ).fetchall()
+
+        best_key, best_score = None, 0.0
+        for key, text in rows:
+            candidate = self._trigrams(text or '')
+            if not candidate:
+                continue
+            score = len(query & candidate) / len(query | candidate)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key and best_score >= self.similarity_threshold:
+            logger.debug(f"Caché de respuestas: coincidencia aproximada ({best_score:.2f})")
+            metrics.increment('response_cache.similar_hits')
+            return self.get_entry(best_key)
+        return None
+
+    def put_response(self, prompt: str, model: str, response: str,
+                     system_prompt: Optional[str] = None, latency: float = 0.0):
+        """Guarda una respuesta junto con la latencia que costó obtenerla"""
+        normalized = normalize_text(prompt)
+        namespace = self._namespace(model, system_prompt)
+        self.set(
+            self.make_key(namespace, normalized),
+            response,
+            namespace=namespace,
+            text=normalized,
+            meta={'model': model, 'latency': latency}
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        hits = metrics.get_counter('response_cache.hits')
+        misses = metrics.get_counter('response_cache.misses')
+        stats.update({
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'saved_seconds': metrics.get_counter('response_cache.saved_seconds')
+        })
+        return stats
+
+class ArtifactCache(SQLiteCache):
+    """
+    Caché direccionada por contenido para la creación de funciones:
+    - Código generado, indexado por (hash del prompt, modelo)
+    - Veredictos de análisis (seguridad, validación, dependencias, pruebas),
+      indexados por (tipo, versión de las reglas, hash del código)
+    Sin expiración: el contenido determina la clave, así que nunca queda obsoleta;
+    el tamaño se acota expulsando lo menos usado.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = Path("resources/cache/artifacts.db"),
+                 max_bytes: int = 50 * 1024 * 1024):
+        super().__init__(db_path, ttl=None, max_bytes=max_bytes)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_generation(self, prompt: str, model: str) -> Optional[str]:
+        """Código generado previamente para el mismo prompt y modelo"""
+        code = self.get(self.make_key('codegen', self.content_hash(prompt), model))
+        metrics.increment('artifact_cache.codegen.hits' if code is not None else 'artifact_cache.codegen.misses')
+        return code
+
+    def put_generation(self, prompt: str, model: str, code: str):
+        self.set(self.make_key('codegen', self.content_hash(prompt), model), code,
+                 namespace='codegen', meta={'model': model})
+
+    def get_verdict(self, kind: str, code: str, version: str = '') -> Optional[Any]:
+        """
+        Veredicto guardado para el código
+        Args:
+            kind: Tipo de análisis ('security', 'validation', 'imports', 'test'...)
+            code: Código analizado
+            version: Huella de las reglas del analizador; si cambian, se recalcula
+        """
+        value = self.get(self.make_key(kind, version, self.content_hash(code)))
+        metrics.increment(f'artifact_cache.{kind}.hits' if value is not None else f'artifact_cache.{kind}.misses')
+        return json.loads(value) if value is not None else None
+
+    def put_verdict(self, kind: str, code: str, verdict: Any, version: str = ''):
+        self.set(self.make_key(kind, version, self.content_hash(code)),
+                 json.dumps(verdict, ensure_ascii=False), namespace=kind)
+
+class ResultCache(SQLiteCache):
+    """
+    Resultados memoizados de funciones deterministas o que cambian despacio,
+    indexados por (función, hash del código, argumentos), y sus traducciones a
+    lenguaje natural, indexadas por (función, hash, resultado, petición). El
+    TTL lo decide quien guarda según la política de la función.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = Path("resources/cache/results.db"),
+                 max_bytes: int = 5 * 1024 * 1024):
+        super().__init__(db_path, ttl=None, max_bytes=max_bytes)
+
+    @staticmethod
+    def _args_key(args: Optional[Dict[str, Any]]) -> str:
+        return json.dumps(args or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+    def get_result(self, function_name: str, code_hash: str, args: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        value = self.get(self.make_key('result', function_name, code_hash, self._args_key(args)))
+        metrics.increment('result_cache.hits' if value is not None else 'result_cache.misses')
+        return json.loads(value) if value is not None else None
+
+    def put_result(self, function_name: str, code_hash: str, args: Optional[Dict[str, Any]],
+                   result: Any, ttl: float):
+        self.set(self.make_key('result', function_name, code_hash, self._args_key(args)),
+                 json.dumps(result, ensure_ascii=False, default=str), ttl=ttl, namespace=function_name)
+
+    def get_translation(self, function_name: str, code_hash: str, result: str, request: str) -> Optional[str]:
+        value = self.get(self.make_key('translation', function_name, code_hash, result, normalize_text(request)))
+        metrics.increment('result_cache.translation_hits' if value is not None else 'result_cache.translation_misses')
+        return value
+
+    def put_translation(self, function_name: str, code_hash: str, result: str, request: str,
+                        translation: str, ttl: float):
+        self.set(self.make_key('translation', function_name, code_hash, result, normalize_text(request)),
+                 translation, ttl=ttl, namespace=function_name)
+
+    def invalidate(self, function_name: str):
+        """Elimina los resultados y traducciones de una función"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ?", (function_name,))
+            self._conn.commit()
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Retorna la caché de resultados compartida, o None si está desactivada"""
+    global _result_cache
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            try:
+                _result_cache = ResultCache(max_bytes=config.RESULT_CACHE_MAX_BYTES)
+            except Exception as e:
+                logger.error(f"Error al inicializar caché de resultados: {e}")
+                return None
+        return _result_cache
+
+_artifact_cache: Optional[ArtifactCache] = None
+_artifact_cache_lock = threading.Lock()
+
+def get_artifact_cache() -> Optional[ArtifactCache]:
+    """Retorna la caché de artefactos compartida, o None si está desactivada"""
+    global _artifact_cache
+    if not config.ARTIFACT_CACHE_ENABLED:
+        return None
+    with _artifact_cache_lock:
+        if _artifact_cache is None:
+            try:
+                _artifact_cache = ArtifactCache(max_bytes=config.ARTIFACT_CACHE_MAX_BYTES)
+            except Exception as e:
+                logger.error(f"Error al inicializar caché de artefactos: {e}")
+                return None
+        return _artifact_cache
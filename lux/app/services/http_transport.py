@@ -0,0 +1,178 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from .. import config
+from ..core.metrics import metrics
+
+logger = logging.getLogger('lux.http')
+
+class HTTPTransport:
+    """
+    Transporte HTTP compartido para todas las llamadas salientes:
+    - Sesión con pools de conexiones keep-alive (evita el handshake TLS por petición)
+    - Límite de peticiones simultáneas por host
+    - Timeouts por defecto consistentes
+    - Reintentos con backoff exponencial y jitter completo; los métodos no
+      idempotentes (POST, PATCH) solo se reintentan si el servidor no llegó
+      a procesar la petición
+    - Métricas de latencia, errores y reintentos por host
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    # Sin efecto duplicado si se repiten
+    IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'}
+    # Estados que garantizan que la petición no se procesó
+    UNPROCESSED_STATUS = {429, 503}
+
+    def __init__(self, pool_size: int = 10, max_per_host: int = 8,
+                 timeout: Union[float, Tuple[float, float]] = (5, 30),
+                 retries: int = 2, backoff: float = 0.3, max_backoff: float = 8.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_per_host = max_per_host
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=max_per_host, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+
+    def _limit_for(self, key: str) -> threading.BoundedSemaphore:
+        with self._limits_lock:
+            semaphore = self._limits.get(key)
+            if semaphore is None:
+                semaphore = self._limits[key] = threading.BoundedSemaphore(self.max_per_host)
+            return semaphore
+
+    def _should_retry(self, method: str, error: Optional[Exception] = None,
+                      status: Optional[int] = None) -> bool:
+        """
+        Decide si un fallo se puede reintentar: los métodos idempotentes ante
+        cualquier error de conexión o estado 429/5xx; el resto solo si la
+        petición no llegó al servidor (fallo al conectar) o este la rechazó
+        sin procesarla (429/503). Un timeout de lectura en un POST no se
+        reintenta: el servidor pudo haberlo ejecutado.
+        """
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        if status is not None:
+            return status in (self.RETRY_STATUS if idempotent else self.UNPROCESSED_STATUS)
+        if idempotent or isinstance(error, requests.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.ConnectionError):
+            return False  # ReadTimeout
+        # requests envuelve en ConnectionError los cortes después de enviar
+        cause = error.args[0] if error.args else None
+        return not isinstance(cause, (ProtocolError, ReadTimeoutError))
+
+    def _backoff_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Backoff exponencial con jitter completo, respetando Retry-After si existe"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method: str, url: str, timeout: Optional[Union[float, Tuple[float, float]]] = None,
+                retries: Optional[int] = None, **kwargs: Any) -> requests.Response:
+        """
+        Realiza una petición con reintentos
+        Args:
+            method: Método HTTP
+            url: URL destino
+            timeout: Timeout (connect, read) o total; por defecto el del transporte
+            retries: Reintentos ante errores de conexión o estados 429/5xx (ver _should_retry)
+            **kwargs: Argumentos de requests (json, headers, params, proxies, stream...)
+        Returns:
+            requests.Response de la última respuesta recibida
+        Raises:
+            requests.RequestException si todos los intentos fallan por conexión
+        """
+        host = urlparse(url).netloc
+        proxies = kwargs.get('proxies') or {}
+        # Con proxy, el pool (y por tanto el límite) es por proxy y no por host destino
+        limit_key = proxies.get(urlparse(url).scheme) or host
+        retries = self.retries if retries is None else retries
+        timeout = self.timeout if timeout is None else timeout
+
+        for attempt in range(retries + 1):
+            response = None
+            error = None
+            start = time.perf_counter()
+            with self._limit_for(limit_key):
+                try:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+            elapsed = time.perf_counter() - start
+
+            metrics.increment(f'http.requests.{host}')
+            if error is None:
+                metrics.observe(f'http.latency.{host}', elapsed)
+                if attempt >= retries or not self._should_retry(method, status=response.status_code):
+                    return response
+                logger.debug(f"{method} {host}: estado {response.status_code}, reintentando")
+                response.close()
+            else:
+                metrics.increment(f'http.errors.{host}')
+                if attempt >= retries or not self._should_retry(method, error=error):
+                    raise error
+                logger.debug(f"{method} {host}: {error}, reintentando")
+
+            metrics.increment(f'http.retries.{host}')
+            time.sleep(self._backoff_delay(attempt, response))
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('HEAD', url, **kwargs)
+
+    def get_host_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latencia y errores por host"""
+        snapshot = metrics.snapshot()
+        stats = {}
+        for name, summary in snapshot['distributions'].items():
+            if name.startswith('http.latency.'):
+                host = name[len('http.latency.'):]
+                stats[host] = {
+                    **summary,
+                    'requests': snapshot['counters'].get(f'http.requests.{host}', 0),
+                    'errors': snapshot['counters'].get(f'http.errors.{host}', 0),
+                    'retries': snapshot['counters'].get(f'http.retries.{host}', 0)
+                }
+        return stats
+
+    def close(self):
+        self.session.close()
+
+_transport: Optional[HTTPTransport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> HTTPTransport:
+    """Retorna el transporte compartido (se crea en el primer uso)"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport(
+                pool_size=config.HTTP_POOL_SIZE,
+                max_per_host=config.HTTP_MAX_PER_HOST,
+                timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT),
+                retries=config.HTTP_RETRIES,
+                backoff=config.HTTP_BACKOFF
+            )
+        return _transport
@@ -0,0 +1,369 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, List, Any, Callable, Deque, Tuple
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger('lux.router')
+
+class TokenBucket:
+    """Límite de tasa por proveedor: `rate` peticiones por segundo con ráfagas de hasta `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Consume tokens si hay disponibles, sin bloquear"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: float = 0.0) -> bool:
+        """Consume tokens esperando a que se repongan, como mucho `timeout` segundos"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = self._wait_time(tokens)
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _wait_time(self, tokens: float) -> float:
+        """Segundos hasta disponer de `tokens` (con el lock tomado)"""
+        missing = tokens - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+    def wait_time(self, tokens: float = 1) -> float:
+        with self._lock:
+            self._refill()
+            return self._wait_time(tokens)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+class CircuitBreaker:
+    """
+    Expulsa un modelo tras `threshold` fallos consecutivos durante `cooldown`
+    segundos; después deja pasar una única petición de prueba (semiabierto)
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self.failures < self.threshold:
+            return self.CLOSED
+        if now - self.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Indica si se puede enviar una petición (y reserva la de prueba si está semiabierto)"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        """Como allow() pero sin reservar la petición de prueba"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            return state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_in_flight)
+
+    def record(self, success: bool):
+        with self._lock:
+            self._trial_in_flight = False
+            if success:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+class ModelRouter:
+    """
+    Elige el modelo más rápido y sano para cada clase de petición ('chat',
+    'routing', 'codegen') según sus percentiles de latencia recientes, con
+    cortacircuitos por modelo, límite de tasa por proveedor y, para las clases
+    sensibles a la latencia, una segunda petición de cobertura (hedge) si la
+    primera supera su p95.
+
+    fn(modelo, timeout) recibe en las llamadas con cobertura un tiempo límite
+    propio por intento (p99 del modelo con margen): la petición perdedora no
+    se puede interrumpir, pero así libera su hilo y su conexión en un tiempo
+    acotado. Sin cobertura, o sin muestras suficientes, timeout es None (el
+    del transporte).
+    """
+
+    def __init__(self, providers: Dict[str, str], routes: Dict[str, List[str]],
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 hedge_classes: Optional[List[str]] = None, hedge_delay: float = 2.0,
+                 min_hedge_delay: float = 0.3, min_samples: int = 5,
+                 breaker_threshold: int = 3, breaker_cooldown: float = 60.0,
+                 window: int = 50, max_workers: int = 8, rate_limit_wait: float = 0.0,
+                 attempt_timeout_multiplier: float = 3.0, min_attempt_timeout: float = 5.0):
+        """
+        Args:
+            providers: Proveedor de cada modelo, p. ej. {'gemini': 'google', 'gpt4': 'openrouter'}
+            routes: Modelos candidatos por clase de petición, en orden de preferencia
+            rate_limits: (peticiones por segundo, ráfaga) por proveedor
+            hedge_classes: Clases en las que se envía petición de cobertura
+            hedge_delay: Espera antes de la cobertura mientras no haya muestras suficientes
+            min_hedge_delay: Espera mínima antes de la cobertura
+            min_samples: Muestras necesarias para confiar en los percentiles de un modelo
+            breaker_threshold: Fallos consecutivos que abren el cortacircuitos
+            breaker_cooldown: Segundos que un modelo permanece expulsado
+            window: Resultados recientes considerados para la tasa de error
+            rate_limit_wait: Segundos que se espera a que el límite de tasa de un
+                proveedor se reponga antes de pasar al siguiente modelo
+            attempt_timeout_multiplier: Margen sobre el p99 para el tiempo límite de
+                cada intento con cobertura
+            min_attempt_timeout: Mínimo de ese tiempo límite
+        """
+        self.providers = providers
+        self.routes = routes
+        self.hedge_classes = set(hedge_classes or [])
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.rate_limit_wait = rate_limit_wait
+        self.attempt_timeout_multiplier = attempt_timeout_multiplier
+        self.min_attempt_timeout = min_attempt_timeout
+        self.buckets = {
+            provider: TokenBucket(rate, capacity)
+            for provider, (rate, capacity) in (rate_limits or {}).items()
+        }
+        self.breakers = {model: CircuitBreaker(breaker_threshold, breaker_cooldown) for model in providers}
+        self._outcomes: Dict[str, Deque[bool]] = {model: deque(maxlen=window) for model in providers}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lux-router')
+
+    # Estado por modelo
+
+    def record(self, model: str, latency: float, success: bool):
+        """Registra el resultado de una petición a un modelo"""
+        if success:
+            metrics.observe(f'router.latency.{model}', latency)
+        else:
+            metrics.increment(f'router.errors.{model}')
+        with self._lock:
+            self._outcomes.setdefault(model, deque(maxlen=50)).append(success)
+        breaker = self.breakers.get(model)
+        if breaker:
+            breaker.record(success)
+
+    def error_rate(self, model: str) -> float:
+        with self._lock:
+            outcomes = self._outcomes.get(model)
+            if not outcomes:
+                return 0.0
+            return 1 - sum(outcomes) / len(outcomes)
+
+    def _latency(self, model: str, q: float) -> Optional[float]:
+        """Percentil de latencia del modelo, None si aún no hay muestras suficientes"""
+        if metrics.summary(f'router.latency.{model}')['count'] < self.min_samples:
+            return None
+        return metrics.percentile(f'router.latency.{model}', q)
+
+    def rate_limit_check(self, model: Optional[str] = None, consume: bool = True) -> bool:
+        """
+        Verifica el límite de tasa del proveedor del modelo (consumiendo un token
+        si `consume`). Sin modelo, indica si algún proveedor tiene capacidad.
+        """
+        if model is None:
+            return any(
+                provider not in self.buckets or self.buckets[provider].available() >= 1
+                for provider in set(self.providers.values())
+            )
+        bucket = self.buckets.get(self.providers.get(model, ''))
+        if bucket is None:
+            return True
+        if consume:
+            return bucket.try_acquire()
+        return bucket.available() >= 1
+
+    # Selección
+
+    def candidates(self, request_class: str, allowed: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        Modelos sanos para la clase, del más rápido al más lento (p50). Los modelos
+        sin muestras suficientes van al final en su orden de preferencia.
+        """
+        ranked = []
+        for position, model in enumerate(self.routes.get(request_class, [])):
+            if allowed and not allowed(model):
+                continue
+            breaker = self.breakers.get(model)
+            if breaker and not breaker.is_available():
+                continue
+            if self._rate_limit_wait_for(model) > self.rate_limit_wait:
+                continue
+            p50 = self._latency(model, 50)
+            ranked.append((p50 if p50 is not None else float('inf'), position, model))
+        return [model for _, _, model in sorted(ranked)]
+
+    def choose(self, request_class: str, allowed: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        candidates = self.candidates(request_class, allowed)
+        return candidates[0] if candidates else None
+
+    def _hedge_delay_for(self, model: str) -> float:
+        p95 = self._latency(model, 95)
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.hedge_delay)
+
+    def attempt_timeout(self, model: str) -> Optional[float]:
+        """Tiempo límite de un intento con cobertura, None sin muestras suficientes"""
+        p99 = self._latency(model, 99)
+        if p99 is None:
+            return None
+        return max(self.min_attempt_timeout, p99 * self.attempt_timeout_multiplier)
+
+    def _rate_limit_wait_for(self, model: str) -> float:
+        bucket = self.buckets.get(self.providers.get(model, ''))
+        return bucket.wait_time() if bucket else 0.0
+
+    # Ejecución
+
+    def _attempt(self, model: str, fn: Callable[[str, Optional[float]], Any],
+                 timeout: Optional[float] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn(model, timeout)
+        except Exception as e:
+            logger.warning(f"Modelo {model} falló: {e}")
+            result = None
+        self.record(model, time.perf_counter() - start, result is not None)
+        return result
+
+    def _start(self, models: List[str], fn: Callable[[str, Optional[float]], Any], hedge: bool = False):
+        """
+        Lanza la petición al siguiente modelo admitido por cortacircuitos y límite
+        de tasa; si el proveedor no tiene capacidad se espera como mucho
+        rate_limit_wait antes de pasar al siguiente modelo
+        """
+        while models:
+            model = models.pop(0)
+            breaker = self.breakers.get(model)
+            if breaker and not breaker.is_available():
+                continue
+            bucket = self.buckets.get(self.providers.get(model, ''))
+            if bucket and not bucket.acquire(timeout=self.rate_limit_wait):
+                metrics.increment(f'router.rate_limited.{model}')
+                continue
+            if breaker and not breaker.allow():
+                continue
+            timeout = self.attempt_timeout(model) if hedge else None
+            return model, self._executor.submit(self._attempt, model, fn, timeout)
+        return None, None
+
+    def call(self, request_class: str, fn: Callable[[str, Optional[float]], Any],
+             allowed: Optional[Callable[[str], bool]] = None,
+             hedge: Optional[bool] = None) -> Tuple[Optional[str], Any]:
+        """
+        Ejecuta fn(modelo, timeout) con el mejor modelo disponible. Si falla, pasa
+        al siguiente; si la clase admite cobertura y la respuesta tarda más que el
+        p95 del modelo, lanza otra petición al siguiente y se queda con la primera
+        respuesta válida. Un resultado None cuenta como fallo.
+        Returns:
+            (modelo, resultado) o (None, None) si ningún modelo respondió
+        """
+        pending_models = self.candidates(request_class, allowed)
+        if not pending_models:
+            logger.warning(f"Sin modelos disponibles para '{request_class}'")
+            return None, None
+        hedge = request_class in self.hedge_classes if hedge is None else hedge
+
+        in_flight: Dict[Any, str] = {}
+        model, future = self._start(pending_models, fn, hedge)
+        if future is None:
+            return None, None
+        in_flight[future] = model
+        hedge_at = time.monotonic() + self._hedge_delay_for(model) if hedge else None
+
+        while in_flight:
+            timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at and pending_models else None
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Venció la espera: petición de cobertura al siguiente modelo
+                hedge_at = None
+                model, future = self._start(pending_models, fn, hedge)
+                if future is not None:
+                    metrics.increment(f'router.hedges.{request_class}')
+                    logger.debug(f"Cobertura ({request_class}) con {model}")
+                    in_flight[future] = model
+                continue
+
+            for future in done:
+                model = in_flight.pop(future)
+                result = future.result()
+                if result is not None:
+                    # Descartar las peticiones perdedoras: las que no empezaron se cancelan
+                    # y las que están en curso terminan por su propio tiempo límite
+                    for loser in in_flight:
+                        loser.cancel()
+                    metrics.increment(f'router.wins.{model}')
+                    return model, result
+
+            # Todas las completadas fallaron: pasar al siguiente si no queda nada en vuelo
+            if not in_flight:
+                model, future = self._start(pending_models, fn, hedge)
+                if future is not None:
+                    in_flight[future] = model
+                    if hedge:
+                        hedge_at = time.monotonic() + self._hedge_delay_for(model)
+
+        return None, None
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latencia, tasa de error y estado del cortacircuitos de cada modelo"""
+        return {
+            model: {
+                **metrics.summary(f'router.latency.{model}'),
+                'error_rate': self.error_rate(model),
+                'breaker': self.breakers[model].state,
+                'provider': self.providers[model]
+            }
+            for model in self.providers
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
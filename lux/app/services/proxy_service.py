@@ -1,9 +1,9 @@
-import requests
 import time
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Tuple, Optional
+from .http_transport import HTTPTransport, get_transport
 
 logger = logging.getLogger('lux')
 
@@ -26,20 +26,21 @@ class ProxyService:
         except Exception as e:
             logger.error(f"Error cargando proxies: {e}")
     
-    def _check_proxy(self, proxy: str, timeout: int = 2) -> Optional[Tuple[str, float]]:
+    def _check_proxy(self, proxy: str, timeout: int = 2,
+                     transport: Optional[HTTPTransport] = None) -> Optional[Tuple[str, float]]:
         """Verifica si un proxy funciona"""
         start_time = time.perf_counter()
         try:
-            with requests.Session() as session:
-                response = session.head(
-                    "https://www.google.com/",
-                    proxies={'http': f'http://{proxy}', 'https': f'http://{proxy}'},
-                    timeout=timeout
-                )
-                elapsed_time = time.perf_counter() - start_time
-                if response.status_code == 200 and elapsed_time <= timeout:
-                    logger.debug(f"Proxy válido: {proxy} ({elapsed_time:.2f}s)")
-                    return proxy, elapsed_time
+            response = (transport or get_transport()).head(
+                "https://www.google.com/",
+                proxies={'http': f'http://{proxy}', 'https': f'http://{proxy}'},
+                timeout=timeout,
+                retries=0
+            )
+            elapsed_time = time.perf_counter() - start_time
+            if response.status_code == 200 and elapsed_time <= timeout:
+                logger.debug(f"Proxy válido: {proxy} ({elapsed_time:.2f}s)")
+                return proxy, elapsed_time
         except Exception as e:
             logger.debug(f"Proxy inválido {proxy}: {e}")
         return None
@@ -48,22 +49,28 @@ class ProxyService:
         """Actualiza la lista de proxies"""
         try:
             logger.info("Actualizando lista de proxies...")
-            resp = requests.get(
+            resp = get_transport().get(
                 "https://api.proxyscrape.com/v2/?request=displayproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all"
             )
             proxies = [p.strip() for p in resp.text.strip().split("\n")[:number_of_proxies] if p.strip()]
             
             working_proxies = []
-            with ThreadPoolExecutor(max_workers=50) as executor:
-                futures = {
-                    executor.submit(self._check_proxy, proxy, timeout): proxy 
-                    for proxy in proxies
-                }
-                
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result:
-                        working_proxies.append(result[0])
+            # Transporte desechable: cada proxy probado abriría un pool y un límite
+            # en el transporte compartido que nunca se liberarían
+            probe = HTTPTransport(pool_size=1, max_per_host=1, retries=0)
+            try:
+                with ThreadPoolExecutor(max_workers=50) as executor:
+                    futures = {
+                        executor.submit(self._check_proxy, proxy, timeout, probe): proxy 
+                        for proxy in proxies
+                    }
+                    
+                    for future in as_completed(futures):
+                        result = future.result()
+                        if result:
+                            working_proxies.append(result[0])
+            finally:
+                probe.close()
             
             # Guardar proxies funcionando
             with open(self.proxy_file, 'w') as f:
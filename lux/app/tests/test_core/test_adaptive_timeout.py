@@ -0,0 +1,32 @@
+from app.core.adaptive_timeout import AdaptiveTimeouts
+
+def _timeouts(path=None):
+    return AdaptiveTimeouts(path, multiplier=4, floor=0.5, ceiling=60, min_samples=5, window=20, default=30)
+
+def test_deadline_follows_p99_within_bounds():
+    timeouts = _timeouts()
+    for _ in range(4):
+        timeouts.record('rapida', 0.01)
+    assert timeouts.deadline('rapida') == 30  # historial insuficiente
+
+    timeouts.record('rapida', 0.02)
+    assert timeouts.deadline('rapida') == 0.5  # 0.02 x 4, elevado al mínimo
+    for _ in range(5):
+        timeouts.record('lenta', 40)
+    assert timeouts.deadline('lenta') == 60
+    assert timeouts.deadline('lenta', override=90) == 90
+
+def test_timeouts_widen_the_deadline_and_history_persists(tmp_path):
+    path = tmp_path / "latency.json"
+    timeouts = _timeouts(path)
+    for _ in range(5):
+        timeouts.record('informe', 1.0)
+    assert timeouts.deadline('informe') == 4.0
+
+    timeouts.record('informe', timeouts.deadline('informe'))  # agotó el límite
+    assert timeouts.deadline('informe') == 16.0
+    timeouts._store.flush()
+
+    assert _timeouts(path).deadline('informe') == 16.0
+    timeouts.forget('informe')
+    assert timeouts.deadline('informe') == 30
@@ -0,0 +1,74 @@
+from app.core.code_facts import analyze_code
+from app.core.security_analyzer import SecurityAnalyzer
+from app.core.permission_manager import PermissionManager
+
+CODE = '''
+import os.path
+from PyQt6.QtWidgets import QApplication
+import requests
+
+def guardar_notas(texto: str) -> str:
+    """Guarda notas en un archivo"""
+    try:
+        if not texto.strip():
+            return "Sin texto"
+        with open("resources/temp/notas.txt", "w") as f:
+            f.write(texto)
+        while True:
+            for linea in texto.splitlines():
+                for palabra in linea.split():
+                    for letra in palabra:
+                        pass
+            break
+        return "ok"
+    except Exception as e:
+        return f"Error: {e}"
+'''
+
+def test_single_pass_facts():
+    facts = analyze_code(CODE)
+    assert facts.valid
+    assert facts.modules == {'os', 'PyQt6', 'requests'}
+    assert facts.first_function_name == 'guardar_notas'
+    assert facts.function('guardar_notas').docstring == "Guarda notas en un archivo"
+    assert facts.function('guardar_notas').has_try
+    assert facts.has_validation
+    assert [call.name for call in facts.file_writes] == ['open', 'f.write']
+    assert [(loop.kind, loop.depth, loop.has_exit) for loop in facts.loops] == [
+        ('while', 1, True), ('for', 2, False), ('for', 3, False), ('for', 4, False)
+    ]
+
+def test_facts_are_shared_by_text():
+    assert analyze_code(CODE) is analyze_code(CODE)
+
+def test_syntax_error():
+    facts = analyze_code("def roto(:\n    pass")
+    assert not facts.valid
+    assert facts.first_function_name == ""
+
+def test_cache_class():
+    assert analyze_code(CODE).cache_class is None  # escribe archivos y abre ventanas
+    assert analyze_code("def saludar(nombre):\n    return f'Hola {nombre}'\n").cache_class == 'pure'
+    assert analyze_code("import requests\ndef ip():\n    return requests.get('https://ipinfo.io').text\n").cache_class == 'network'
+    assert analyze_code("from datetime import datetime\ndef hora():\n    return str(datetime.now())\n").cache_class is None
+    assert analyze_code("def preguntar():\n    return input()\n").cache_class is None
+
+def test_return_in_nested_function_does_not_exit_loop():
+    facts = analyze_code("while True:\n    def f():\n        return 1\n")
+    assert [loop.has_exit for loop in facts.loops] == [False]
+
+def test_security_analyzer_uses_facts(monkeypatch):
+    monkeypatch.setattr('app.core.security_analyzer.get_artifact_cache', lambda: None)
+    violations = SecurityAnalyzer().analyze_code(CODE, "guardar_notas")
+    kinds = {violation.type for violation in violations}
+
+    assert 'error' not in kinds
+    assert 'error_handling' not in kinds
+    assert any(v.type == 'import' and 'PyQt6.QtWidgets' in v.message for v in violations)
+    assert any(v.message == "Demasiados loops anidados" for v in violations)
+
+def test_permissions_from_facts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    names = {perm.name for perm in PermissionManager().analyze_required_permissions(CODE)}
+    assert {'file_write', 'network_access', 'gui_access'} <= names
+    assert 'system_exec' not in names
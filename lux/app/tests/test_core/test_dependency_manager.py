@@ -0,0 +1,61 @@
+import subprocess
+from types import SimpleNamespace
+import pytest
+from app.core.dependency_manager import DependencyManager, PackageIndex, version_key
+
+@pytest.fixture(autouse=True)
+def no_artifact_cache(monkeypatch):
+    monkeypatch.setattr('app.core.dependency_manager.get_artifact_cache', lambda: None)
+
+def _install_dist(site, name, version):
+    dist_info = site / f"{name}-{version}.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+
+def test_index_is_lazy_and_rebuilt_when_site_changes(tmp_path):
+    _install_dist(tmp_path, "Pygame", "2.5.2")
+    index = PackageIndex([str(tmp_path)])
+    assert index._packages is None
+
+    assert index.version("pygame") == "2.5.2"
+    packages = index.packages()
+    assert index.packages() is packages  # sin cambios no se reconstruye
+
+    _install_dist(tmp_path, "numpy", "1.26.3")
+    assert index.version("NumPy") == "1.26.3"
+    assert "pandas" not in index
+
+def test_version_key():
+    assert version_key("1.24.0") < version_key("1.26.3") < version_key("10.0")
+    assert version_key("2.0.0rc1") == (2, 0, 0)
+
+def test_batch_install_from_wheelhouse_in_background(tmp_path, monkeypatch):
+    site = tmp_path / "site"
+    site.mkdir()
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    (wheelhouse / "numpy-1.24.0-py3-none-any.whl").write_bytes(b"")
+    manager = DependencyManager(wheelhouse=str(wheelhouse), offline_only=True,
+                                package_index=PackageIndex([str(site)]))
+    assert sorted(manager.analyze_dependencies("import numpy\nimport pygame\n")['required']) == ['numpy', 'pygame']
+
+    commands = []
+    def fake_pip(command, **kwargs):
+        commands.append(command)
+        _install_dist(site, "numpy", "1.24.0")
+        _install_dist(site, "pygame", "2.5.0")
+        return SimpleNamespace(returncode=0, stderr="")
+    monkeypatch.setattr(subprocess, "run", fake_pip)
+
+    done = []
+    assert manager.install_in_background(['numpy', 'pygame'], done.append).result(timeout=5)
+    assert done == [True]
+    assert len(commands) == 1  # un solo lote, sin conexión
+    assert "--no-index" in commands[0] and str(wheelhouse) in commands[0]
+    assert commands[0][-2:] == ["numpy==1.24.0", "pygame==2.5.0"]
+    assert manager.analyze_dependencies("import numpy\nimport pygame\n")['required'] == []
+
+def test_offline_without_wheelhouse_fails_fast(tmp_path):
+    manager = DependencyManager(wheelhouse=str(tmp_path / "vacio"), offline_only=True,
+                                package_index=PackageIndex([str(tmp_path)]))
+    assert not manager.install_dependencies(['numpy'])
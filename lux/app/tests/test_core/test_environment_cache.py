@@ -0,0 +1,45 @@
+from app.core.environment_cache import EnvironmentCache
+
+def _builder(calls):
+    def build(target):
+        calls.append(target)
+        (target / "paquete.py").write_text("VALOR = 1\n")
+        return True
+    return build
+
+def test_same_dependency_set_is_built_once(tmp_path):
+    cache = EnvironmentCache(tmp_path, keep_unused=1)
+    calls = []
+    first = cache.acquire('juego_1', ['pygame==2.5.0'], _builder(calls))
+    second = cache.acquire('juego_2', ['PYGAME==2.5.0'], _builder(calls))
+
+    assert first == second and (first / "paquete.py").exists()
+    assert len(calls) == 1
+    assert cache.environment_for('juego_2') == str(first)
+    assert cache.environment_for('otra') is None
+
+    # El índice sobrevive a un reinicio
+    assert EnvironmentCache(tmp_path).environment_for('juego_1') == str(first)
+
+def test_failed_build_leaves_nothing(tmp_path):
+    cache = EnvironmentCache(tmp_path)
+    assert cache.acquire('juego', ['pygame==2.5.0'], lambda target: False) is None
+    assert cache.environment_for('juego') is None
+    assert [p.name for p in tmp_path.iterdir()] == []
+
+def test_unreferenced_environments_are_collected_lru(tmp_path):
+    cache = EnvironmentCache(tmp_path, keep_unused=1)
+    calls = []
+    numpy = cache.acquire('grafica', ['numpy==1.24.0'], _builder(calls))
+    pandas = cache.acquire('tabla', ['pandas==2.0.0'], _builder(calls))
+    pygame = cache.acquire('juego', ['pygame==2.5.0'], _builder(calls))
+
+    cache.release('grafica')
+    assert numpy.exists()  # se conserva uno sin uso
+    cache.release('tabla')
+    assert not numpy.exists() and pandas.exists() and pygame.exists()
+    assert cache.stats()['unused'] == 1
+
+    # Reutilizar un entorno conservado no reinstala
+    assert cache.acquire('tabla_2', ['pandas==2.0.0'], _builder(calls)) == pandas
+    assert len(calls) == 3
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+from app.core.adaptive_timeout import AdaptiveTimeouts
+from app.core.execution_scheduler import ExecutionScheduler, Priority
+from app.core.metrics import metrics
+from app.core.safe_executor import SafeExecutor
+
+class RecordingExecutor:
+    """Ejecuta en el hilo del planificador y registra el orden y la concurrencia"""
+
+    def __init__(self):
+        self.order = []
+        self.active = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+
+    def execute(self, function, *args, **kwargs):
+        name = function.__name__
+        with self.lock:
+            self.order.append(name)
+            self.active[name] = self.active.get(name, 0) + 1
+            self.peak[name] = max(self.peak.get(name, 0), self.active[name])
+        try:
+            return {'success': True, 'result': function(*args, **kwargs)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+        finally:
+            with self.lock:
+                self.active[name] -= 1
+
+def _named(name, body):
+    body.__name__ = name
+    return body
+
+def test_overlapping_calls_get_their_own_results():
+    scheduler = ExecutionScheduler(RecordingExecutor(), max_concurrent=4, max_per_function=0)
+    def echo(value):
+        time.sleep(0.01)
+        if value == 3:
+            raise ValueError("tres")
+        return value
+    futures = [scheduler.submit('echo', echo, i) for i in range(8)]
+
+    results = [future.result(timeout=5) for future in futures]
+    assert [r.get('result') for r in results] == [0, 1, 2, None, 4, 5, 6, 7]
+    assert results[3] == {'success': False, 'error': "tres"}
+    scheduler.shutdown()
+
+def test_priority_and_per_function_limit():
+    executor = RecordingExecutor()
+    scheduler = ExecutionScheduler(executor, max_concurrent=1, max_per_function=0)
+    gate = threading.Event()
+    blocker = scheduler.submit('bloquear', _named('bloquear', lambda: gate.wait(5)))
+    time.sleep(0.05)  # el único hilo queda ocupado
+
+    background = scheduler.submit('prueba', _named('prueba', lambda: 'prueba'), priority=Priority.BACKGROUND)
+    chat = scheduler.submit('chat', _named('chat', lambda: 'chat'), priority=Priority.CHAT)
+    voice = scheduler.submit('voz', _named('voz', lambda: 'voz'), priority=Priority.VOICE)
+    assert scheduler.queue_depth == 3
+    assert metrics.snapshot()['gauges']['scheduler.queue_depth'] == 3
+
+    gate.set()
+    for future in (blocker, background, chat, voice):
+        future.result(timeout=5)
+    assert executor.order == ['bloquear', 'voz', 'chat', 'prueba']
+    scheduler.shutdown()
+
+def test_function_limit_caps_concurrency():
+    executor = RecordingExecutor()
+    scheduler = ExecutionScheduler(executor, max_concurrent=4, max_per_function=0,
+                                   function_limits={'lenta': 1})
+    slow = _named('lenta', lambda: time.sleep(0.02))
+    fast = _named('rapida', lambda: time.sleep(0.02))
+    futures = [scheduler.submit('lenta', slow) for _ in range(3)] + \
+              [scheduler.submit('rapida', fast) for _ in range(3)]
+
+    for future in futures:
+        future.result(timeout=5)
+    assert executor.peak['lenta'] == 1
+    assert executor.peak['rapida'] > 1
+    scheduler.shutdown()
+
+def test_async_functions_do_not_hold_scheduler_threads():
+    scheduler = ExecutionScheduler(SafeExecutor(max_time=2, mode='thread'), max_concurrent=1, max_per_function=0)
+    async def esperar():
+        await asyncio.sleep(0.2)
+        return "listo"
+
+    start = time.perf_counter()
+    futures = [scheduler.submit('esperar', esperar) for _ in range(5)]
+    assert [future.result(timeout=5)['result'] for future in futures] == ["listo"] * 5
+    assert time.perf_counter() - start < 0.6
+    scheduler.shutdown()
+
+def test_hung_fast_function_fails_within_its_learned_deadline():
+    timeouts = AdaptiveTimeouts(multiplier=4, floor=0.2, ceiling=60, min_samples=5, default=30)
+    scheduler = ExecutionScheduler(SafeExecutor(max_time=30, mode='thread'), max_concurrent=1,
+                                   max_per_function=0, timeouts=timeouts)
+    hang = threading.Event()
+    def consultar():
+        if hang.is_set():
+            time.sleep(5)
+        return "ok"
+
+    for _ in range(5):
+        assert scheduler.execute('consultar', consultar)['success']
+    hang.set()
+    start = time.perf_counter()
+    result = scheduler.execute('consultar', consultar)
+    assert result['type'] == 'timeout'
+    assert time.perf_counter() - start < 1
+    assert scheduler.execute('consultar', consultar, timeout=0.05)['type'] == 'timeout'
+    scheduler.shutdown()
@@ -0,0 +1,68 @@
+import pytest
+from app.core.function_index import FunctionIndex
+
+REGISTRY = {
+    'obtener_hora': {'description': 'Obtiene la hora actual del sistema', 'enabled': True},
+    'obtener_saludo_persona': {'description': 'función para obtener un saludo genérico para una persona', 'enabled': True},
+    'abrir_aplicacion': {'description': 'Abre una aplicación o sitio web', 'enabled': True},
+}
+
+@pytest.fixture
+def index(tmp_path):
+    index = FunctionIndex(threshold=0.8, min_margin=0.05)
+    index.utterances_file = tmp_path / "utterances.json"
+    index.utterances = {}
+    index.build(REGISTRY)
+    return index
+
+def test_query_ranks_by_similarity(index):
+    ranked = index.query("qué hora es")
+    assert ranked[0][0] == 'obtener_hora'
+
+def test_low_confidence_is_a_miss(index):
+    assert index.match("qué hora es") is None
+    assert index.get_stats()['misses'] == 1
+
+def test_recorded_utterance_routes_locally(index):
+    index.record_utterance('obtener_hora', '¿Qué hora es?')
+
+    match = index.match("que hora es")
+    assert match[0] == 'obtener_hora'
+    assert match[1] >= 0.8
+    assert index.get_stats()['hits'] == 1
+    assert (index.utterances_file).exists()
+
+def test_accept_filter(index):
+    index.record_utterance('obtener_hora', 'qué hora es')
+    assert index.match("qué hora es", accept=lambda name: name != 'obtener_hora') is None
+
+def test_incremental_update_from_registry_events(index):
+    index.on_registry_event('register', 'crear_juego_snake', {
+        'description': 'Crea un juego de snake con pygame',
+        'tags': ['juego'],
+        'enabled': True
+    })
+    assert index.query("juego snake")[0][0] == 'crear_juego_snake'
+
+    index.on_registry_event('disable', 'crear_juego_snake', {'enabled': False})
+    assert 'crear_juego_snake' not in [name for name, _ in index.query("juego snake")]
+
+def test_incremental_updates_match_a_full_rebuild(index):
+    registry = dict(REGISTRY)
+    for i in range(40):
+        info = {'description': f'Función número {i} que calcula cosas', 'tags': [f'grupo{i % 3}'], 'enabled': True}
+        registry[f'funcion_{i}'] = info
+        index.update_function(f'funcion_{i}', info)
+    for i in range(0, 40, 3):
+        del registry[f'funcion_{i}']
+        index.remove_function(f'funcion_{i}')
+    registry['funcion_1'] = {'description': 'Reproduce música', 'enabled': True}
+    index.update_function('funcion_1', registry['funcion_1'])
+
+    rebuilt = FunctionIndex()
+    rebuilt.utterances = {}
+    rebuilt.build(registry)
+    for text in ("número 7 calcula", "reproduce música", "qué hora es", "grupo2"):
+        expected = dict(rebuilt.query(text, k=100))
+        assert dict(index.query(text, k=100)) == pytest.approx(expected, abs=1e-5)
+    assert index.get_stats()['rows'] == rebuilt.get_stats()['rows']
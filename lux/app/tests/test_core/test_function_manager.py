@@ -0,0 +1,89 @@
+import os
+import pytest
+from app import config
+
+CODE = '''
+def {name}() -> str:
+    """{doc}"""
+    return "{result}"
+'''
+
+def _write(path, name, doc="Función de prueba", result="ok", mtime=None):
+    path.write_text(CODE.format(name=name, doc=doc, result=result), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'FUNCTION_WATCH_ENABLED', False)
+    monkeypatch.setattr('app.core.test_manager.get_artifact_cache', lambda: None)
+    from app.core.function_manager import FunctionManager
+    functions_dir = tmp_path / "resources" / "functions"
+    functions_dir.mkdir(parents=True)
+    _write(functions_dir / "saludar.py", "saludar", doc="Saluda al usuario")
+    manager = FunctionManager()
+    manager.log_manager.setup_logging()
+    return manager
+
+def test_local_index_hit_skips_the_llm(manager, monkeypatch):
+    path = manager.manifest.functions_dir / "despedir.py"
+    _write(path, "despedir", doc="Se despide del usuario")
+    manager.reload_files(changed=[path])
+    monkeypatch.setattr(manager, 'route_locally', lambda request: 'despedir')
+    monkeypatch.setattr(manager, '_execute_with_tools', lambda *a, **k: pytest.fail("consultó al LLM"))
+    monkeypatch.setattr(manager, 'analyze_request', lambda *a, **k: pytest.fail("consultó al LLM"))
+    monkeypatch.setattr(manager.ai_service, 'translate_result', lambda result, context: f"{result} | {context}")
+
+    response = manager.execute_function("adiós")
+    assert response.startswith("ok | ")
+    assert "'request': 'adiós'" in response  # la petición original llega a la traducción
+
+def test_new_function_is_tested_outside_the_host(manager, monkeypatch):
+    code = CODE.format(name="despedir", doc="Se despide", result="adiós")
+    monkeypatch.setattr(manager.ai_service, 'generate_code', lambda name, description: code)
+    monkeypatch.setattr(manager.security_analyzer, 'analyze_code', lambda code, name: [])
+    monkeypatch.setattr(manager.ai_service, 'validate_code', lambda code: True)
+    monkeypatch.setattr(manager.ai_service, 'remember_code', lambda *args: None)
+    monkeypatch.setattr(manager.test_manager, 'test_function',
+                        lambda name, code: {'success': True, 'code': code, 'result': "adiós"})
+    monkeypatch.setattr(manager.manifest, 'load', lambda name: pytest.fail("importó la función en el anfitrión"))
+
+    assert manager.create_new_function("NEW - despedir\nSe despide") == "Función despedir creada y probada exitosamente"
+    assert manager.registry.get_function_info('despedir')['description'] == "Se despide"
+
+def test_recreated_function_keeps_its_settings_and_waits_for_dependencies(manager, monkeypatch):
+    code = CODE.format(name="despedir", doc="Se despide", result="adiós")
+    monkeypatch.setattr(manager.ai_service, 'generate_code', lambda name, description: code)
+    monkeypatch.setattr(manager.security_analyzer, 'analyze_code', lambda code, name: [])
+    monkeypatch.setattr(manager.ai_service, 'validate_code', lambda code: True)
+    monkeypatch.setattr(manager.ai_service, 'remember_code', lambda *args: None)
+    monkeypatch.setattr(manager.test_manager, 'test_function',
+                        lambda name, code: {'success': True, 'code': code, 'result': "adiós"})
+    monkeypatch.setattr(manager.dependency_manager, 'analyze_dependencies',
+                        lambda code: {'required': ['pygame'], 'conflicts': []})
+    installs = []
+    monkeypatch.setattr(manager.dependency_manager, 'install_in_background',
+                        lambda deps, on_done, function_name=None: installs.append(on_done))
+    path = manager.manifest.functions_dir / "despedir.py"
+    _write(path, "despedir", doc="Se despide")
+    manager.reload_files(changed=[path])
+    manager.registry.set_timeout('despedir', 90)
+
+    assert manager.create_new_function("NEW - despedir\nSe despide con cariño").startswith("Función despedir creada")
+    info = manager.registry.get_function_info('despedir')
+    assert info['description'] == "Se despide con cariño" and info['timeout'] == 90
+    assert not info['enabled']
+
+    installs[0](True)
+    assert manager.registry.is_function_enabled('despedir')
+
+def test_tool_arguments_do_not_clash_with_executor_options(manager):
+    path = manager.manifest.functions_dir / "programar.py"
+    path.write_text(
+        "def programar(priority: str, timeout: int, on_chunk: str = 'no') -> str:\n"
+        "    return f'{priority}-{timeout}-{on_chunk}'\n", encoding='utf-8')
+    manager.reload_files(changed=[path])
+
+    result = manager._run('programar', args={'priority': 'alta', 'timeout': 5, 'on_chunk': 'si'})
+    assert result['success'] and result['result'] == 'alta-5-si'
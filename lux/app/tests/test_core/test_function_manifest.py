@@ -0,0 +1,79 @@
+import inspect
+import os
+import pytest
+from app.core.function_manifest import FunctionManifest, LazyFunction
+from app.services.ai_service import AIService
+
+SOURCE = '''
+import datetime
+from PyQt6.QtWidgets import QWidget
+
+CARGAS = []
+CARGAS.append(1)
+
+def saludar(nombre: str, veces: int = 1) -> str:
+    """Saluda a una persona"""
+    return " ".join([f"Hola {nombre}"] * veces)
+
+def _privada():
+    pass
+
+class Ventana:
+    def mostrar(self):
+        pass
+'''
+
+@pytest.fixture
+def functions_dir(tmp_path):
+    (tmp_path / "saludar.py").write_text(SOURCE.replace("from PyQt6.QtWidgets import QWidget\n", ""), encoding='utf-8')
+    return tmp_path
+
+def test_manifest_lists_functions_without_importing(functions_dir):
+    manifest = FunctionManifest(functions_dir)
+    functions = manifest.refresh()
+
+    assert list(functions) == ['saludar']
+    saludar = functions['saludar']
+    assert isinstance(saludar, LazyFunction)
+    assert saludar.__doc__ == "Saluda a una persona"
+    assert not manifest.is_loaded('saludar')
+
+    signature = inspect.signature(saludar)
+    assert list(signature.parameters) == ['nombre', 'veces']
+    assert signature.parameters['nombre'].annotation is str
+    assert signature.parameters['veces'].default == 1
+
+    entry = manifest.get_entry('saludar')
+    assert entry['imports'] == ['datetime']
+    assert len(entry['hash']) == 64
+
+def test_function_declarations_from_manifest(tmp_path):
+    (tmp_path / "saludar.py").write_text(SOURCE, encoding='utf-8')
+    functions = FunctionManifest(tmp_path).refresh()
+    parameters = AIService._function_parameters(AIService.__new__(AIService), functions['saludar'])
+    assert parameters['required'] == ['nombre']
+    assert parameters['properties']['veces']['type'] == 'INTEGER'
+
+def test_module_imported_once_until_hash_changes(functions_dir):
+    manifest = FunctionManifest(functions_dir)
+    saludar = manifest.refresh()['saludar']
+
+    assert saludar("Ana") == "Hola Ana"
+    first = manifest.load('saludar')
+    assert manifest.load('saludar') is first
+    assert first.__globals__['CARGAS'] == [1]
+
+    path = functions_dir / "saludar.py"
+    path.write_text(path.read_text(encoding='utf-8').replace("Hola", "Buenas"), encoding='utf-8')
+    os.utime(path, ns=(1, 1))
+
+    assert saludar("Ana") == "Buenas Ana"
+    assert manifest.load('saludar') is not first
+
+def test_manifest_is_persisted_and_reused(functions_dir):
+    FunctionManifest(functions_dir).refresh()
+    assert (functions_dir / "manifest.json").exists()
+
+    manifest = FunctionManifest(functions_dir)
+    assert 'saludar.py' in manifest.files
+    assert list(manifest.refresh()) == ['saludar']
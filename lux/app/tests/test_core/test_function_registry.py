@@ -0,0 +1,90 @@
+import json
+import pytest
+from app.core.function_registry import FunctionRegistry
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "functions" / "registry.db"
+
+def test_metadata_persists_and_stats_are_written_behind(db_path):
+    registry = FunctionRegistry(db_path, flush_interval=0)
+    registry.register('obtener_hora', None, "Obtiene la hora", "obtener_hora.py",
+                      tags=['tiempo', 'reloj'], function_type='utility')
+    registry.update_usage('obtener_hora', 0.5)
+    registry.update_usage('obtener_hora', 1.5)
+    registry.increment_error_count('obtener_hora')
+
+    # Las estadísticas siguen en memoria hasta el volcado
+    assert FunctionRegistry(db_path, flush_interval=0).get_function_stats('obtener_hora')['usage_count'] == 0
+    assert registry.flush() == 1
+    assert registry.flush() == 0
+
+    reloaded = FunctionRegistry(db_path, flush_interval=0)
+    stats = reloaded.get_function_stats('obtener_hora')
+    assert stats['usage_count'] == 2
+    assert stats['average_execution_time'] == pytest.approx(1.0)
+    assert stats['error_count'] == 1
+    assert reloaded.get_function_info('obtener_hora')['tags'] == ['tiempo', 'reloj']
+
+def test_close_flushes_pending_stats(db_path):
+    registry = FunctionRegistry(db_path, flush_interval=60)
+    registry.register('saludar', None, "Saluda")
+    registry.update_usage('saludar', 0.1)
+    registry.close()
+    assert FunctionRegistry(db_path, flush_interval=0).get_function_stats('saludar')['usage_count'] == 1
+
+def test_indexed_queries_and_removal(db_path):
+    registry = FunctionRegistry(db_path, flush_interval=0)
+    registry.register('snake', None, "Juego de snake", tags=['juego'], function_type='game')
+    registry.register('obtener_hora', None, "Hora", tags=['tiempo'])
+    registry.disable_function('obtener_hora')
+
+    assert registry.find_functions(tag='juego') == ['snake']
+    assert registry.find_functions(function_type='utility') == ['obtener_hora']
+    assert registry.find_functions(enabled=True) == ['snake']
+
+    events = []
+    registry.add_listener(lambda event, name, info: events.append((event, name, info)))
+    assert registry.remove_function('snake')
+    assert events == [('remove', 'snake', None)]
+    assert registry.find_functions(tag='juego') == []
+
+def test_json_is_imported_once(db_path):
+    db_path.parent.mkdir(parents=True)
+    legacy = db_path.with_name("registry.json")
+    legacy.write_text(json.dumps({
+        'obtener_hora': {
+            'name': 'obtener_hora', 'description': 'Obtiene la hora', 'file_path': 'obtener_hora.py',
+            'enabled': False, 'usage_count': 7, 'tags': ['tiempo'], 'version': '1.0.0'
+        },
+        'crear_nota': {'path': 'crear_nota.py', 'description': 'Crea una nota', 'type': 'utility', 'extension': '.py'}
+    }), encoding='utf-8')
+
+    registry = FunctionRegistry(db_path, flush_interval=0)
+    info = registry.get_function_info('obtener_hora')
+    assert info['usage_count'] == 7 and info['enabled'] is False
+    assert registry.get_function_info('crear_nota')['file_path'] == 'crear_nota.py'
+    assert registry.get_function_info('crear_nota')['extension'] == '.py'
+    assert not legacy.exists()
+    assert legacy.with_name("registry.json.migrated").exists()
+
+    registry.remove_function('crear_nota')
+    legacy.write_text(json.dumps({'crear_nota': {'description': 'otra vez'}}), encoding='utf-8')
+    assert 'crear_nota' not in FunctionRegistry(db_path, flush_interval=0).list_functions()
+
+def test_register_existing_keeps_stats_and_settings(db_path):
+    registry = FunctionRegistry(db_path, flush_interval=0)
+    registry.register('snake', None, "Juego de snake", "snake.py", tags=['juego'])
+    registry.update_usage('snake', 2.0)
+    registry.set_timeout('snake', 120)
+    registry.set_cache_policy('snake', False)
+
+    registry.register('snake', None, "Snake con niveles")
+    info = registry.get_function_info('snake')
+    assert info['description'] == "Snake con niveles"
+    assert info['file_path'] == "snake.py" and info['tags'] == ['juego']
+    assert info['usage_count'] == 1 and info['timeout'] == 120 and info['cacheable'] is False
+
+    listed = registry.list_functions()
+    registry.register('tetris', None, "Juego de tetris")
+    assert 'tetris' not in listed
@@ -0,0 +1,81 @@
+import os
+import time
+import pytest
+from app import config
+from app.core.function_registry import FunctionRegistry
+from app.core.function_watcher import FunctionWatcher
+
+CODE = '''
+def {name}() -> str:
+    """{doc}"""
+    return "{result}"
+'''
+
+def _write(path, name, doc="Función de prueba", result="ok", mtime=None):
+    path.write_text(CODE.format(name=name, doc=doc, result=result), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+def test_burst_is_debounced(tmp_path):
+    calls = []
+    watcher = FunctionWatcher(tmp_path, lambda changed, removed: calls.append((changed, removed)),
+                              interval=0.01, debounce=0.05)
+    path = tmp_path / "saludar.py"
+    for i in range(3):
+        _write(path, "saludar", result=str(i), mtime=i + 1)
+        assert not watcher.poll()
+    (tmp_path / "notas.txt").write_text("ignorado")
+
+    assert not watcher.poll()  # aún dentro de la ventana de calma
+    time.sleep(0.06)
+    assert watcher.poll()
+    assert calls == [({path}, set())]
+
+def test_created_and_deleted_in_same_burst(tmp_path):
+    calls = []
+    watcher = FunctionWatcher(tmp_path, lambda changed, removed: calls.append((changed, removed)), debounce=0)
+    path = tmp_path / "temporal.py"
+    _write(path, "temporal")
+    watcher.poll()
+    path.unlink()
+    watcher.poll()
+    watcher.poll()
+    assert calls == [(set(), {path})]
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'FUNCTION_WATCH_ENABLED', False)
+    monkeypatch.setattr('app.core.test_manager.get_artifact_cache', lambda: None)
+    from app.core.function_manager import FunctionManager
+    functions_dir = tmp_path / "resources" / "functions"
+    functions_dir.mkdir(parents=True)
+    _write(functions_dir / "saludar.py", "saludar", doc="Saluda al usuario")
+    return FunctionManager()
+
+def test_reload_updates_functions_registry_and_index(manager):
+    functions_dir = manager.manifest.functions_dir
+    path = functions_dir / "contar_chiste.py"
+    _write(path, "contar_chiste", doc="Cuenta un chiste corto")
+
+    summary = manager.reload_files(changed=[path])
+    assert summary['added'] == ['contar_chiste']
+    assert 'contar_chiste' in manager.functions
+    assert manager.registry.get_function_info('contar_chiste')['description'] == "Cuenta un chiste corto"
+    assert manager.function_index.query("chiste corto")[0][0] == 'contar_chiste'
+
+    _write(path, "contar_chiste", doc="Cuenta un chiste largo", result="ja", mtime=1)
+    summary = manager.reload_files(changed=[path])
+    assert summary['updated'] == ['contar_chiste']
+    assert manager.registry.get_function_info('contar_chiste')['description'] == "Cuenta un chiste largo"
+    assert manager.safe_executor.execute(manager.functions['contar_chiste'])['result'] == "ja"
+
+def test_delete_function_updates_registry_file(manager):
+    manager.reload_files(changed=[manager.manifest.functions_dir / "saludar.py"])
+    assert manager.delete_function('saludar')
+
+    assert 'saludar' not in manager.functions
+    assert not (manager.manifest.functions_dir / "saludar.py").exists()
+    manager.registry.close()
+    assert 'saludar' not in FunctionRegistry(manager.registry.db_path).list_functions()
+    assert 'saludar' not in [name for name, _ in manager.function_index.query("saluda al usuario")]
@@ -0,0 +1,72 @@
+import gc
+import json
+import os
+import weakref
+import pytest
+from app.core.json_store import JsonStore
+from app.core.permission_manager import PermissionManager
+
+def test_writes_are_coalesced_and_atomic(tmp_path):
+    path = tmp_path / "permissions.json"
+    store = JsonStore(path, write_delay=60)
+    for i in range(50):
+        store.set(f"funcion_{i}", ["gui_access"])
+    assert not path.exists()  # agrupadas hasta flush
+
+    assert store.flush()
+    assert len(json.loads(path.read_text())) == 50
+    assert not store.flush()
+    assert [p.name for p in tmp_path.iterdir()] == ["permissions.json"]
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "dependencies.json"
+    store = JsonStore(path, write_delay=0)
+    store.set("juego", {"versions": {"pygame": "2.5.0"}})
+
+    def crash(*args, **kwargs):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(os, "replace", crash)
+    store.set("otro", {"versions": {}})
+    monkeypatch.undo()
+
+    assert json.loads(path.read_text()) == {"juego": {"versions": {"pygame": "2.5.0"}}}
+    assert [p.name for p in tmp_path.iterdir()] == ["dependencies.json"]
+
+def test_external_edits_are_picked_up_by_mtime(tmp_path):
+    path = tmp_path / "permissions.json"
+    store = JsonStore(path, write_delay=0)
+    store.set("a", ["file_read"])
+    assert store.get("a") == ["file_read"]
+
+    path.write_text(json.dumps({"a": ["file_read", "network_access"], "b": []}))
+    os.utime(path, ns=(1, 1))
+    assert store.get("a") == ["file_read", "network_access"]
+    assert "b" in store
+
+@pytest.fixture
+def permissions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "resources").mkdir()
+    return PermissionManager()
+
+def test_permission_manager_uses_store(permissions):
+    assert permissions.grant_permissions("juego", ["gui_access", "file_read"])
+    assert permissions.check_permissions("juego", ["gui_access"])
+    permissions.revoke_permissions("juego", ["gui_access"])
+    assert not permissions.check_permissions("juego", ["gui_access"])
+    assert [p.name for p in permissions.get_function_permissions("juego")] == ["file_read"]
+    permissions.revoke_permissions("juego")
+    assert not permissions.check_permissions("juego", [])
+
+def test_write_keeps_file_mode_and_store_is_collectable(tmp_path):
+    path = tmp_path / "dependencies.json"
+    path.write_text("{}")
+    os.chmod(path, 0o640)
+    store = JsonStore(path, write_delay=0)
+    store.set("juego", {})
+    assert path.stat().st_mode & 0o777 == 0o640
+
+    reference = weakref.ref(store)
+    del store
+    gc.collect()
+    assert reference() is None
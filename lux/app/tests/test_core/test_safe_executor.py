@@ -0,0 +1,179 @@
+import os
+import pstats
+import sys
+import threading
+import time
+import pytest
+from app.core.function_manifest import FunctionManifest
+from app.core.profiler import save_profile
+from app.core.safe_executor import SafeExecutor
+
+SOURCE = '''
+import os
+import time
+
+def saludar(nombre: str) -> str:
+    """Saluda"""
+    return f"Hola {nombre} desde {os.getpid()}"
+
+def dormir() -> str:
+    """Tarda demasiado"""
+    time.sleep(30)
+    return "tarde"
+
+def cambiar_directorio() -> str:
+    """Cambia el directorio de trabajo"""
+    os.chdir("/")
+    return os.getcwd()
+
+def fallar() -> str:
+    """Lanza una excepción"""
+    raise ValueError("fallo controlado")
+
+async def esperar(segundos: float = 0.2) -> str:
+    """Espera sin bloquear"""
+    import asyncio
+    await asyncio.sleep(segundos)
+    return "listo"
+
+def calcular() -> int:
+    """Tarda en CPU"""
+    def sumar_cuadrados(n):
+        return sum(i * i for i in range(n))
+    inicio = time.perf_counter()
+    total = 0
+    while time.perf_counter() - inicio < 0.2:
+        total += sumar_cuadrados(10000)
+    return total
+
+def informar(pasos: int = 3):
+    """Entrega cada paso en cuanto termina"""
+    for paso in range(1, pasos + 1):
+        time.sleep(0.1)
+        yield f"Paso {paso} listo."
+'''
+
+@pytest.fixture
+def functions(tmp_path):
+    (tmp_path / "ejemplos.py").write_text(SOURCE, encoding='utf-8')
+    return FunctionManifest(tmp_path).refresh()
+
+@pytest.fixture
+def executor():
+    executor = SafeExecutor(max_time=2, workers=1, mode='process')
+    yield executor
+    executor.shutdown()
+
+def test_runs_in_worker_with_measured_metrics(executor, functions):
+    result = executor.execute(functions['saludar'], "Ana")
+
+    assert result['success'], result
+    assert result['result'].startswith("Hola Ana desde ")
+    assert int(result['result'].rsplit(' ', 1)[1]) != os.getpid()
+    assert 0 < result['execution_time'] < 2
+    assert result['cpu_time'] >= 0
+    assert result['memory_used'] > 0
+
+def test_worker_state_does_not_leak_into_host(executor, functions):
+    cwd = os.getcwd()
+    assert executor.execute(functions['cambiar_directorio'])['result'] == "/"
+    assert os.getcwd() == cwd
+
+    result = executor.execute(functions['fallar'])
+    assert not result['success']
+    assert result['type'] == 'runtime'
+    assert "fallo controlado" in result['error']
+
+def test_timeout_kills_and_respawns_worker(executor, functions):
+    result = executor.execute(functions['dormir'])
+    assert result['type'] == 'timeout'
+    assert result['execution_time'] < 3
+
+    assert executor.execute(functions['saludar'], "Luis")['success']
+
+def test_waiting_for_a_worker_counts_against_the_deadline(executor, functions):
+    busy = threading.Thread(target=executor.execute, args=(functions['dormir'],), kwargs={'timeout': 0.6})
+    busy.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    result = executor.execute(functions['dormir'], timeout=1.0)
+    elapsed = time.perf_counter() - start
+    busy.join()
+
+    assert result['type'] == 'timeout'
+    assert elapsed < 1.3  # no 1 s de espera más 1 s de ejecución
+
+def test_unpicklable_functions_run_in_thread(executor):
+    prefix = "cierre"
+    result = executor.execute(lambda: f"{prefix} ok")
+    assert result == {'success': True, 'result': "cierre ok", 'execution_time': result['execution_time'],
+                      'cpu_time': result['cpu_time'], 'memory_used': 0}
+
+def test_async_functions_share_the_loop_and_time_out(executor, functions):
+    assert functions['esperar'].is_async and not functions['saludar'].is_async
+
+    start = time.perf_counter()
+    pending = [executor.execute_async(functions['esperar']) for _ in range(10)]
+    results = [future.result(timeout=5) for future in pending]
+    assert all(result['result'] == "listo" for result in results)
+    assert time.perf_counter() - start < 1  # 10 x 0.2 s en un solo hilo
+
+    result = executor.execute(functions['esperar'], 10)
+    assert result['type'] == 'timeout'
+    assert result['execution_time'] < 3
+
+def test_generator_chunks_arrive_before_the_function_ends(executor, functions):
+    assert functions['informar'].is_generator and not functions['saludar'].is_generator
+
+    start = time.perf_counter()
+    arrivals = []
+    result = executor.execute(functions['informar'], on_chunk=lambda chunk: arrivals.append(
+        (chunk, time.perf_counter() - start)))
+    finished = time.perf_counter() - start
+
+    assert result['success'], result
+    assert result['result'] == "Paso 1 listo.\nPaso 2 listo.\nPaso 3 listo."
+    assert [chunk for chunk, _ in arrivals] == ["Paso 1 listo.", "Paso 2 listo.", "Paso 3 listo."]
+    # Quedaban dos pasos de 0.1 s cuando llegó el primero (sin depender del arranque del trabajador)
+    assert finished - arrivals[0][1] > 0.15
+
+def test_site_dir_is_isolated_per_worker(executor, tmp_path):
+    site = tmp_path / "entorno"
+    site.mkdir()
+    (site / "paquete_aislado.py").write_text("VALOR = 'aislado'\n")
+    source = tmp_path / "funciones"
+    source.mkdir()
+    (source / "usar.py").write_text(
+        "def usar() -> str:\n"
+        "    try:\n"
+        "        import paquete_aislado\n"
+        "        return paquete_aislado.VALOR\n"
+        "    except ImportError:\n"
+        "        return 'ausente'\n"
+    )
+    usar = FunctionManifest(source).refresh()['usar']
+
+    assert executor.execute(usar, site_dir=str(site))['result'] == "aislado"
+    assert executor.execute(usar)['result'] == "ausente"  # trabajador reciclado
+    assert str(site) not in sys.path
+
+def test_isolated_environment_never_reaches_host_sys_path(executor, functions, tmp_path):
+    site = str(tmp_path / "entorno")
+    for result in (executor.execute(functions['esperar'], site_dir=site),
+                   executor.execute(lambda: "hilo", site_dir=site)):
+        assert not result['success'] and result['type'] == 'runtime'
+    assert site not in sys.path
+
+def test_profiled_execution_exports_pstats_and_collapsed_stacks(executor, functions, tmp_path):
+    result = executor.execute(functions['calcular'], profile=True)
+    assert result['success'], result
+    assert 'profile' not in executor.execute(functions['saludar'], "Eva")
+
+    saved = save_profile('calcular', result['profile'], tmp_path)
+    assert any(frame['function'] in ('sumar_cuadrados', '<genexpr>') for frame in saved['top'])
+    assert saved['samples'] > 0
+    stacks = open(saved['collapsed']).read().splitlines()
+    assert all(line.startswith("call (safe_executor.py:") or line.startswith("calcular (")
+               for line in stacks)
+    assert any("sumar_cuadrados" in line for line in stacks)
+    assert pstats.Stats(saved['pstats']).total_calls > 0
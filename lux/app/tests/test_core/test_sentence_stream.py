@@ -0,0 +1,14 @@
+from app.core.speech.sentence_stream import SentenceSegmenter
+
+def test_emits_sentences_as_they_complete():
+    segmenter = SentenceSegmenter(min_chars=5)
+
+    assert segmenter.feed("Hola, soy Lux. Hoy ") == ["Hola, soy Lux."]
+    assert segmenter.feed("hace sol! Y mañana") == ["Hoy hace sol!"]
+    assert segmenter.flush() == ["Y mañana"]
+
+def test_short_sentences_are_merged():
+    segmenter = SentenceSegmenter(min_chars=20)
+
+    assert segmenter.feed("Sí. Claro que puedo ayudarte. ") == ["Sí. Claro que puedo ayudarte."]
+    assert segmenter.flush() == []
@@ -0,0 +1,111 @@
+import os
+import time
+from unittest.mock import MagicMock
+import pytest
+from app.core.metrics import metrics
+from app.core.test_manager import TestManager
+
+BROKEN = "def saludar():\n    return 42\n"
+
+def _valid(message, delay=0):
+    return (
+        "```python\n"
+        "import time\n"
+        "def saludar():\n"
+        "    '''Saluda'''\n"
+        "    try:\n"
+        f"        time.sleep({delay})\n"
+        f"        return '{message}'\n"
+        "    except Exception as e:\n"
+        "        return str(e)\n"
+        "```"
+    )
+
+@pytest.fixture
+def ai_service():
+    service = MagicMock()
+    service.available_models.return_value = ['lento', 'rapido']
+    return service
+
+@pytest.fixture(autouse=True)
+def no_artifact_cache(monkeypatch):
+    monkeypatch.setattr('app.core.test_manager.get_artifact_cache', lambda: None)
+
+def test_valid_code_is_not_repaired(ai_service):
+    manager = TestManager(ai_service)
+    result = manager.test_function('saludar', _valid('hola').strip('`').replace('python\n', '', 1))
+
+    assert result['success']
+    ai_service.chat_with_model.assert_not_called()
+
+def test_parallel_repair_takes_first_passing_candidate(ai_service):
+    def chat_with_model(prompt, model='auto', **kwargs):
+        if model == 'lento':
+            time.sleep(0.5)
+            return _valid('lento')
+        return _valid('rapido')
+
+    ai_service.chat_with_model.side_effect = chat_with_model
+    manager = TestManager(ai_service)
+    manager.repair_mode = 'parallel'
+    manager.repair_candidates = 2
+
+    start = time.perf_counter()
+    result = manager.test_function('saludar', BROKEN)
+
+    assert result['success']
+    assert result['result'] == 'rapido'
+    assert time.perf_counter() - start < 0.4
+
+def test_sequential_repair_stops_after_max_attempts(ai_service):
+    ai_service.chat_with_model.return_value = BROKEN
+    manager = TestManager(ai_service)
+    manager.repair_mode = 'sequential'
+
+    result = manager.test_function('saludar', BROKEN)
+
+    assert not result['success']
+    assert ai_service.chat_with_model.call_count == manager.max_repair_attempts
+
+def test_candidate_is_not_imported_in_the_host(ai_service, monkeypatch):
+    monkeypatch.delenv('LUX_CANDIDATO', raising=False)
+    code = "import os\nos.environ['LUX_CANDIDATO'] = 'importado'\n" + _valid('hola').strip('`').replace('python\n', '', 1)
+    manager = TestManager(ai_service)
+
+    result = manager.test_function('saludar', code)
+
+    assert result['success'], result
+    assert 'LUX_CANDIDATO' not in os.environ
+
+def test_parallel_repair_kills_the_losing_candidate(ai_service):
+    metrics.reset()
+    ai_service.chat_with_model.side_effect = lambda prompt, model='auto', **kwargs: (
+        _valid('lento', delay=5) if model == 'lento' else _valid('rapido', delay=0.3))
+    manager = TestManager(ai_service)
+    manager.repair_mode = 'parallel'
+    manager.repair_candidates = 2
+
+    start = time.perf_counter()
+    result = manager.test_function('saludar', BROKEN)
+
+    assert result['result'] == 'rapido'
+    deadline = time.perf_counter() + 2
+    while not metrics.get_counter('executor.cancelled') and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert metrics.get_counter('executor.cancelled') == 1
+    assert time.perf_counter() - start < 3  # el perdedor no llega a sus 5 s
+
+def test_generator_candidate_without_scheduler(ai_service):
+    code = (
+        "def informar():\n"
+        "    '''Informa por pasos'''\n"
+        "    try:\n"
+        "        yield 'Paso 1.'\n"
+        "        yield 'Paso 2.'\n"
+        "    except Exception as e:\n"
+        "        yield str(e)\n"
+    )
+    result = TestManager(ai_service).test_function('informar', code)
+
+    assert result['success'], result
+    assert result['result'] == "Paso 1.\nPaso 2."
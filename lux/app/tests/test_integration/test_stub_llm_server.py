@@ -0,0 +1,57 @@
+import pytest
+import requests
+from app.benchmarks.stub_llm_server import StubLLMServer, LatencyModel
+from app.benchmarks.pipeline_benchmark import check_regressions
+
+@pytest.fixture
+def server():
+    script = [
+        {"pattern": r"hora", "function_call": {"name": "obtener_hora", "args": {}}},
+        {"pattern": r"crea (\w+)", "response": "def \\1(): pass"},
+        {"pattern": r"", "response": "Hola. Soy el servidor de pruebas."}
+    ]
+    with StubLLMServer(script=script, chunk_words=2) as server:
+        yield server
+
+def test_openrouter_format(server):
+    response = requests.post(server.openrouter_url, json={
+        "model": "openai/gpt-4-turbo",
+        "messages": [{"role": "system", "content": "sistema"}, {"role": "user", "content": "crea sumar"}]
+    })
+    assert response.json()['choices'][0]['message']['content'] == "def sumar(): pass"
+
+def test_openrouter_streaming(server):
+    response = requests.post(server.openrouter_url, stream=True, json={
+        "model": "x", "stream": True, "messages": [{"role": "user", "content": "hola"}]
+    })
+    lines = [line for line in response.iter_lines(decode_unicode=True) if line]
+    assert lines[-1] == "data: [DONE]"
+    assert len(lines) == 4
+
+def test_gemini_function_call_requires_declaration(server):
+    url = f"{server.gemini_url}/models/gemini-pro:generateContent"
+    contents = [{"role": "user", "parts": [{"text": "qué hora es"}]}]
+
+    with_tools = requests.post(url, json={
+        "contents": contents, "tools": [{"function_declarations": [{"name": "obtener_hora"}]}]
+    }).json()
+    without_tools = requests.post(url, json={"contents": contents}).json()
+
+    assert with_tools['candidates'][0]['content']['parts'][0]['functionCall']['name'] == 'obtener_hora'
+    assert without_tools['candidates'][0]['content']['parts'][0]['text'].startswith("Hola")
+    assert len(server.requests) == 2
+
+def test_latency_model_is_deterministic():
+    first = [LatencyModel('lognormal', 0.1, 0.05, seed=7).sample() for _ in range(3)]
+    second = [LatencyModel('lognormal', 0.1, 0.05, seed=7).sample() for _ in range(3)]
+    assert first == second
+    assert all(value >= 0 for value in first)
+
+def test_check_regressions():
+    report = {'chat': {'p95': 0.2, 'errors': 0}, 'execute_function': {'p95': 0.1, 'errors': 1}}
+    baseline = {'chat': {'p95': 0.1}}
+
+    problems = check_regressions(report, baseline, tolerance=0.5, max_p95={'execute_function': 0.5})
+
+    assert len(problems) == 2
+    assert problems[0].startswith('chat')
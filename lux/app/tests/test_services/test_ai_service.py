@@ -1,9 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from app.services.ai_service import AIService
+from app.services.cache_service import ArtifactCache
 
 @pytest.fixture
-def ai_service():
+def ai_service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # caché de respuestas en resources/cache relativo
     return AIService()
 
 def test_chat_with_gemini(ai_service):
@@ -16,7 +18,7 @@ def test_chat_with_gemini(ai_service):
         assert response == "Respuesta de prueba"
 
 def test_code_assistance(ai_service):
-    with patch('requests.post') as mock_post:
+    with patch.object(ai_service.http, 'post') as mock_post:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -58,4 +60,134 @@ def test_generate_task_suggestions(ai_service):
         assert isinstance(suggestions, list)
 
 def test_rate_limit_check(ai_service):
-    assert ai_service.rate_limit_check() == True 
\ No newline at end of file
+    assert ai_service.rate_limit_check() == True
+    bucket = ai_service.router.buckets[ai_service.router.providers['gemini']]
+    available = bucket.available()
+    assert ai_service.rate_limit_check('gemini')
+    assert bucket.available() == pytest.approx(available, abs=0.01)  # consultar no gasta tokens
+    assert ai_service.rate_limit_check('gemini', consume=True)
+    assert bucket.available() < available
+
+
+def test_build_function_declarations(ai_service):
+    def abrir_aplicacion(nombre: str) -> str:
+        return nombre
+
+    registry = {
+        'abrir_aplicacion': {'description': 'Abre una\n    aplicación', 'enabled': True},
+        'obtener_info_geolocalización': {'description': 'Ubicación actual', 'enabled': True},
+        'deshabilitada': {'description': 'No se declara', 'enabled': False},
+    }
+    functions = {
+        'abrir_aplicacion': abrir_aplicacion,
+        'obtener_info_geolocalización': lambda: "España",
+        'deshabilitada': lambda: "",
+    }
+
+    declarations, name_map = ai_service.build_function_declarations(registry, functions)
+    names = [d['name'] for d in declarations]
+
+    assert 'deshabilitada' not in names
+    assert name_map['obtener_info_geolocalizacion'] == 'obtener_info_geolocalización'
+    assert ai_service.NEW_FUNCTION_TOOL in names
+    abrir = declarations[names.index('abrir_aplicacion')]
+    assert abrir['description'] == 'Abre una aplicación'
+    assert abrir['parameters']['required'] == ['nombre']
+
+def test_run_with_tools_single_exchange(ai_service):
+    call_response = MagicMock(status_code=200)
+    call_response.json.return_value = {"candidates": [{"content": {"role": "model", "parts": [
+        {"functionCall": {"name": "obtener_hora", "args": {}}}
+    ]}}]}
+    final_response = MagicMock(status_code=200)
+    final_response.json.return_value = {"candidates": [{"content": {"role": "model", "parts": [
+        {"text": "Son las 10:00, ¿algo más?"}
+    ]}}]}
+
+    with patch.object(ai_service.http, 'post', side_effect=[call_response, final_response]) as mock_post:
+        dispatcher = MagicMock(return_value="Son las 10:00")
+        result = ai_service.run_with_tools("qué hora es", [{"name": "obtener_hora"}], dispatcher)
+
+    dispatcher.assert_called_once_with("obtener_hora", {})
+    assert mock_post.call_count == 2
+    assert result['function'] == "obtener_hora"
+    assert result['text'] == "Son las 10:00, ¿algo más?"
+
+def test_run_with_tools_api_error_falls_back(ai_service):
+    with patch.object(ai_service.http, 'post', return_value=MagicMock(status_code=500, text="error")):
+        assert ai_service.run_with_tools("hola", [], MagicMock()) is None
+
+def test_format_function_list_respects_token_budget(ai_service):
+    registry = {
+        f"funcion_{i}": {'description': "Descripción larga\n    Args:\n        x: valor\n" * 5}
+        for i in range(5000)
+    }
+
+    functions_list = ai_service.format_function_list(registry, token_budget=100)
+
+    assert ai_service.estimate_tokens(functions_list) <= 100
+    assert "Args:" not in functions_list
+    assert functions_list.startswith("- funcion_0: Descripción larga")
+
+def test_stream_chat_openrouter_sse(ai_service):
+    model_key = next(key for key in ai_service.models if key != 'gemini')
+    with patch.object(ai_service.http, 'post') as mock_post:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.__enter__.return_value = mock_response
+        mock_response.iter_lines.return_value = [
+            'data: {"choices": [{"delta": {"content": "Hola, "}}]}',
+            '',
+            'data: {"choices": [{"delta": {"content": "¿qué tal?"}}]}',
+            'data: [DONE]'
+        ]
+        mock_post.return_value = mock_response
+
+        chunks = list(ai_service.stream_chat("Saluda", model=model_key, use_cache=False))
+
+    assert chunks == ["Hola, ", "¿qué tal?"]
+    assert mock_post.call_args.kwargs['json']['stream'] is True
+
+def test_stream_chat_does_not_cache_interrupted_reply(ai_service):
+    model_key = next(key for key in ai_service.models if key != 'gemini')
+    def cut_stream(*args):
+        yield "Hola, "
+        raise ConnectionError("conexión cortada")
+    ai_service.response_cache = MagicMock(**{'get_response.return_value': None})
+    with patch.object(ai_service, '_stream_openrouter', cut_stream):
+        chunks = list(ai_service.stream_chat("Saluda", model=model_key))
+
+    assert chunks == ["Hola, "]
+    ai_service.response_cache.put_response.assert_not_called()
+
+def test_unknown_model_error_is_not_cached(ai_service):
+    assert ai_service.chat_with_model("Hola", model="inexistente") is None
+    assert ai_service.response_cache.get_response("Hola", "inexistente") is None
+
+def test_auto_replies_are_cached_under_the_serving_model(ai_service):
+    model_key = next(key for key in ai_service.models if key != 'gemini')
+    with patch.object(ai_service.router, 'call', return_value=(model_key, "Respuesta")), \
+            patch.object(ai_service.router, 'choose', return_value=model_key):
+        assert ai_service.chat_with_model("Hola") == "Respuesta"
+        assert ai_service.chat_with_model("Hola") == "Respuesta"
+        assert ai_service.router.call.call_count == 1
+    assert ai_service.response_cache.get_response("Hola", model_key) == "Respuesta"
+    assert ai_service.response_cache.get_response("Hola", 'auto') is None
+
+def test_generated_code_is_reused_only_after_acceptance(ai_service, tmp_path):
+    ai_service.artifact_cache = ArtifactCache(tmp_path / "artifacts.db")
+    with patch.object(ai_service, 'chat_with_model', return_value="def sumar():\n    return 'x'") as llm:
+        code = ai_service.generate_code("sumar", "Suma dos números")
+        assert ai_service.generate_code("sumar", "Suma dos números") == code
+        assert llm.call_count == 2  # sin aceptar, cada intento vuelve a generar
+
+        ai_service.remember_code("sumar", "Suma dos números", code)
+        assert ai_service.generate_code("sumar", "Suma dos números") == code
+        assert llm.call_count == 2
+
+def test_run_with_tools_goes_through_the_router(ai_service):
+    for _ in range(ai_service.router.breakers['gemini'].threshold):
+        ai_service.router.record('gemini', 0.1, False)
+    with patch.object(ai_service.http, 'post') as mock_post:
+        assert ai_service.run_with_tools("hola", [], MagicMock()) is None
+    mock_post.assert_not_called()  # cortacircuitos abierto: ni siquiera se intenta
@@ -0,0 +1,78 @@
+import time
+import pytest
+from app.core.metrics import metrics
+from app.services.cache_service import SQLiteCache, ResponseCache, ArtifactCache, ResultCache
+
+@pytest.fixture
+def response_cache(tmp_path):
+    metrics.reset()
+    cache = ResponseCache(tmp_path / "responses.db", ttl=60, similarity_threshold=0.6)
+    yield cache
+    cache.close()
+
+def test_exact_hit_after_normalization(response_cache):
+    response_cache.put_response("¿Cómo estás?", "gemini", "¡Muy bien!", latency=1.5)
+
+    assert response_cache.get_response("como estas", "gemini") == "¡Muy bien!"
+    assert response_cache.get_response("como estas", "deepseek") is None
+    assert response_cache.get_response("como estas", "gemini", system_prompt="otro") is None
+
+    stats = response_cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['saved_seconds'] > 1.0
+
+def test_similar_rephrasing_hits(response_cache):
+    response_cache.put_response("qué puedes hacer", "gemini", "Muchas cosas")
+    assert response_cache.get_response("qué puedes hacer tú", "gemini") == "Muchas cosas"
+
+def test_ttl_expiration(tmp_path):
+    cache = SQLiteCache(tmp_path / "ttl.db", ttl=0.05)
+    cache.set("clave", "valor")
+    assert cache.get("clave") == "valor"
+    time.sleep(0.1)
+    assert cache.get("clave") is None
+
+def test_lru_eviction_respects_byte_cap(tmp_path):
+    cache = SQLiteCache(tmp_path / "lru.db", max_bytes=350)
+    for i in range(3):
+        cache.set(f"k{i}", "x" * 100)
+        time.sleep(0.01)
+    cache.get("k0")  # k0 pasa a ser la más reciente
+    cache.set("k3", "x" * 100)
+
+    assert cache.get_stats()['bytes'] <= 350
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+
+def test_artifact_cache_generation_and_verdicts(tmp_path):
+    cache = ArtifactCache(tmp_path / "artifacts.db")
+
+    cache.put_generation("GENERA sumar", "auto", "def sumar(): pass")
+    assert cache.get_generation("GENERA sumar", "auto") == "def sumar(): pass"
+    assert cache.get_generation("GENERA sumar", "gpt4") is None
+
+    cache.put_verdict('security', "def sumar(): pass", [["import", "Import prohibido", 1]], version="v1")
+    assert cache.get_verdict('security', "def sumar(): pass", version="v1") == [["import", "Import prohibido", 1]]
+    assert cache.get_verdict('security', "def sumar(): pass", version="v2") is None
+    assert cache.get_verdict('security', "def restar(): pass", version="v1") is None
+    cache.close()
+
+def test_result_cache_keys_on_code_and_arguments(tmp_path):
+    cache = ResultCache(tmp_path / "results.db")
+
+    cache.put_result("saludar", "hash1", {"nombre": "Ana", "formal": False}, "Hola Ana", ttl=60)
+    assert cache.get_result("saludar", "hash1", {"formal": False, "nombre": "Ana"}) == "Hola Ana"
+    assert cache.get_result("saludar", "hash1", {"nombre": "Luis", "formal": False}) is None
+    assert cache.get_result("saludar", "hash2", {"nombre": "Ana", "formal": False}) is None
+
+    cache.put_translation("saludar", "hash1", "Hola Ana", "Saluda a Ana", "¡Hola, Ana!", ttl=60)
+    assert cache.get_translation("saludar", "hash1", "Hola Ana", "  saluda a ana ") == "¡Hola, Ana!"
+
+    cache.put_result("efimera", "h", None, "x", ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get_result("efimera", "h") is None
+
+    cache.invalidate("saludar")
+    assert cache.get_result("saludar", "hash1", {"nombre": "Ana", "formal": False}) is None
+    cache.close()
@@ -0,0 +1,59 @@
+from unittest.mock import patch, MagicMock
+import pytest
+import requests
+from app.core.metrics import metrics
+from app.services.http_transport import HTTPTransport
+
+@pytest.fixture
+def transport():
+    metrics.reset()
+    transport = HTTPTransport(retries=2, backoff=0.001)
+    yield transport
+    transport.close()
+
+def _response(status):
+    response = MagicMock(status_code=status)
+    response.headers = {}
+    return response
+
+def test_retries_on_retryable_status(transport):
+    with patch.object(transport.session, 'request',
+                      side_effect=[_response(503), _response(200)]) as mock_request:
+        response = transport.post("https://api.example.com/v1", json={})
+
+    assert response.status_code == 200
+    assert mock_request.call_count == 2
+    assert metrics.get_counter('http.retries.api.example.com') == 1
+
+def test_post_not_retried_once_the_server_may_have_processed_it(transport):
+    with patch.object(transport.session, 'request', side_effect=requests.ReadTimeout("lento")) as mock_request:
+        with pytest.raises(requests.ReadTimeout):
+            transport.post("https://api.example.com/v1", json={})
+    assert mock_request.call_count == 1
+
+    with patch.object(transport.session, 'request', side_effect=[_response(500), _response(200)]) as mock_request:
+        assert transport.post("https://api.example.com/v1", json={}).status_code == 500
+    assert mock_request.call_count == 1
+
+    with patch.object(transport.session, 'request',
+                      side_effect=[requests.ConnectTimeout("sin conexión"), _response(200)]) as mock_request:
+        assert transport.post("https://api.example.com/v1", json={}).status_code == 200
+    assert mock_request.call_count == 2
+
+def test_default_timeout_applied(transport):
+    with patch.object(transport.session, 'request', return_value=_response(200)) as mock_request:
+        transport.get("https://api.example.com/")
+    assert mock_request.call_args.kwargs['timeout'] == transport.timeout
+
+def test_connection_error_raised_after_retries(transport):
+    with patch.object(transport.session, 'request', side_effect=requests.ConnectionError("down")):
+        with pytest.raises(requests.ConnectionError):
+            transport.get("https://caido.example.com/")
+    assert metrics.get_counter('http.errors.caido.example.com') == 3
+
+def test_host_stats(transport):
+    with patch.object(transport.session, 'request', return_value=_response(200)):
+        transport.get("https://api.example.com/")
+    stats = transport.get_host_stats()
+    assert stats['api.example.com']['count'] == 1
+    assert stats['api.example.com']['requests'] == 1
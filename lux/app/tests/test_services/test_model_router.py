@@ -0,0 +1,92 @@
+import time
+import pytest
+from app.core.metrics import metrics
+from app.services.model_router import ModelRouter, TokenBucket, CircuitBreaker
+
+PROVIDERS = {'rapido': 'google', 'lento': 'openrouter'}
+
+@pytest.fixture
+def router():
+    metrics.reset()
+    router = ModelRouter(
+        providers=PROVIDERS,
+        routes={'chat': ['lento', 'rapido'], 'codegen': ['lento', 'rapido']},
+        hedge_classes=['chat'],
+        hedge_delay=0.05,
+        min_hedge_delay=0.01,
+        min_samples=2,
+        breaker_threshold=2,
+        breaker_cooldown=60
+    )
+    yield router
+    router.shutdown()
+
+def test_prefers_fastest_measured_model(router):
+    for _ in range(3):
+        router.record('lento', 1.0, True)
+        router.record('rapido', 0.1, True)
+    assert router.candidates('chat') == ['rapido', 'lento']
+
+def test_falls_back_when_model_fails(router):
+    def fn(model, timeout):
+        return None if model == 'lento' else f"respuesta de {model}"
+
+    assert router.call('codegen', fn) == ('rapido', "respuesta de rapido")
+    assert router.error_rate('lento') == 1.0
+
+def test_hedged_request_wins(router):
+    def fn(model, timeout):
+        if model == 'lento':
+            time.sleep(0.5)
+        return model
+
+    start = time.perf_counter()
+    model, result = router.call('chat', fn)
+
+    assert model == 'rapido'
+    assert time.perf_counter() - start < 0.4
+    assert metrics.get_counter('router.hedges.chat') == 1
+
+def test_circuit_breaker_ejects_failing_model(router):
+    router.record('lento', 0.1, False)
+    router.record('lento', 0.1, False)
+
+    assert router.breakers['lento'].state == CircuitBreaker.OPEN
+    assert router.candidates('chat') == ['rapido']
+
+def test_token_bucket_limits_provider():
+    bucket = TokenBucket(rate=0.001, capacity=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+def test_token_bucket_waits_a_bounded_time():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.01)  # faltan 50 ms
+    start = time.perf_counter()
+    assert bucket.acquire(timeout=0.2)
+    assert 0.02 < time.perf_counter() - start < 0.2
+
+def test_hedged_attempts_get_their_own_timeout(router):
+    for _ in range(3):
+        router.record('lento', 0.2, True)
+        router.record('rapido', 0.1, True)
+    router.min_attempt_timeout = 0.01
+    timeouts = {}
+    def fn(model, timeout):
+        timeouts[model] = timeout
+        return model
+
+    assert router.call('chat', fn) == ('rapido', 'rapido')
+    assert timeouts['rapido'] == pytest.approx(0.3)  # p99 x 3 en la clase con cobertura
+    router.call('codegen', fn)
+    assert timeouts['rapido'] is None  # sin cobertura, el del transporte
+
+def test_rate_limited_model_is_skipped(router):
+    router.buckets['openrouter'] = TokenBucket(rate=0.001, capacity=1)
+
+    assert router.rate_limit_check('lento')
+    assert not router.rate_limit_check('lento')
+    assert router.candidates('chat') == ['rapido']
+    assert router.rate_limit_check()
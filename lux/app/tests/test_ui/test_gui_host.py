@@ -0,0 +1,62 @@
+import threading
+import time
+import pytest
+pytest.importorskip("PyQt6.QtWidgets")
+from app.core.function_manifest import FunctionManifest
+from app.core.gui_host import GuiHost
+
+# Plantilla antigua: QApplication propia y app.exec() bloqueante
+TEMPLATE = '''
+from PyQt6.QtWidgets import QApplication, QMainWindow
+import sys
+
+def {name}() -> str:
+    """Ventana de prueba"""
+    class MainWindow(QMainWindow):
+        def __init__(self):
+            super().__init__()
+            self.setWindowTitle("{name}")
+            self.show()
+
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    {extra}
+    app.exec()
+    return "cerrada"
+'''
+
+@pytest.fixture
+def functions(tmp_path):
+    (tmp_path / "ventana.py").write_text(TEMPLATE.format(name="ventana", extra=""), encoding='utf-8')
+    (tmp_path / "efimera.py").write_text(TEMPLATE.format(name="efimera", extra="window.close()"), encoding='utf-8')
+    return FunctionManifest(tmp_path).refresh()
+
+@pytest.fixture
+def host(monkeypatch):
+    monkeypatch.setenv('QT_QPA_PLATFORM', 'offscreen')
+    host = GuiHost(open_timeout=30)
+    yield host
+    host.shutdown()
+
+def test_window_opens_without_blocking(host, functions):
+    closed = threading.Event()
+    start = time.perf_counter()
+    first = host.execute(functions['ventana'], on_closed=closed.set)
+    startup = time.perf_counter() - start
+
+    assert first['success'] and first['result'] == "cerrada"
+    assert first['windows'] == 1
+    assert not closed.wait(0.2)  # la ventana sigue abierta
+
+    # El segundo QApplication(sys.argv) reutiliza la instancia y el arranque ya está pagado
+    start = time.perf_counter()
+    second = host.execute(functions['ventana'])
+    assert second['success'] and second['windows'] == 1
+    assert time.perf_counter() - start < startup
+
+def test_closed_is_reported(host, functions):
+    closed = threading.Event()
+    result = host.execute(functions['efimera'], on_closed=closed.set)
+
+    assert result['success'] and result['windows'] == 0
+    assert closed.wait(5)
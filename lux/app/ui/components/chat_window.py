@@ -16,7 +16,7 @@ class ChatWindow(QDialog):
         super().__init__(parent)
         self.ai_service = ai_service
         self.chat_history = []
-        self.current_model = "gemini"  # Modelo por defecto
+        self.current_model = "auto"  # El enrutador elige el modelo más rápido disponible
         
         self._setup_ui()
         self._load_chat_history()
@@ -32,7 +32,7 @@ class ChatWindow(QDialog):
         model_layout = QHBoxLayout()
         model_label = QLabel("Modelo:")
         self.model_selector = QComboBox()
-        self.model_selector.addItems(self.ai_service.get_available_models())
+        self.model_selector.addItems(["auto"] + self.ai_service.get_available_models())
         self.model_selector.currentTextChanged.connect(self._on_model_changed)
         model_layout.addWidget(model_label)
         model_layout.addWidget(self.model_selector)
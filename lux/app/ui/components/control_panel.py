@@ -1,9 +1,9 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget,
-                            QPushButton, QLabel, QTextEdit, QComboBox, QWidget, QGroupBox, QTreeWidget, QTreeWidgetItem, QMessageBox)
+                            QPushButton, QLabel, QTextEdit, QComboBox, QWidget, QGroupBox, QTreeWidget, QTreeWidgetItem, QMessageBox,
+                            QCheckBox)
 from PyQt6.QtCore import Qt
 import logging
 from ...utils.logger import LuxLogger
-from pathlib import Path
 
 class ControlPanel(QDialog):
     def __init__(self, voice_manager, ai_manager, media_player, parent=None):
@@ -487,11 +487,30 @@ class ControlPanel(QDialog):
         
         # Lista de funciones
         self.functions_list = QTreeWidget()
-        self.functions_list.setHeaderLabels(["Función", "Descripción"])
+        self.functions_list.setHeaderLabels(["Función", "Descripción", "Perfil"])
         self.functions_list.setColumnWidth(0, 200)
+        self.functions_list.setColumnWidth(1, 420)
         self.functions_list.setAlternatingRowColors(True)
+        self.functions_list.currentItemChanged.connect(lambda *_: self._show_function_profile())
         layout.addWidget(self.functions_list)
         
+        # Resumen del último perfil de la función seleccionada
+        profile_group = QGroupBox("Marcos más costosos (último perfil)")
+        profile_layout = QVBoxLayout(profile_group)
+        self.profile_summary = QTextEdit()
+        self.profile_summary.setReadOnly(True)
+        self.profile_summary.setMaximumHeight(160)
+        self.profile_summary.setStyleSheet("""
+            QTextEdit {
+                background-color: #2D2D2D;
+                color: #FFFFFF;
+                border: 1px solid #3E3E3E;
+                font-family: 'Consolas', monospace;
+            }
+        """)
+        profile_layout.addWidget(self.profile_summary)
+        layout.addWidget(profile_group)
+        
         # Botones de control
         buttons_layout = QHBoxLayout()
         
@@ -503,6 +522,16 @@ class ControlPanel(QDialog):
         delete_btn.clicked.connect(self._delete_selected_function)
         buttons_layout.addWidget(delete_btn)
         
+        profile_btn = QPushButton("Perfilar Función")
+        profile_btn.clicked.connect(self._toggle_function_profiling)
+        buttons_layout.addWidget(profile_btn)
+        
+        self.profile_all_check = QCheckBox("Perfilar todas las ejecuciones")
+        function_manager = self.ai_manager.function_manager
+        self.profile_all_check.setChecked(bool(function_manager and function_manager.profiling_enabled))
+        self.profile_all_check.toggled.connect(self._toggle_global_profiling)
+        buttons_layout.addWidget(self.profile_all_check)
+        
         layout.addLayout(buttons_layout)
         
         # Estilo
@@ -534,14 +563,56 @@ class ControlPanel(QDialog):
             if not self.ai_manager.function_manager:
                 return
             
-            functions = self.ai_manager.function_manager.get_available_functions()
+            function_manager = self.ai_manager.function_manager
+            functions = function_manager.get_available_functions()
             for name, doc in functions.items():
-                item = QTreeWidgetItem([name, doc or "Sin descripción"])
+                profiled = function_manager.registry.get_function_info(name).get('profile')
+                item = QTreeWidgetItem([name, doc or "Sin descripción", "Sí" if profiled else ""])
                 self.functions_list.addTopLevelItem(item)
             
         except Exception as e:
             logging.error(f"Error actualizando lista de funciones: {e}")
     
+    def _toggle_function_profiling(self):
+        """Activa o desactiva el perfilado de la función seleccionada"""
+        item = self.functions_list.currentItem()
+        if not item or not self.ai_manager.function_manager:
+            return
+        function_name = item.text(0)
+        registry = self.ai_manager.function_manager.registry
+        enabled = not registry.get_function_info(function_name).get('profile')
+        registry.set_profiling(function_name, enabled)
+        item.setText(2, "Sí" if enabled else "")
+        logging.info(f"Perfilado de {function_name} {'activado' if enabled else 'desactivado'}")
+    
+    def _toggle_global_profiling(self, checked: bool):
+        """Perfilado de todas las ejecuciones"""
+        if self.ai_manager.function_manager:
+            self.ai_manager.function_manager.profiling_enabled = checked
+            logging.info(f"Perfilado global {'activado' if checked else 'desactivado'}")
+    
+    def _show_function_profile(self):
+        """Muestra los marcos con más tiempo propio del último perfil de la función"""
+        item = self.functions_list.currentItem()
+        if not item or not self.ai_manager.function_manager:
+            self.profile_summary.clear()
+            return
+        try:
+            log_manager = self.ai_manager.function_manager.log_manager
+            profile = log_manager.get_function_metrics(item.text(0)).get('last_profile')
+            if not profile:
+                self.profile_summary.setPlainText("Sin perfiles. Activa el perfilado y ejecuta la función.")
+                return
+            lines = [f"{profile['timestamp']}  ({profile['samples']} muestras)"]
+            lines += [
+                f"{frame['self_time'] * 1000:9.1f} ms  {frame['calls']:>6}x  {frame['function']}  [{frame['location']}]"
+                for frame in profile['top']
+            ]
+            lines += [f"pstats:    {profile['pstats']}", f"colapsado: {profile['collapsed']}"]
+            self.profile_summary.setPlainText("\n".join(lines))
+        except Exception as e:
+            logging.error(f"Error mostrando perfil: {e}")
+    
     def _delete_selected_function(self):
         """Elimina la función seleccionada"""
         try:
@@ -560,14 +631,9 @@ class ControlPanel(QDialog):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # Eliminar archivo
-                function_path = Path("resources/functions") / f"{function_name}.py"
-                if function_path.exists():
-                    function_path.unlink()
-                
-                # Eliminar del registro
-                if function_name in self.ai_manager.function_manager.functions:
-                    del self.ai_manager.function_manager.functions[function_name]
+                # Eliminar archivo, manifiesto, registro e índice
+                if not self.ai_manager.function_manager.delete_function(function_name):
+                    QMessageBox.warning(self, 'Error', f'No se pudo eliminar la función "{function_name}"')
                 
                 # Actualizar lista
                 self._refresh_functions_list()
@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QLabel, QSystemTrayIcon, QMenu,
                             QStyle)
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, pyqtSignal
 from PyQt6.QtGui import QIcon, QAction
 import logging
 from pathlib import Path
@@ -19,11 +19,12 @@ from ..services.file_service import FileService
 from .components.chat_window import ChatWindow
 from .components.control_panel import ControlPanel
 from ..services.notification_service import NotificationService
-from ..core.function_manager import FunctionManager
 
 logger = logging.getLogger('lux')
 
 class MainWindow(QMainWindow):
+    partialResponse = pyqtSignal(str)  # Respuesta de voz en curso (desde el hilo de voz)
+
     def __init__(self, db_session, voice_manager: VoiceManager, ai_manager: AIManager):
         super().__init__()
         
@@ -55,14 +56,13 @@ class MainWindow(QMainWindow):
         self.is_listening = True
         self.voice_manager.start_listening()
         
-        # Actualizar VoiceManager con servicios
-        function_manager = FunctionManager(
+        # Reutilizar el FunctionManager del VoiceManager con los servicios de la app
+        function_manager = self.voice_manager.function_manager
+        function_manager.set_services(
             task_service=self.task_service,
-            media_player=None,  # Se actualizará después de crear MediaPlayer
             reminder_service=self.reminder_service,
             file_service=self.file_service
         )
-        self.voice_manager.function_manager = function_manager
         self.ai_manager.set_function_manager(function_manager)
         
         # Configurar UI después de tener todos los servicios
@@ -79,6 +79,7 @@ class MainWindow(QMainWindow):
         
         # Actualizar media_player en command_handler
         self.command_handler.media_player = self.media_player
+        function_manager.set_services(media_player=self.media_player)
         
         # Actualizar layout principal
         central_widget = QWidget()
@@ -235,6 +236,10 @@ class MainWindow(QMainWindow):
         
         # Conexión con el tray
         self.tray_icon.activated.connect(self._handle_tray_activation)
+        
+        # Respuestas por partes: el VoiceManager emite desde su hilo
+        self.partialResponse.connect(self.status_label.setText)
+        self.voice_manager.on_partial = self.partialResponse.emit
     
     def _handle_mute_toggle(self, checked):
         """Maneja el toggle del botón de mute"""
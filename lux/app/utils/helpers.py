@@ -0,0 +1,21 @@
+import re
+import unicodedata
+from typing import List
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza texto para comparaciones: minúsculas, sin acentos,
+    sin puntuación y con espacios colapsados
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]|_', ' ', text.lower())
+    return ' '.join(text.split())
+
+def char_ngrams(text: str, min_n: int = 2, max_n: int = 4) -> List[str]:
+    """Genera los n-gramas de caracteres de un texto ya normalizado"""
+    padded = f" {text} "
+    grams = []
+    for n in range(min_n, max_n + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams